@@ -0,0 +1,65 @@
+import argparse
+import os
+from serpent import cache, parallel, pipeline, results
+
+def final_values(sim_dir, kinf_series):
+    """
+    Burnup, k_inf et erreur au dernier pas d'une simulation (produit kinf_series), ou
+    None si le fichier source n'existe pas ou ne contient aucun pas.
+    """
+    if kinf_series is None or len(kinf_series[0]) == 0:
+        return None
+    times, burnups, k_infs, errors = kinf_series
+    return {
+        'total_time': float(times[-1]),
+        'final_burnup': float(burnups[-1]),
+        'k_inf': float(k_infs[-1]),
+        'error': float(errors[-1]),
+    }
+
+def print_table(final_value):
+    """
+    Affiche le tableau des valeurs finales de toutes les simulations ({sim_dir: valeurs}),
+    l'erreur sur k_inf en pcm (comme plot_k_inf) :
+
+    >>> print_table({'data/MOXEUS_00001': {'total_time': 2225.0, 'final_burnup': 66.75,
+    ...                                    'k_inf': 0.78975, 'error': 0.00128}})
+    Simulation        Temps (j)  Burnup (MWd/kgU)     k_inf  Erreur (pcm)
+    MOXEUS_00001         2225.0             66.75   0.78975         128.0
+    """
+    print(f"{'Simulation':<16} {'Temps (j)':>10} {'Burnup (MWd/kgU)':>17} {'k_inf':>9} {'Erreur (pcm)':>13}")
+    for sim_dir, values in final_value.items():
+        sim_name = os.path.basename(sim_dir)
+        if values is None:
+            print(f"{sim_name:<16} {'(pas de données)':>52}")
+            continue
+        print(f"{sim_name:<16} {values['total_time']:>10.1f} {values['final_burnup']:>17.2f} "
+              f"{values['k_inf']:>9.5f} {values['error'] * 1e5:>13.1f}")
+
+def register(graph, args):
+    """
+    Ajoute les nœuds de l'analyse au graphe : valeurs finales de chaque simulation (à
+    partir de kinf_series) et tableau de toutes les simulations. Aucune figure n'est
+    tracée : matplotlib, pandas et scipy ne sont pas importés.
+    """
+    graph.add('final_value', final_values, ['kinf_series'])
+    graph.add('final_table', print_table, ['final_value'], scope='campaign')
+    return ['final_table']
+
+def main(args):
+    """Affiche le burnup et k_inf finaux de toutes les simulations de data/."""
+    simulation_dirs = pipeline.simulation_dirs('data')
+    if not simulation_dirs:
+        print("Aucune simulation trouvée dans le dossier 'data/'.")
+        return
+    graph = pipeline.simulation_pipeline(args.source)
+    graph.run(register(graph, args), simulation_dirs, args.jobs)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Burnup et k_inf finaux de chaque simulation (sans figure)")
+    cache.add_cache_arguments(parser)
+    results.add_kinf_source_argument(parser)
+    parallel.add_jobs_argument(parser)
+    args = parser.parse_args()
+    cache.configure_from_args(args)
+    main(args)
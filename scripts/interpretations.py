@@ -1,143 +1,16 @@
 import numpy as np
-import matplotlib.pyplot as plt
-import re
+import argparse
 import os
-import pandas as pd
-import seaborn as sns
-from matplotlib.ticker import MaxNLocator, AutoMinorLocator
-from scipy.interpolate import interp1d
-from matplotlib.gridspec import GridSpec
-from scipy.stats import pearsonr
-
-# Extraction des données k_inf (repris de plot_k_inf.py)
-def extract_corrector_data(log_file):
-    """
-    Extrait les données de k_inf (corrector), le temps, le burnup et les erreurs du fichier log.txt.
-    Retourne quatre listes : temps (jours), burnup (MWd/kgU), k_inf, erreurs (en unité de k_eff).
-    """
-    with open(log_file, 'r') as file:
-        lines = file.readlines()
-
-    times = []
-    burnups = []
-    k_infs = []
-    errors = []
-
-    i = 0
-    while i < len(lines):
-        line = lines[i].strip()
-        # Chercher les étapes "corrector"
-        if "Transport calculation: step =" in line and "(corrector)" in line:
-            # Extraire le numéro de l'étape
-            step_match = re.search(r'step = (\d+) / (\d+)', line)
-            if step_match:
-                step_num = int(step_match.group(1))
-                # Trouver la ligne du burnup
-                while i < len(lines):
-                    i += 1
-                    if "BU   =" in lines[i]:
-                        bu_match = re.search(r'BU   = ([\d.]+) MWd/kgU', lines[i])
-                        if bu_match:
-                            burnup = float(bu_match.group(1))
-                            break
-                # Trouver la ligne du temps
-                while i < len(lines):
-                    i += 1
-                    if "time =" in lines[i]:
-                        time_match = re.search(r'time = ([\d.]+) days', lines[i])
-                        if time_match:
-                            time = float(time_match.group(1))
-                            break
-                # Trouver la dernière ligne k-eff (implicit) pour cette étape
-                k_inf_line = None
-                while i < len(lines):
-                    i += 1
-                    if "k-eff (implicit) =" in lines[i]:
-                        k_inf_line = lines[i]
-                    elif "Finished after" in lines[i]:
-                        break
-                if k_inf_line:
-                    # Extraire k_inf et l'erreur
-                    k_inf_match = re.search(r'k-eff \(implicit\) = ([\d.]+) \+/- ([\d.]+)', k_inf_line)
-                    if k_inf_match:
-                        k_inf = float(k_inf_match.group(1))
-                        error = float(k_inf_match.group(2))
-                        times.append(time)
-                        burnups.append(burnup)
-                        k_infs.append(k_inf)
-                        errors.append(error)
-        i += 1
-
-    return times, burnups, k_infs, errors
-
-# Fonctions pour extraction des données isotopiques (adaptées de plot_inventory.py)
-def clean_line(line):
-    return line.split('%')[0].strip()
-
-def parse_matlab_array(text):
-    cleaned = re.sub(r'[\[\];]', '', text).strip()
-    numbers = [float(x) for x in cleaned.split()]
-    return np.array(numbers)
-
-def parse_matlab_matrix(lines):
-    matrix = []
-    for line in lines:
-        cleaned = clean_line(line)
-        cleaned = re.sub(r'[\[\];]', '', cleaned)
-        if cleaned:
-            row = [float(x) for x in cleaned.split()]
-            matrix.append(row)
-    return np.array(matrix)
-
-def load_m_file(filename):
-    """Charge les données isotopiques depuis un fichier .m"""
-    days = None
-    zai = None
-    adens = None
-    burnup = None
-    adens_lines = []
-    reading_adens = False
-
-    with open(filename, 'r') as f:
-        for line in f:
-            cleaned_line = clean_line(line)
-            if not cleaned_line:
-                continue
-
-            if cleaned_line.startswith('DAYS ='):
-                days = parse_matlab_array(cleaned_line.split('=', 1)[1])
-            elif cleaned_line.startswith('BU ='):
-                burnup = parse_matlab_array(cleaned_line.split('=', 1)[1])
-            elif cleaned_line.startswith('ZAI ='):
-                zai_lines = []
-                zai_lines.append(cleaned_line.split('=', 1)[1])
-                for next_line in f:
-                    cleaned_next = clean_line(next_line)
-                    if cleaned_next.endswith(';'):
-                        zai_lines.append(cleaned_next)
-                        break
-                    elif cleaned_next:
-                        zai_lines.append(cleaned_next)
-                zai_text = ' '.join(zai_lines)
-                zai = parse_matlab_array(zai_text)
-            elif cleaned_line.startswith('MAT_fuelp1r1_ADENS ='):
-                reading_adens = True
-                adens_lines.append(cleaned_line.split('=', 1)[1])
-            elif reading_adens and ';' in cleaned_line:
-                adens_lines.append(cleaned_line)
-                adens = parse_matlab_matrix(adens_lines)
-                reading_adens = False
-            elif reading_adens:
-                adens_lines.append(cleaned_line)
-
-    if days is None or zai is None or adens is None:
-        raise ValueError("Erreur : DAYS, ZAI ou ADENS non trouvés dans le fichier.")
-    
-    if burnup is None:
-        print("Burnup non trouvé, l'axe secondaire n'affichera pas cette information.")
-        burnup = days  # Utiliser les jours comme fallback
-    
-    return days, zai, adens, burnup
+from functools import partial
+from serpent import cache, lazy, manifest, parallel, pipeline, profiles, results, timing
+
+plt = lazy.module('matplotlib.pyplot')
+gridspec = lazy.module('matplotlib.gridspec')
+ticker = lazy.module('matplotlib.ticker')
+pd = lazy.module('pandas')
+sns = lazy.module('seaborn')
+interpolate = lazy.module('scipy.interpolate')
+stats = lazy.module('scipy.stats')
 
 # Définition des isotopes importants
 isotopes = {
@@ -167,19 +40,12 @@ fissile_isotopes = ['U-235', 'Pu-239', 'Pu-241']
 fertile_isotopes = ['U-238', 'Pu-240', 'Pu-242']
 poison_isotopes = ['U-236', 'Np-237', 'Am-241', 'Am-243']
 
-def get_isotope_data(days, zai, adens, total_adens, isotope_list):
-    """Obtient les données de densité pour une liste d'isotopes"""
-    isotope_data = {}
-    
-    for isotope in isotope_list:
-        zai_num = isotopes[isotope]
-        indices = np.where(zai == zai_num)[0]
-        if len(indices) == 1:
-            index = indices[0]
-            percentage = (adens[index, :] / total_adens) * 100
-            isotope_data[isotope] = percentage
+def get_isotope_data(days, nuclides, adens, total_adens, isotope_list):
+    """Obtient les données de densité pour une liste d'isotopes (une seule extraction)"""
+    block, found = nuclides.gather(adens, [isotopes[isotope] for isotope in isotope_list])
+    percentages = (block / total_adens) * 100
     
-    return isotope_data
+    return {isotope: percentage for isotope, percentage, present in zip(isotope_list, percentages, found) if present}
 
 def calculate_total_percentage(isotope_data):
     """Calcule le pourcentage total pour un groupe d'isotopes"""
@@ -193,12 +59,14 @@ def calculate_total_percentage(isotope_data):
     
     return total
 
+@timing.timed('compute')
 def calculate_k_inf_derivatives(times, k_infs):
     """Calcule les dérivées de k_inf pour identifier les points de changement"""
     dk_dt = np.gradient(k_infs, times)
     d2k_dt2 = np.gradient(dk_dt, times)
     return dk_dt, d2k_dt2
 
+@timing.timed('compute')
 def calculate_pearson_correlations(k_infs, isotope_data):
     """Calcule les corrélations de Pearson entre k_inf et les isotopes"""
     correlations = {}
@@ -206,7 +74,7 @@ def calculate_pearson_correlations(k_infs, isotope_data):
     for isotope, data in isotope_data.items():
         if len(data) == len(k_infs):
             try:
-                corr, p_value = pearsonr(k_infs, data)
+                corr, p_value = stats.pearsonr(k_infs, data)
                 correlations[isotope] = (corr, p_value)
             except:
                 print(f"Erreur de calcul de corrélation pour {isotope}")
@@ -217,12 +85,13 @@ def calculate_pearson_correlations(k_infs, isotope_data):
     
     return correlations
 
+@timing.timed('render')
 def plot_k_inf_isotopes(times, burnups, k_infs, iso_times, isotope_data, sim_name, output_path):
     """
     Trace l'évolution de k_inf et des isotopes importants sur le même graphique.
     """
     fig = plt.figure(figsize=(14, 10))
-    gs = GridSpec(2, 1, height_ratios=[2, 1], hspace=0.3)
+    gs = gridspec.GridSpec(2, 1, height_ratios=[2, 1], hspace=0.3)
     
     # Axe principal pour k_inf
     ax1 = fig.add_subplot(gs[0])
@@ -232,7 +101,7 @@ def plot_k_inf_isotopes(times, burnups, k_infs, iso_times, isotope_data, sim_nam
     # Configurer l'axe y principal
     ax1.set_ylabel(r'$k_{\infty}$', fontsize=14)
     ax1.grid(True, which='major', linestyle='--', alpha=0.7)
-    ax1.grid(True, which='minor', linestyle=':', alpha=0.4)
+    profiles.minor_grid(ax1, linestyle=':', alpha=0.4)
     
     # Axe secondaire pour le burnup (en haut)
     ax3 = ax1.twiny()
@@ -245,7 +114,7 @@ def plot_k_inf_isotopes(times, burnups, k_infs, iso_times, isotope_data, sim_nam
     time_ticks = np.linspace(min_time, max_time, n_ticks)
     
     # Créer une fonction d'interpolation pour le burnup
-    burnup_interp = interp1d(times, burnups, bounds_error=False, fill_value="extrapolate")
+    burnup_interp = interpolate.interp1d(times, burnups, bounds_error=False, fill_value="extrapolate")
     burnup_ticks_values = burnup_interp(time_ticks)
     
     # Configurer l'axe du burnup
@@ -279,15 +148,16 @@ def plot_k_inf_isotopes(times, burnups, k_infs, iso_times, isotope_data, sim_nam
     ax1.legend(loc='lower left')
     
     # Sauvegarder
-    plt.savefig(output_path, dpi=300, bbox_inches='tight')
+    profiles.savefig(output_path)
     plt.close()
 
+@timing.timed('render')
 def plot_k_inf_derivatives(times, burnups, k_infs, dk_dt, d2k_dt2, sim_name, output_path):
     """
     Trace les dérivées de k_inf pour identifier les points de changement significatifs.
     """
     fig = plt.figure(figsize=(14, 10))
-    gs = GridSpec(3, 1, height_ratios=[2, 1, 1], hspace=0.3)
+    gs = gridspec.GridSpec(3, 1, height_ratios=[2, 1, 1], hspace=0.3)
     
     # Axe pour k_inf
     ax1 = fig.add_subplot(gs[0])
@@ -339,9 +209,10 @@ def plot_k_inf_derivatives(times, burnups, k_infs, dk_dt, d2k_dt2, sim_name, out
     fig.suptitle(r'Analyse des dérivées de $k_{\infty}$ - ' + sim_name, fontsize=16)
     
     # Sauvegarder
-    plt.savefig(output_path, dpi=300, bbox_inches='tight')
+    profiles.savefig(output_path)
     plt.close()
 
+@timing.timed('render')
 def plot_correlation_matrix(correlations, sim_name, output_path):
     """
     Trace une matrice visuelle des corrélations entre k_inf et les isotopes.
@@ -380,8 +251,9 @@ def plot_correlation_matrix(correlations, sim_name, output_path):
     ax.grid(True, axis='x', linestyle='--', alpha=0.7)
     
     # Sauvegarder
-    plt.tight_layout()
-    plt.savefig(output_path, dpi=300)
+    with timing.timer('render', 'tight_layout'):
+        plt.tight_layout()
+    profiles.savefig(output_path, tight=False)
     plt.close()
 
 def create_summary(sim_dir, k_inf_data, isotope_correlations, inflection_points):
@@ -440,19 +312,21 @@ def create_summary(sim_dir, k_inf_data, isotope_correlations, inflection_points)
     
     return "\n".join(summary)
 
+@timing.timed('compute')
 def interpolate_isotope_data(isotope_data, iso_times, k_inf_times):
     """Interpole les données isotopiques pour qu'elles correspondent aux temps de k_inf"""
     interpolated_data = {}
     
     for isotope, data in isotope_data.items():
         try:
-            interp_func = interp1d(iso_times, data, bounds_error=False, fill_value="extrapolate")
+            interp_func = interpolate.interp1d(iso_times, data, bounds_error=False, fill_value="extrapolate")
             interpolated_data[isotope] = interp_func(k_inf_times)
         except Exception as e:
             print(f"Erreur lors de l'interpolation pour {isotope}: {e}")
     
     return interpolated_data
 
+@timing.timed('render')
 def plot_isotope_correlation_matrix(isotope_data, sim_name, output_path):
     """
     Génère une matrice de corrélation carrée entre tous les isotopes.
@@ -478,123 +352,146 @@ def plot_isotope_correlation_matrix(isotope_data, sim_name, output_path):
     
     # Ajuster la mise en page et ajouter un titre
     plt.title(f'Matrice de corrélation entre isotopes - {sim_name}', fontsize=16, pad=20)
-    plt.tight_layout()
+    with timing.timer('render', 'tight_layout'):
+        plt.tight_layout()
     
     # Sauvegarder
-    plt.savefig(output_path, dpi=300, bbox_inches='tight')
+    profiles.savefig(output_path)
     plt.close()
 
-if __name__ == "__main__":
-    # Recherche des simulations dans le répertoire data/
-    data_dir = "data"
-    print(f"Recherche de simulations dans {data_dir}/...")
-    simulation_dirs = [d for d in os.listdir(data_dir) if os.path.isdir(os.path.join(data_dir, d))]
-    simulation_dirs.sort()
-    
+def process_simulation(sim_dir, kinf_series, inventory_arrays, source='log'):
+    """
+    Analyse complète d'une simulation à partir de ses séries de k_inf (produit
+    kinf_series) et de ses inventaires (produit inventory_arrays) : figures et résumé
+    dans figures/interpretations/<simulation>. Retourne le résumé, ou None en cas d'échec.
+    """
+    sim_name = os.path.basename(sim_dir)
+    print(f"Traitement de {sim_name}...")
+
+    # Créer un répertoire pour cette simulation
+    output_dir = f'figures/interpretations/{sim_name}'
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Vérifier que les données nécessaires existent
+    if kinf_series is None or inventory_arrays is None:
+        print(f"Données manquantes pour {sim_name}, {source}: {kinf_series is not None}, dep: {inventory_arrays is not None}")
+        return None
+
+    # Données k_inf extraites
+    times, burnups, k_infs, errors = kinf_series
+    if not times:
+        print(f"Aucune donnée k_inf trouvée pour {sim_name}")
+        return None
+    print(f"Données k_inf extraites : {len(times)} points")
+
+    # Extraire les données isotopiques
+    try:
+        iso_times, nuclides, adens, iso_burnups = inventory_arrays
+        print(f"Données isotopiques extraites : {len(iso_times)} points temporels, {len(nuclides)} isotopes")
+
+        # Calculer la densité atomique totale
+        total_adens = np.sum(adens, axis=0)
+
+        # Obtenir les données pour les groupes d'isotopes
+        isotope_data = get_isotope_data(iso_times, nuclides, adens, total_adens, list(isotopes))
+
+        # Calculer les dérivées de k_inf
+        dk_dt, d2k_dt2 = calculate_k_inf_derivatives(times, k_infs)
+
+        # Identifier les points d'inflexion significatifs
+        inflection_points = []
+        for i in range(1, len(d2k_dt2)):
+            if d2k_dt2[i-1] * d2k_dt2[i] <= 0 and abs(d2k_dt2[i]) > np.std(d2k_dt2) * 0.2:
+                inflection_points.append(i)
+
+        # Calculer les corrélations avec k_inf
+        # Si les échelles temporelles sont différentes, interpoler
+        if len(iso_times) != len(times):
+            print(f"Interpolation nécessaire: {len(iso_times)} points isotopiques vs {len(times)} points k_inf")
+            iso_data_interp = interpolate_isotope_data(isotope_data, iso_times, times)
+            isotope_correlations = calculate_pearson_correlations(k_infs, iso_data_interp)
+
+            # Utiliser les données interpolées pour la matrice de corrélation
+            plot_isotope_correlation_matrix(iso_data_interp, sim_name,
+                                          f'{output_dir}/matrice_correlation.png')
+        else:
+            isotope_correlations = calculate_pearson_correlations(k_infs, isotope_data)
+
+            # Utiliser les données originales pour la matrice de corrélation
+            plot_isotope_correlation_matrix(isotope_data, sim_name,
+                                          f'{output_dir}/matrice_correlation.png')
+
+        # Générer les graphiques
+        plot_k_inf_isotopes(times, burnups, k_infs, iso_times, isotope_data, sim_name,
+                           f'{output_dir}/comparaison_isotopes.png')
+
+        plot_k_inf_derivatives(times, burnups, k_infs, dk_dt, d2k_dt2, sim_name,
+                              f'{output_dir}/derivees.png')
+
+        plot_correlation_matrix(isotope_correlations, sim_name,
+                               f'{output_dir}/correlation_k_inf.png')
+
+        # Créer un résumé pour cette simulation
+        k_inf_data = {
+            'times': times,
+            'burnups': burnups,
+            'k_infs': k_infs,
+            'errors': errors
+        }
+        summary = create_summary(sim_name, k_inf_data, isotope_correlations, inflection_points)
+
+        # Sauvegarder le résumé pour cette simulation dans son propre dossier
+        with open(f'{output_dir}/resume.txt', 'w') as f:
+            f.write(summary)
+
+        print(f"Analyse complétée pour {sim_name}")
+        return summary
+
+    except Exception as e:
+        print(f"Erreur lors du traitement de {sim_name}: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+def register(graph, args):
+    """
+    Ajoute le nœud de l'analyse au graphe : figures et résumé de chaque simulation, à
+    partir de kinf_series et inventory_arrays. Retourne les nœuds cibles.
+    """
     # Créer le répertoire principal de sortie
     os.makedirs('figures/interpretations', exist_ok=True)
-    
-    # Dictionnaire pour stocker les résumés
-    summaries = {}
-    
-    # Traiter chaque simulation
-    for sim_dir in simulation_dirs:
-        log_file = os.path.join(data_dir, sim_dir, 'log.txt')
-        dep_file = os.path.join(data_dir, sim_dir, f"{sim_dir}.se_dep.m")
-        
-        print(f"Traitement de {sim_dir}...")
-        
-        # Créer un répertoire pour cette simulation
-        output_dir = f'figures/interpretations/{sim_dir}'
-        os.makedirs(output_dir, exist_ok=True)
-        
-        # Vérifier que les fichiers nécessaires existent
-        if not os.path.exists(log_file) or not os.path.exists(dep_file):
-            print(f"Fichiers manquants pour {sim_dir}, log: {os.path.exists(log_file)}, dep: {os.path.exists(dep_file)}")
-            continue
-        
-        # Extraire les données k_inf
-        times, burnups, k_infs, errors = extract_corrector_data(log_file)
-        if not times:
-            print(f"Aucune donnée k_inf trouvée pour {sim_dir}")
-            continue
-        print(f"Données k_inf extraites : {len(times)} points")
-        
-        # Extraire les données isotopiques
-        try:
-            iso_times, zai, adens, iso_burnups = load_m_file(dep_file)
-            print(f"Données isotopiques extraites : {len(iso_times)} points temporels, {len(zai)} isotopes")
-            
-            # Calculer la densité atomique totale
-            total_adens = np.sum(adens, axis=0)
-            
-            # Obtenir les données pour les groupes d'isotopes
-            isotope_data = {}
-            for isotope in isotopes:
-                try:
-                    zai_num = isotopes[isotope]
-                    indices = np.where(zai == zai_num)[0]
-                    if len(indices) == 1:
-                        index = indices[0]
-                        percentage = (adens[index, :] / total_adens) * 100
-                        isotope_data[isotope] = percentage
-                except Exception as e:
-                    print(f"Erreur lors de l'extraction des données pour {isotope}: {e}")
-                    continue
-            
-            # Calculer les dérivées de k_inf
-            dk_dt, d2k_dt2 = calculate_k_inf_derivatives(times, k_infs)
-            
-            # Identifier les points d'inflexion significatifs
-            inflection_points = []
-            for i in range(1, len(d2k_dt2)):
-                if d2k_dt2[i-1] * d2k_dt2[i] <= 0 and abs(d2k_dt2[i]) > np.std(d2k_dt2) * 0.2:
-                    inflection_points.append(i)
-            
-            # Calculer les corrélations avec k_inf
-            # Si les échelles temporelles sont différentes, interpoler
-            if len(iso_times) != len(times):
-                print(f"Interpolation nécessaire: {len(iso_times)} points isotopiques vs {len(times)} points k_inf")
-                iso_data_interp = interpolate_isotope_data(isotope_data, iso_times, times)
-                isotope_correlations = calculate_pearson_correlations(k_infs, iso_data_interp)
-                
-                # Utiliser les données interpolées pour la matrice de corrélation
-                plot_isotope_correlation_matrix(iso_data_interp, sim_dir,
-                                              f'{output_dir}/matrice_correlation.png')
-            else:
-                isotope_correlations = calculate_pearson_correlations(k_infs, isotope_data)
-                
-                # Utiliser les données originales pour la matrice de corrélation
-                plot_isotope_correlation_matrix(isotope_data, sim_dir,
-                                              f'{output_dir}/matrice_correlation.png')
-            
-            # Générer les graphiques
-            plot_k_inf_isotopes(times, burnups, k_infs, iso_times, isotope_data, sim_dir,
-                               f'{output_dir}/comparaison_isotopes.png')
-            
-            plot_k_inf_derivatives(times, burnups, k_infs, dk_dt, d2k_dt2, sim_dir,
-                                  f'{output_dir}/derivees.png')
-            
-            plot_correlation_matrix(isotope_correlations, sim_dir,
-                                   f'{output_dir}/correlation_k_inf.png')
-            
-            # Créer un résumé pour cette simulation
-            k_inf_data = {
-                'times': times,
-                'burnups': burnups,
-                'k_infs': k_infs,
-                'errors': errors
-            }
-            summary = create_summary(sim_dir, k_inf_data, isotope_correlations, inflection_points)
-            summaries[sim_dir] = summary
-            
-            # Sauvegarder le résumé pour cette simulation dans son propre dossier
-            with open(f'{output_dir}/resume.txt', 'w') as f:
-                f.write(summary)
-            
-            print(f"Analyse complétée pour {sim_dir}")
-            
-        except Exception as e:
-            print(f"Erreur lors du traitement de {sim_dir}: {e}")
-            import traceback
-            traceback.print_exc()
\ No newline at end of file
+
+    # Seules les simulations dont les fichiers ou le code ont changé sont retraitées
+    process = partial(process_simulation, source=args.source)
+    builds = manifest.Manifest('interpretations')
+    def key(sim_dir):
+        kinf_file = results.kinf_source_file(sim_dir, args.source)
+        return builds.inputs_key(process, [kinf_file, pipeline.dep_file(sim_dir)], profiles.current())
+    def outputs(sim_dir):
+        output_dir = f'figures/interpretations/{os.path.basename(sim_dir)}'
+        return [profiles.figure_path(f'{output_dir}/{name}.png') for name in
+                ('matrice_correlation', 'comparaison_isotopes', 'derivees', 'correlation_k_inf')] + \
+               [f'{output_dir}/resume.txt']
+    graph.add('interpretation', process, ['kinf_series', 'inventory_arrays'],
+              builds=builds, key=key, outputs=outputs)
+    return ['interpretation']
+
+def main(args):
+    """Interprétations de toutes les simulations de data/."""
+    # Recherche des simulations dans le répertoire data/
+    print("Recherche de simulations dans data/...")
+    graph = pipeline.simulation_pipeline(args.source)
+    graph.run(register(graph, args), pipeline.simulation_dirs('data'), args.jobs)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Interprétation de k_inf et des inventaires isotopiques")
+    cache.add_cache_arguments(parser)
+    manifest.add_manifest_arguments(parser)
+    profiles.add_profile_arguments(parser)
+    results.add_kinf_source_argument(parser)
+    parallel.add_jobs_argument(parser)
+    args = parser.parse_args()
+    cache.configure_from_args(args)
+    manifest.configure_from_args(args)
+    profiles.configure_from_args(args)
+    main(args)
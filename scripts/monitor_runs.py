@@ -0,0 +1,111 @@
+import argparse
+import glob
+import os
+import sys
+import time
+from serpent import lazy, profiles
+from serpent.logfile import LogFollower
+
+mfigure = lazy.module('matplotlib.figure')
+
+def log_files(paths, data_dir='data'):
+    """
+    Fichiers log.txt à suivre : dossiers de simulation ou fichiers donnés, ou à défaut
+    ceux de toutes les simulations de data_dir (y compris celles dont le log n'existe
+    pas encore).
+    """
+    if not paths:
+        paths = sorted(glob.glob(os.path.join(data_dir, 'MOXEUS_*')))
+    return [os.path.join(path, 'log.txt') if os.path.isdir(path) else path for path in paths]
+
+def run_name(log_file):
+    """Nom de la simulation d'un log.txt (nom de son dossier)."""
+    return os.path.basename(os.path.dirname(os.path.abspath(log_file)))
+
+def status_row(log_file, follower):
+    """Ligne du tableau de suivi d'une simulation."""
+    record = follower.current
+    if record is None:
+        return f"{run_name(log_file):<16} {'en attente':>12}"
+    keff = f"{record.keff_implicit:.5f} ± {record.keff_implicit_error:.5f}" \
+        if record.keff_implicit is not None else '-'
+    state = 'terminé' if follower.run_finished else 'en cours'
+    return (f"{run_name(log_file):<16} {f'{record.step} / {record.total_steps}':>9} {record.phase:<10} "
+            f"{record.burnup or 0:>8.2f} {record.time or 0:>9.1f} {keff:>19} "
+            f"{follower.time_left or '-':>10}  {state}")
+
+def print_table(followers):
+    """Affiche le tableau de suivi (l'écran est effacé si la sortie est un terminal)."""
+    if sys.stdout.isatty():
+        print('\033[H\033[J', end='')
+    print(f"Suivi des calculs - {time.strftime('%H:%M:%S')}")
+    print(f"{'Simulation':<16} {'Étape':>9} {'Phase':<10} {'BU':>8} {'Temps (j)':>9} "
+          f"{'k-eff (implicit)':>19} {'Restant':>10}  État")
+    for log_file, follower in followers.items():
+        print(status_row(log_file, follower))
+    sys.stdout.flush()
+
+def plot_k_inf(followers, output):
+    """
+    Trace k_inf (étapes corrector terminées) en fonction du burnup pour toutes les
+    simulations suivies et réécrit la figure output.
+    """
+    fig = mfigure.Figure(figsize=(12, 8))
+    ax = fig.add_subplot()
+    for log_file, follower in followers.items():
+        steps = [record for record in follower.steps
+                 if record.phase == 'corrector' and record.keff_implicit is not None]
+        if steps:
+            ax.plot([record.burnup for record in steps], [record.keff_implicit for record in steps],
+                    '-', linewidth=1, label=run_name(log_file))
+    ax.set_xlabel('Burnup (MWd/kgU)')
+    ax.set_ylabel(r'$k_{\infty}$')
+    ax.set_title(fr"Suivi de $k_{{\infty}}$ - {time.strftime('%H:%M:%S')}")
+    ax.grid(True, linestyle='--', alpha=0.7)
+    if ax.lines and len(ax.lines) <= 20:
+        ax.legend(loc='upper right', fontsize='small')
+    return profiles.savefig(output, fig)
+
+def monitor(paths, interval=5, plot=None, once=False):
+    """
+    Suit les log.txt jusqu'à Ctrl+C (ou une seule fois avec once) : à chaque passage,
+    seuls les octets ajoutés sont lus, puis le tableau est réaffiché et la figure de
+    k_inf réécrite si de nouvelles étapes sont terminées.
+    """
+    followers = {}
+    plotted = None
+    try:
+        while True:
+            for log_file in log_files(paths):
+                if log_file not in followers:
+                    followers[log_file] = LogFollower(log_file)
+            changed = [follower.update() for follower in followers.values()]
+            if any(changed) or plotted is None:
+                print_table(followers)
+            finished_steps = sum(len(follower.steps) for follower in followers.values())
+            if plot and finished_steps != plotted:
+                os.makedirs(os.path.dirname(plot) or '.', exist_ok=True)
+                print(f"Figure mise à jour : {plot_k_inf(followers, plot)}")
+            plotted = finished_steps
+            # Simulations désignées toutes terminées : rien de plus à suivre
+            if once or (paths and all(follower.run_finished for follower in followers.values())):
+                break
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("\nSuivi arrêté.")
+    return followers
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Suivi en direct des calculs SERPENT en cours (log.txt)")
+    parser.add_argument('runs', nargs='*',
+                        help="Dossiers de simulation ou fichiers log.txt (défaut : data/MOXEUS_*)")
+    parser.add_argument('--interval', type=float, default=5,
+                        help="Intervalle entre deux lectures, en secondes (défaut : 5)")
+    parser.add_argument('--plot', nargs='?', const='figures/monitor/k_inf.png', default=None,
+                        help="Figure de k_inf mise à jour au fil des étapes (défaut : figures/monitor/k_inf.png)")
+    parser.add_argument('--once', action='store_true',
+                        help="Afficher l'état une seule fois, sans suivre les fichiers")
+    profiles.add_profile_arguments(parser)
+    args = parser.parse_args()
+    profiles.configure_from_args(args)
+    monitor(args.runs, args.interval, args.plot, args.once)
@@ -0,0 +1,340 @@
+import argparse
+import math
+import os
+from functools import partial
+import warnings
+import numpy as np
+from serpent import cache, lazy, manifest, parallel, pipeline, profiles, render, results, timing
+
+mfigure = lazy.module('matplotlib.figure')
+pd = lazy.module('pandas')
+
+# Isotopes des figures de campagne (mêmes listes que plot_cross_sction.py et plot_inventory.py)
+cross_section_isotopes = ['U-234', 'U-235', 'U-236', 'U-238',
+                          'Pu-238', 'Pu-239', 'Pu-240', 'Pu-241', 'Pu-242',
+                          'Np-237', 'Np-239',
+                          'Am-241', 'Am-242', 'Am-242m', 'Am-243',
+                          'Cm-242', 'Cm-243', 'Cm-244', 'Cm-245', 'Cm-246']
+inventory_groups = {
+    'uranium': ('Uranium', ['U-234', 'U-235', 'U-236', 'U-238']),
+    'plutonium': ('Plutonium', ['Pu-238', 'Pu-239', 'Pu-240', 'Pu-241', 'Pu-242']),
+    'actinides_mineurs': ('Actinides mineurs', ['Np-237', 'Np-239', 'Am-241', 'Am-242m', 'Am-243',
+                                                'Cm-242', 'Cm-243', 'Cm-244', 'Cm-245', 'Cm-246']),
+}
+
+# Sections efficaces tracées : grandeur du fichier de campagne, libellé et couleur
+reactions = {'capture': ('CAPTXS', '(n, γ)', 'blue'), 'fission': ('FISSXS', '(n, f)', 'red')}
+
+# Centiles des enveloppes de campagne et bandes tracées (centile bas, centile haut, opacité)
+percentiles = (0, 5, 25, 50, 75, 95, 100)
+bands = ((0, 100, 0.15), (5, 95, 0.3), (25, 75, 0.5))
+
+# Nombre de points de la grille de burnup commune des enveloppes
+grid_points = 200
+
+def grid_shape(n):
+    """(lignes, colonnes) d'une grille de n cases, un peu plus large que haute."""
+    ncols = max(1, math.ceil(math.sqrt(n * 1.5)))
+    return math.ceil(n / ncols), ncols
+
+def plot_small_multiples(output, title, ylabel, simulations, days, values, color='C0', log=False):
+    """
+    Trace une grandeur de toutes les simulations dans une seule figure : une case par
+    simulation, axes partagés. Chaque case rappelle en gris clair l'enveloppe de la
+    campagne à chaque pas (min-max et interquartile), calculée une fois pour toutes les
+    cases : le tracé reste proportionnel au nombre de simulations.
+
+    days, values : tableaux (simulation × pas) du fichier de campagne (NaN au-delà du
+    dernier pas d'une simulation). Retourne le fichier écrit.
+    """
+    nrows, ncols = grid_shape(len(simulations))
+    width, height = 2.6 * ncols + 1, 1.9 * nrows + 1.2
+    fig = mfigure.Figure(figsize=(width, height))
+    # Marges fixes (en pouces) : la grille est régulière, pas besoin d'un calcul de mise en page
+    axes = fig.subplots(nrows, ncols, sharex=True, sharey=True, squeeze=False,
+                        gridspec_kw={'left': 1.0 / width, 'right': 1 - 0.2 / width,
+                                     'bottom': 0.7 / height, 'top': 1 - 0.8 / height,
+                                     'wspace': 0.08, 'hspace': 0.3})
+
+    # Enveloppe de la campagne à chaque pas, en fonction du temps médian du pas
+    step_days = percentile_envelope(days)[percentiles.index(50)]
+    envelope = percentile_envelope(values)
+    background = [(envelope[percentiles.index(low)], envelope[percentiles.index(high)], shade)
+                  for low, high, shade in ((0, 100, '0.9'), (25, 75, '0.8'))]
+
+    for ax, sim_name, sim_days, sim_values in zip(axes.flat, simulations, days, values):
+        for low, high, shade in background:
+            ax.fill_between(step_days, low, high, color=shade, linewidth=0)
+        valid = np.isfinite(sim_days) & np.isfinite(sim_values)
+        ax.plot(sim_days[valid], sim_values[valid], color=color, linewidth=1.2)
+        ax.set_title(sim_name, fontsize=8)
+        ax.tick_params(labelsize=7)
+        ax.grid(True, which='major', linestyle='--', alpha=0.5)
+    if log:
+        axes[0, 0].set_yscale('log', nonpositive='mask')
+
+    # Cases vides de la dernière ligne : graduations du temps sur la case au-dessus
+    for position in range(len(simulations), nrows * ncols):
+        row, col = divmod(position, ncols)
+        axes[row, col].remove()
+        if row > 0:
+            axes[row - 1, col].xaxis.set_tick_params(labelbottom=True)
+
+    fig.suptitle(title, fontsize=14, fontweight='bold')
+    fig.supxlabel('Temps (jours)')
+    fig.supylabel(ylabel)
+    # Marges fixes : pas de bbox_inches='tight', qui retracerait toute la figure
+    return profiles.savefig(output, fig, tight=False)
+
+def isotope_rows(store, names):
+    """{nom: ligne du fichier de campagne} des isotopes présents dans la campagne."""
+    positions = dict(zip(store.names, range(len(store.nuclides))))
+    rows = {}
+    for name in names:
+        if name in positions:
+            rows[name] = positions[name]
+        else:
+            print(f"Isotope {name} absent du fichier de campagne.")
+    return rows
+
+def atomic_percentages(store):
+    """Pourcentage de la densité atomique totale (simulation × nucléide × pas)."""
+    adens = store.tensor('ADENS')
+    return adens / np.nansum(adens, axis=1, keepdims=True) * 100
+
+@timing.timed('compute')
+def resample(burnups, values, grid):
+    """
+    Valeurs de chaque simulation (listes ou lignes de tableaux) interpolées sur une
+    grille de burnup commune : tableau (simulation × grille), NaN hors du domaine
+    de burnup de la simulation (pas d'extrapolation).
+    """
+    resampled = np.full((len(values), len(grid)), np.nan)
+    for sim_values, sim_burnups, row in zip(values, burnups, resampled):
+        sim_burnups, sim_values = np.asarray(sim_burnups, dtype=float), np.asarray(sim_values, dtype=float)
+        valid = np.isfinite(sim_burnups) & np.isfinite(sim_values)
+        if valid.sum() < 2:
+            continue
+        sim_burnups, sim_values = sim_burnups[valid], sim_values[valid]
+        inside = (grid >= sim_burnups[0]) & (grid <= sim_burnups[-1])
+        row[inside] = np.interp(grid[inside], sim_burnups, sim_values)
+    return resampled
+
+@timing.timed('compute')
+def percentile_envelope(resampled):
+    """
+    Centiles (min, 5, 25, 50, 75, 95, max) sur toutes les simulations à chaque point de
+    la grille, en un seul calcul : tableau (centile × grille).
+    """
+    with warnings.catch_warnings():
+        # Points de grille sans aucune simulation : NaN
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return np.nanpercentile(resampled, percentiles, axis=0)
+
+@timing.timed('compute')
+def outlier_scores(resampled, envelope):
+    """
+    Écart de chaque simulation à la médiane, en intervalles interquartiles, moyenné sur la
+    grille : les simulations les plus atypiques ont les scores les plus élevés.
+    """
+    median = envelope[percentiles.index(50)]
+    spread = envelope[percentiles.index(75)] - envelope[percentiles.index(25)]
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        deviation = np.abs(resampled - median) / np.where(spread > 0, spread, np.nan)
+        return np.nan_to_num(np.nanmean(deviation, axis=1), nan=0.0)
+
+def plot_envelope(output, title, ylabel, grid, envelope, highlights):
+    """
+    Enveloppe d'une grandeur sur toute la campagne : bandes min-max, 5-95 % et 25-75 %,
+    médiane et, en option, les courbes des simulations mises en avant ({nom: valeurs sur
+    la grille}). Le coût du tracé ne dépend pas du nombre de simulations.
+    """
+    fig = mfigure.Figure(figsize=(12, 8))
+    ax = fig.add_subplot(111)
+    for low, high, alpha in bands:
+        ax.fill_between(grid, envelope[percentiles.index(low)], envelope[percentiles.index(high)],
+                        color='C0', alpha=alpha, linewidth=0,
+                        label='Min - max' if (low, high) == (0, 100) else f'{low} - {high} %')
+    ax.plot(grid, envelope[percentiles.index(50)], color='C0', linewidth=2, label='Médiane')
+    for position, (sim_name, values) in enumerate(highlights.items(), 1):
+        ax.plot(grid, values, color=f'C{position}', linewidth=1.5, linestyle='--', label=sim_name)
+
+    ax.set_xlabel('Burnup (MWd/kgU)', fontsize=12)
+    ax.set_ylabel(ylabel, fontsize=12)
+    ax.set_title(title, fontsize=14, pad=15)
+    ax.grid(True, which='major', linestyle='--', alpha=0.7)
+    ax.legend(fontsize=10, loc='best')
+    with timing.timer('render', 'tight_layout'):
+        fig.tight_layout()
+    return profiles.savefig(output, fig)
+
+def envelope_quantities(store, kinf_series):
+    """
+    Grandeurs des enveloppes : {nom: (titre, libellé, burnups, valeurs)}, burnups et
+    valeurs par simulation (dans l'ordre de store.simulations). kinf_series : produit
+    kinf_series de chaque simulation ({nom de simulation: série ou None}).
+    """
+    burnup = store.tensor('BU')
+    percentage = atomic_percentages(store)
+    quantities = {}
+
+    # k_inf (log.txt ou .se_res.m), seule grandeur prise hors du fichier de campagne
+    kinf_burnups, kinf_values = [], []
+    for sim_name in store.simulations:
+        series = kinf_series.get(sim_name)
+        _, burnups, k_infs, _ = series if series is not None else ([], [], [], [])
+        kinf_burnups.append(burnups)
+        kinf_values.append(k_infs)
+    quantities['k_inf'] = (r'$k_{\infty}$', r'$k_{\infty}$', kinf_burnups, kinf_values)
+
+    for key in ('plutonium', 'actinides_mineurs'):
+        group_name, names = inventory_groups[key]
+        rows = list(isotope_rows(store, names).values())
+        total = np.nansum(percentage[:, rows], axis=1)
+        total[np.isnan(burnup)] = np.nan
+        quantities[f'{key}_total'] = (f'{group_name} total', 'Pourcentage de densité atomique (%)', burnup, total)
+
+    quantities['flux'] = ('Flux neutronique', 'Flux neutronique (n/cm²/s)', burnup, store.tensor('FLUX'))
+    return quantities
+
+def submit_envelopes(store, renderer, output_dir, kinf_series, highlight=(), outliers=0):
+    """
+    Soumet une figure d'enveloppe par grandeur (k_inf, Pu total, AM total, flux) et écrit
+    le tableau des centiles de chacune (CSV). Les simulations de highlight et les
+    `outliers` simulations les plus atypiques sont tracées par-dessus les bandes.
+    """
+    quantities = envelope_quantities(store, kinf_series)
+    for key, (title, ylabel, burnups, values) in quantities.items():
+        grid = np.linspace(0, max((np.nanmax(b) for b in burnups if len(b)), default=0), grid_points)
+        resampled = resample(burnups, values, grid)
+        envelope = percentile_envelope(resampled)
+
+        # Simulations mises en avant : choisies par leur nom, puis les plus atypiques
+        shown = [store.simulations.index(sim_name) for sim_name in highlight if sim_name in store.simulations]
+        if outliers:
+            ranked = np.argsort(-outlier_scores(resampled, envelope), kind='stable')
+            shown += [int(s) for s in ranked if int(s) not in shown][:outliers]
+        highlights = {store.simulations[s]: resampled[s] for s in shown}
+
+        table = pd.DataFrame(envelope.T, columns=[f'P{p}' for p in percentiles])
+        table.insert(0, 'Burnup (MWd/kgU)', grid)
+        table.to_csv(os.path.join(output_dir, f'{key}.csv'), index=False, float_format='%.6e')
+
+        output = os.path.join(output_dir, f'{key}.png')
+        renderer.submit(output, plot_envelope, output, f'Enveloppe de campagne : {title} ({len(store)} simulations)',
+                        ylabel, grid, envelope, highlights)
+
+def submit_cross_sections(store, renderer, output_dir, isotopes):
+    """Soumet une figure par isotope et par réaction : sections efficaces de toutes les simulations."""
+    days = store.tensor('DAYS')
+    for reaction, (quantity, label, color) in reactions.items():
+        xs = store.tensor(quantity)
+        for isotope, row in isotope_rows(store, isotopes).items():
+            output = os.path.join(output_dir, f'{isotope}_{reaction}.png')
+            renderer.submit(output, plot_small_multiples, output,
+                            f'Section efficace {label} de {isotope} - campagne',
+                            f'Section efficace {label} (barns)', store.simulations, days, xs[:, row],
+                            color=color)
+
+def submit_inventory(store, renderer, output_dir, groups):
+    """Soumet les figures d'inventaire : chaque isotope des groupes et le total de chaque groupe."""
+    days = store.tensor('DAYS')
+    percentage = atomic_percentages(store)
+    for key, (group_name, names) in groups.items():
+        rows = isotope_rows(store, names)
+        for isotope, row in rows.items():
+            output = os.path.join(output_dir, f'{isotope}.png')
+            renderer.submit(output, plot_small_multiples, output,
+                            f'Évolution de {isotope} - campagne', 'Pourcentage de densité atomique (%)',
+                            store.simulations, days, percentage[:, row], log=True)
+        if rows:
+            total = np.nansum(percentage[:, list(rows.values())], axis=1)
+            total[np.isnan(days)] = np.nan
+            output = os.path.join(output_dir, f'{key}_total.png')
+            renderer.submit(output, plot_small_multiples, output,
+                            f'Évolution du {group_name} total - campagne', 'Pourcentage de densité atomique (%)',
+                            store.simulations, days, total, color='red')
+
+def add_arguments(parser):
+    """Options propres à ce script."""
+    parser.add_argument('--kind', nargs='+', choices=['cross_section', 'inventory', 'envelope'],
+                        default=['cross_section', 'inventory', 'envelope'],
+                        help="Figures à produire (défaut : toutes)")
+    parser.add_argument('--highlight', nargs='+', default=[],
+                        help="Simulations tracées par-dessus les enveloppes (ex. MOXEUS_00005)")
+    parser.add_argument('--outliers', type=int, default=0,
+                        help="Nombre de simulations les plus atypiques à tracer sur les enveloppes")
+    parser.add_argument('--isotopes', nargs='+', default=None,
+                        help="Isotopes à tracer (ex. Pu-239 Am-241 ; défaut : ceux des scripts par simulation)")
+
+def register(graph, args):
+    """
+    Ajoute le nœud de l'analyse au graphe : figures tracées à partir du fichier de
+    campagne (nœud campaign_store, mis à jour avec les dep_arrays déjà lus) et des
+    séries kinf_series de chaque simulation.
+    """
+    graph.add('campaign_figs', partial(campaign_figures, args), ['campaign_store', 'kinf_series'],
+              scope='campaign')
+    return ['campaign_figs']
+
+def campaign_figures(args, campaign_store, kinf_series):
+    """Figures de campagne demandées par args.kind (nœud campaign_figs)."""
+    store = campaign_store
+    if store is None:
+        print("Fichier de campagne indisponible (erreur de campaign_store), figures de campagne non tracées.")
+        return
+    if not len(store):
+        print("Aucune simulation dans le fichier de campagne.")
+        return
+    print(f"{len(store)} simulations, {store.n_steps} pas au plus")
+
+    groups = inventory_groups
+    isotopes = cross_section_isotopes
+    if args.isotopes:
+        isotopes = args.isotopes
+        groups = {key: (group_name, [name for name in names if name in isotopes])
+                  for key, (group_name, names) in inventory_groups.items()}
+
+    # Une figure par grandeur, tracées en parallèle ; seules celles dont les données ont changé
+    builds = manifest.Manifest('campaign')
+    with render.RenderPool(args.jobs, manifest=builds) as renderer:
+        if 'cross_section' in args.kind:
+            output_dir = 'figures/campaign/cross_section'
+            os.makedirs(output_dir, exist_ok=True)
+            submit_cross_sections(store, renderer, output_dir, isotopes)
+        if 'inventory' in args.kind:
+            output_dir = 'figures/campaign/inventory'
+            os.makedirs(output_dir, exist_ok=True)
+            submit_inventory(store, renderer, output_dir, groups)
+        if 'envelope' in args.kind:
+            output_dir = 'figures/campaign/envelope'
+            os.makedirs(output_dir, exist_ok=True)
+            kinf_by_name = {os.path.basename(os.path.normpath(sim_dir)): series
+                            for sim_dir, series in kinf_series.items()}
+            submit_envelopes(store, renderer, output_dir, kinf_by_name, args.highlight, args.outliers)
+        renderer.wait()
+    print(f"Figures de campagne : {builds.report()}")
+
+def main(args):
+    """Figures de campagne de toutes les simulations de data/."""
+    simulation_dirs = pipeline.simulation_dirs('data')
+    if not simulation_dirs:
+        print("Aucune simulation trouvée dans le dossier 'data/'.")
+        return
+    graph = pipeline.simulation_pipeline(args.source)
+    graph.run(register(graph, args), simulation_dirs, args.jobs)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Figures de campagne : une case par simulation dans chaque figure")
+    cache.add_cache_arguments(parser)
+    manifest.add_manifest_arguments(parser)
+    profiles.add_profile_arguments(parser)
+    parallel.add_jobs_argument(parser)
+    results.add_kinf_source_argument(parser)
+    add_arguments(parser)
+    args = parser.parse_args()
+    cache.configure_from_args(args)
+    manifest.configure_from_args(args)
+    profiles.configure_from_args(args)
+    main(args)
@@ -1,10 +1,13 @@
+import argparse
 import numpy as np
-import matplotlib.pyplot as plt
 import re
 import os
-import glob
-import pandas as pd
-from matplotlib.ticker import MaxNLocator, AutoMinorLocator
+from serpent import cache, lazy, manifest, parallel, pipeline, profiles, timing
+from serpent.fission import reaction_fractions
+
+plt = lazy.module('matplotlib.pyplot')
+ticker = lazy.module('matplotlib.ticker')
+pd = lazy.module('pandas')
 
 # Liste des isotopes d'intérêt avec leurs codes ZAI
 ISOTOPES = {
@@ -62,27 +65,54 @@ def extract_burnup_info(out_file):
         
         return burnup, time
 
-def plot_fission_contribution(simulation_dir, simulation_name):
+@timing.timed('parse')
+def load_fission_data(out_file):
     """
-    Trace les contributions aux fissions des principaux isotopes.
+    Regroupe extract_fission_fractions et extract_burnup_info en passant par le cache
+    binaire : le fichier .se.out n'est relu que s'il a changé.
+    """
+    def parse(path):
+        fission_fractions, total_reactions = extract_fission_fractions(path)
+        burnup, time = extract_burnup_info(path)
+        return {
+            'zai': np.array(list(fission_fractions), dtype=str),
+            'fraction': np.array(list(fission_fractions.values()), dtype=float),
+            'total_reactions': np.array(total_reactions),
+            'burnup': np.array(np.nan if burnup is None else burnup),
+            'time': np.array(np.nan if time is None else time),
+        }
+    arrays = cache.load_or_parse(out_file, 'fission', parse)
+    fission_fractions = dict(zip(arrays['zai'].tolist(), arrays['fraction'].tolist()))
+    burnup, time = (None if np.isnan(arrays[key]) else float(arrays[key]) for key in ('burnup', 'time'))
+    return fission_fractions, int(arrays['total_reactions']), burnup, time
+
+def out_file(sim_dir):
+    """Chemin du fichier de sortie .se.out d'une simulation."""
+    return os.path.join(sim_dir, f"{os.path.basename(sim_dir)}.se.out")
+
+def fission_data(sim_dir):
+    """Produit de données : load_fission_data du fichier .se.out, ou None s'il n'existe pas."""
+    path = out_file(sim_dir)
+    return load_fission_data(path) if os.path.exists(path) else None
+
+@timing.timed('render')
+def plot_fission_contribution(simulation_dir, simulation_name, fission_data):
+    """
+    Trace les contributions aux fissions des principaux isotopes (produit fission_data).
     """
-    # Chemin du fichier de sortie
-    out_file = os.path.join(simulation_dir, f"{simulation_name}.se.out")
-    
     # Vérifier que le fichier existe
-    if not os.path.exists(out_file):
-        print(f"Fichier {out_file} non trouvé, graphique de contribution aux fissions non généré.")
+    if fission_data is None:
+        print(f"Fichier {out_file(simulation_dir)} non trouvé, graphique de contribution aux fissions non généré.")
         return False
     
-    # Extraction des fractions de fission
-    fission_fractions, total_reactions = extract_fission_fractions(out_file)
+    # Fractions de fission extraites
+    fission_fractions, total_reactions, burnup, time = fission_data
     
     if not fission_fractions:
-        print(f"Aucune donnée de fraction de fission trouvée dans {out_file}")
+        print(f"Aucune donnée de fraction de fission trouvée dans {out_file(simulation_dir)}")
         return False
     
-    # Extraire les informations de burnup si disponibles
-    burnup, time = extract_burnup_info(out_file)
+    # Informations de burnup si disponibles
     burnup_info = f" (Burnup: {burnup:.2f} MWd/kgU)" if burnup else ""
     time_info = f" (Temps: {time:.1f} jours)" if time else ""
     
@@ -116,10 +146,11 @@ def plot_fission_contribution(simulation_dir, simulation_name):
     plt.title(title, fontsize=14)
     plt.xticks(rotation=45, ha='right')
     plt.grid(True, axis='y', linestyle='--', alpha=0.7)
-    plt.tight_layout()
+    with timing.timer('render', 'tight_layout'):
+        plt.tight_layout()
     
     # Sauvegarde
-    plt.savefig(os.path.join(figures_dir, "fission_contribution.png"), dpi=300)
+    profiles.savefig(os.path.join(figures_dir, "fission_contribution.png"), tight=False)
     plt.close()
     
     # ------ Graphique complémentaire: diagramme camembert pour les contributions principales ------
@@ -148,7 +179,7 @@ def plot_fission_contribution(simulation_dir, simulation_name):
     plt.title(f'Répartition des fissions - {simulation_name}{burnup_info}', fontsize=14)
     
     # Sauvegarde
-    plt.savefig(os.path.join(figures_dir, "fission_pie_chart.png"), dpi=300)
+    profiles.savefig(os.path.join(figures_dir, "fission_pie_chart.png"), tight=False)
     plt.close()
     
     # Génération d'un rapport de synthèse
@@ -178,31 +209,118 @@ def plot_fission_contribution(simulation_dir, simulation_name):
     print(f"Graphiques et rapport de synthèse générés pour {simulation_name}")
     return True
 
-def process_all_simulations():
+@timing.timed('render')
+def plot_fission_evolution(simulation_dir, simulation_name, dep_arrays):
     """
-    Traite toutes les simulations pour générer les graphiques de contribution aux fissions
+    Trace l'évolution des contributions aux fissions et aux captures sur tous les pas
+    de burnup, calculées à partir du fichier _dep.m (ADENS, FISSXS, CAPTXS, FLUX).
     """
+    if dep_arrays is None:
+        print(f"Fichier {pipeline.dep_file(simulation_dir)} non trouvé, évolution des contributions non générée.")
+        return False
+
+    fractions = reaction_fractions(dep_arrays)
+    burnup = fractions['burnup']
+    labels = fractions['names'].tolist()
+
+    figures_dir = os.path.join("figures", "fission_rate", simulation_name)
+    os.makedirs(figures_dir, exist_ok=True)
+
+    fig, axes = plt.subplots(2, 1, figsize=(12, 10), sharex=True)
+    for ax, reaction, title in zip(axes, ('fission', 'capture'), ('fissions', 'captures')):
+        shares = fractions[reaction]
+        # Isotopes dépassant 1 % à au moins un pas, les autres sont regroupés
+        major = np.flatnonzero(shares.max(axis=1) >= 0.01)
+        major = major[np.argsort(-shares[major].max(axis=1))]
+        other = shares.sum(axis=0) - shares[major].sum(axis=0)
+        colors = plt.cm.tab20(np.linspace(0, 1, len(major) + 1))
+        ax.stackplot(burnup, *(shares[major] * 100), other * 100,
+                     labels=[labels[i] for i in major] + ['Autres'], colors=colors)
+        ax.set_ylabel(f'Contribution aux {title} (%)', fontsize=12)
+        ax.set_ylim(0, 100)
+        ax.set_title(f'Évolution des contributions aux {title} - {simulation_name}', fontsize=14)
+        ax.legend(loc='center left', bbox_to_anchor=(1.01, 0.5), fontsize=9)
+        ax.xaxis.set_minor_locator(ticker.AutoMinorLocator())
+        ax.grid(True, linestyle='--', alpha=0.7)
+    axes[-1].set_xlabel('Burnup (MWd/kgU)', fontsize=12)
+    with timing.timer('render', 'tight_layout'):
+        plt.tight_layout()
+    profiles.savefig(os.path.join(figures_dir, "fission_evolution.png"))
+    plt.close()
+
+    # Tableau (isotope x pas) des contributions aux fissions
+    df = pd.DataFrame(fractions['fission'].T, columns=labels)
+    df.insert(0, 'Burnup (MWd/kgU)', burnup)
+    df.insert(0, 'Temps (jours)', fractions['days'])
+    df.to_csv(os.path.join(figures_dir, "fission_evolution.csv"), index=False, float_format='%.6e')
+
+    print(f"Évolution des contributions générée pour {simulation_name}")
+    return True
+
+def process_simulation(sim_dir, dep_arrays, fission_data):
+    """
+    Génère les graphiques de contribution aux fissions d'une simulation.
+    Retourne True si le graphique de contribution a été produit.
+    """
+    simulation_name = os.path.basename(sim_dir)
+
+    # Évolution des contributions sur tous les pas de burnup
+    plot_fission_evolution(sim_dir, simulation_name, dep_arrays)
+
+    # Générer le graphique de contribution aux fissions
+    if plot_fission_contribution(sim_dir, simulation_name, fission_data):
+        print(f"Traitement réussi pour {simulation_name}")
+        return True
+    print(f"Échec du traitement pour {simulation_name}")
+    return False
+
+def report(fission_figs):
+    """Bilan des simulations traitées ({sim_dir: succès})."""
+    success_count = sum(bool(result) for result in fission_figs.values())
+    print(f"\nTraitement terminé. {success_count}/{len(fission_figs)} simulations traitées avec succès.")
+
+def register(graph, args):
+    """
+    Ajoute les nœuds de l'analyse au graphe : fractions de fission lues dans le fichier
+    .se.out, figures de chaque simulation (avec dep_arrays) et bilan. Retourne les cibles.
+    """
+    graph.add('fission_data', fission_data)
+
+    # Seules les simulations dont les fichiers de sortie ou le code ont changé sont retraitées
+    builds = manifest.Manifest('fission_rate')
+    def key(sim_dir):
+        return builds.inputs_key(process_simulation, [out_file(sim_dir), pipeline.dep_file(sim_dir)],
+                                 profiles.current())
+    def outputs(sim_dir):
+        figures_dir = os.path.join("figures", "fission_rate", os.path.basename(sim_dir))
+        return [profiles.figure_path(os.path.join(figures_dir, name)) for name in
+                ("fission_contribution.png", "fission_pie_chart.png", "fission_evolution.png")] + \
+               [os.path.join(figures_dir, name) for name in ("summary.txt", "fission_evolution.csv")]
+    graph.add('fission_figs', process_simulation, ['dep_arrays', 'fission_data'],
+              builds=builds, key=key, outputs=outputs)
+    graph.add('fission_report', report, ['fission_figs'], scope='campaign')
+    return ['fission_report']
+
+def main(args):
+    """Contributions aux fissions de toutes les simulations de data/."""
     # Récupérer tous les dossiers de simulation dans data/
-    simulation_dirs = glob.glob("data/MOXEUS_*")
+    simulation_dirs = pipeline.simulation_dirs('data')
     
     if not simulation_dirs:
         print("Aucun dossier de simulation trouvé dans le répertoire data/")
-        exit(1)
-    
-    success_count = 0
-    
-    # Traiter chaque simulation
-    for sim_dir in sorted(simulation_dirs):
-        simulation_name = os.path.basename(sim_dir)
-        
-        # Générer le graphique de contribution aux fissions
-        if plot_fission_contribution(sim_dir, simulation_name):
-            success_count += 1
-            print(f"Traitement réussi pour {simulation_name}")
-        else:
-            print(f"Échec du traitement pour {simulation_name}")
-    
-    print(f"\nTraitement terminé. {success_count}/{len(simulation_dirs)} simulations traitées avec succès.")
+        return
+
+    graph = pipeline.simulation_pipeline()
+    graph.run(register(graph, args), simulation_dirs, args.jobs)
 
 if __name__ == "__main__":
-    process_all_simulations()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Contributions des isotopes aux fissions")
+    cache.add_cache_arguments(parser)
+    manifest.add_manifest_arguments(parser)
+    profiles.add_profile_arguments(parser)
+    parallel.add_jobs_argument(parser)
+    args = parser.parse_args()
+    cache.configure_from_args(args)
+    manifest.configure_from_args(args)
+    profiles.configure_from_args(args)
+    main(args)
@@ -1,53 +1,31 @@
-import matplotlib.pyplot as plt
+import argparse
 import numpy as np
-import re
 import os
-import glob
-from matplotlib.ticker import MaxNLocator, AutoMinorLocator
-from scipy.interpolate import interp1d
+from serpent import cache, lazy, manifest, parallel, pipeline, profiles, timing
 
-def parse_m_file(file_path, var_name):
-    """Extrait un tableau à partir d'un fichier .m en cherchant une variable donnée."""
-    try:
-        with open(file_path, 'r') as f:
-            content = f.read()
-        
-        # Recherche de la variable avec un motif regex
-        pattern = rf"{var_name}\s*=\s*\[(.*?)\];"
-        match = re.search(pattern, content, re.DOTALL)
-        if not match:
-            raise ValueError(f"Variable {var_name} non trouvée dans le fichier.")
-        
-        # Extraire les valeurs et les convertir en liste de flottants
-        values_str = match.group(1)
-        # Supprimer tous les commentaires (% jusqu'à la fin de la ligne)
-        values_str = re.sub(r'%.*$', '', values_str, flags=re.MULTILINE)
-        values = [float(val) for val in values_str.split() if val.strip()]
-        return np.array(values)
-    
-    except FileNotFoundError:
-        print(f"Le fichier {file_path} n'a pas été trouvé.")
-        return None
-    except Exception as e:
-        print(f"Erreur lors du parsing de {var_name} : {e}")
-        return None
+plt = lazy.module('matplotlib.pyplot')
+ticker = lazy.module('matplotlib.ticker')
+interpolate = lazy.module('scipy.interpolate')
 
-def process_simulation(sim_dir):
-    """Traite une simulation et génère le graphique de flux neutronique."""
-    # Construire le chemin vers le fichier .m
+def process_simulation(sim_dir, dep_arrays):
+    """
+    Traite une simulation et génère le graphique de flux neutronique à partir des données
+    de son fichier .m (produit dep_arrays).
+    """
     sim_name = os.path.basename(sim_dir)
-    file_path = os.path.join(sim_dir, f"{sim_name}.se_dep.m")
-    
-    if not os.path.exists(file_path):
-        print(f"Fichier {file_path} non trouvé, simulation ignorée.")
+    if dep_arrays is None:
+        print(f"Fichier {pipeline.dep_file(sim_dir)} non trouvé, simulation ignorée.")
         return False
     
     print(f"Traitement de la simulation {sim_name}...")
     
     # Extraire les données
-    days = parse_m_file(file_path, 'DAYS')
-    flux = parse_m_file(file_path, 'MAT_fuelp1r1_FLUX')
-    burnup = parse_m_file(file_path, 'BU')  # Burnup pour l'axe secondaire
+    data = dep_arrays
+    days = data.days
+    # Flux du premier matériau du fichier, quel que soit son nom
+    material = next(iter(data.materials), None)
+    flux = data.mat('FLUX', material) if material is not None and 'FLUX' in data.materials[material] else None
+    burnup = data.bu  # Burnup pour l'axe secondaire
     
     # Vérifier que les données ont été correctement extraites
     if days is None or flux is None:
@@ -62,7 +40,7 @@ def process_simulation(sim_dir):
     
     # Vérifier la compatibilité des longueurs
     if len(days) != len(flux):
-        print(f"Erreur : DAYS ({len(days)} points) et MAT_fuelp1r1_FLUX ({len(flux)} points) n'ont pas la même longueur pour {sim_name}.")
+        print(f"Erreur : DAYS ({len(days)} points) et MAT_{material}_FLUX ({len(flux)} points) n'ont pas la même longueur pour {sim_name}.")
         return False
     
     # Calculer les statistiques
@@ -95,10 +73,10 @@ def process_simulation(sim_dir):
     ax1.set_xticklabels([f'{t:.1f}' for t in time_ticks])
     
     # Configuration de l'axe y principal
-    ax1.yaxis.set_major_locator(MaxNLocator(15))
-    ax1.yaxis.set_minor_locator(AutoMinorLocator(5))
+    ax1.yaxis.set_major_locator(ticker.MaxNLocator(15))
+    ax1.yaxis.set_minor_locator(ticker.AutoMinorLocator(5))
     ax1.grid(True, which='major', linestyle='--', alpha=0.7)
-    ax1.grid(True, which='minor', linestyle=':', alpha=0.4)
+    profiles.minor_grid(ax1, linestyle=':', alpha=0.4)
     
     ax1.set_xlabel('Temps (jours)')
     ax1.set_ylabel('Flux neutronique')
@@ -119,7 +97,7 @@ def process_simulation(sim_dir):
         ax3.set_xlim(ax1.get_xlim())
         
         # Créer une fonction d'interpolation pour le burnup
-        burnup_interp = interp1d(days, burnup, bounds_error=False, fill_value="extrapolate")
+        burnup_interp = interpolate.interp1d(days, burnup, bounds_error=False, fill_value="extrapolate")
         
         # Calculer les valeurs de burnup correspondant aux ticks du temps
         burnup_ticks_values = burnup_interp(time_ticks)
@@ -138,7 +116,8 @@ def process_simulation(sim_dir):
     ax1.legend(lines1 + lines2, labels1 + labels2, loc='best')
 
     # Ajuster les marges et sauvegarder
-    plt.tight_layout()
+    with timing.timer('render', 'tight_layout'):
+        plt.tight_layout()
     
     # Créer le dossier de sauvegarde s'il n'existe pas
     save_dir = 'figures/flow_evolution'
@@ -146,7 +125,7 @@ def process_simulation(sim_dir):
     
     # Sauvegarder la figure
     save_path = os.path.join(save_dir, f'{sim_name}.png')
-    plt.savefig(save_path, dpi=300, bbox_inches='tight')
+    save_path = profiles.savefig(save_path)
     plt.close()  # Fermer la figure pour libérer la mémoire
     
     print(f"Figure sauvegardée sous '{save_path}'.")
@@ -164,39 +143,23 @@ def process_simulation(sim_dir):
     
     return stats
 
-# Trouver tous les dossiers de simulation
-sim_directories = glob.glob('data/MOXEUS_*')
+def write_summary(flow_fig):
+    """Bilan des simulations traitées et résumé des statistiques ({sim_dir: stats})."""
+    all_stats = {os.path.basename(sim_dir): stats for sim_dir, stats in flow_fig.items() if stats}
+    success_count = len(all_stats)
+    failed_count = len(flow_fig) - success_count
 
-if not sim_directories:
-    print("Aucune simulation trouvée dans le dossier 'data/'.")
-else:
-    # Dictionnaire pour stocker les statistiques
-    all_stats = {}
-    
-    # Compter les simulations réussies et échouées
-    success_count = 0
-    failed_count = 0
-    
-    # Traiter chaque simulation
-    for sim_dir in sorted(sim_directories):
-        stats = process_simulation(sim_dir)
-        if stats:
-            all_stats[os.path.basename(sim_dir)] = stats
-            success_count += 1
-        else:
-            failed_count += 1
-    
     # Afficher un résumé
     total = success_count + failed_count
     print(f"\nRésumé: {success_count}/{total} simulations traitées avec succès.")
     if failed_count > 0:
         print(f"{failed_count} simulations n'ont pas pu être traitées correctement.")
-    
+
     # Créer un résumé des statistiques dans un fichier texte
     with open('figures/flow_evolution/summary.txt', 'w') as f:
         f.write("Résumé des statistiques de flux neutronique pour toutes les simulations\n")
         f.write("=" * 65 + "\n\n")
-        
+    
         for sim_name, stats in all_stats.items():
             f.write(f"Simulation: {sim_name}\n")
             f.write(f"  Flux moyen       = {stats['mean']:.5e}\n")
@@ -205,8 +168,48 @@ else:
             f.write(f"  Flux max         = {stats['max']:.5e}\n")
             f.write(f"  Ratio max/min    = {stats['ratio']:.5f}\n")
             f.write(f"  Temps total      = {stats['total_time']:.1f} jours\n")
-            
+        
             if stats['final_burnup'] is not None:
                 f.write(f"  Burnup final     = {stats['final_burnup']:.1f} MWd/kgU\n")
-            
-            f.write("\n")
\ No newline at end of file
+        
+            f.write("\n")
+
+def register(graph, args):
+    """
+    Ajoute les nœuds de l'analyse au graphe : figure de chaque simulation (à partir de
+    dep_arrays) et résumé de toutes les simulations. Retourne les nœuds cibles.
+    """
+    os.makedirs('figures/flow_evolution', exist_ok=True)
+
+    # Seules les simulations dont le fichier .se_dep.m ou le code a changé sont retracées
+    builds = manifest.Manifest('flow_evolution')
+    def key(sim_dir):
+        return builds.inputs_key(process_simulation, [pipeline.dep_file(sim_dir)], profiles.current())
+    def outputs(sim_dir):
+        return [profiles.figure_path(f'figures/flow_evolution/{os.path.basename(sim_dir)}.png')]
+    graph.add('flow_fig', process_simulation, ['dep_arrays'], builds=builds, key=key, outputs=outputs)
+    graph.add('flow_summary', write_summary, ['flow_fig'], scope='campaign')
+    return ['flow_summary']
+
+def main(args):
+    """Trace le flux de toutes les simulations de data/ et écrit le résumé."""
+    # Trouver tous les dossiers de simulation
+    sim_directories = pipeline.simulation_dirs('data')
+
+    if not sim_directories:
+        print("Aucune simulation trouvée dans le dossier 'data/'.")
+        return
+    graph = pipeline.simulation_pipeline()
+    graph.run(register(graph, args), sim_directories, args.jobs)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Évolution du flux neutronique")
+    cache.add_cache_arguments(parser)
+    manifest.add_manifest_arguments(parser)
+    profiles.add_profile_arguments(parser)
+    parallel.add_jobs_argument(parser)
+    args = parser.parse_args()
+    cache.configure_from_args(args)
+    manifest.configure_from_args(args)
+    profiles.configure_from_args(args)
+    main(args)
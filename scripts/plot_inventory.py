@@ -1,87 +1,14 @@
+import argparse
 import numpy as np
-import matplotlib.pyplot as plt
-import re
 import os
-import glob
-from matplotlib.ticker import MaxNLocator, AutoMinorLocator
-from scipy.interpolate import interp1d
-import pandas as pd
-import seaborn as sns
+from functools import partial
+from serpent import cache, lazy, manifest, parallel, pipeline, profiles, render, timing
 
-# Fonction pour nettoyer une ligne en supprimant les commentaires
-def clean_line(line):
-    return line.split('%')[0].strip()
-
-# Fonction pour parser un tableau MATLAB depuis une chaîne de texte
-def parse_matlab_array(text):
-    cleaned = re.sub(r'[\[\];]', '', text).strip()
-    numbers = [float(x) for x in cleaned.split()]
-    return np.array(numbers)
-
-# Fonction pour parser une matrice MATLAB depuis plusieurs lignes
-def parse_matlab_matrix(lines):
-    matrix = []
-    for line in lines:
-        cleaned = clean_line(line)
-        cleaned = re.sub(r'[\[\];]', '', cleaned)
-        if cleaned:
-            row = [float(x) for x in cleaned.split()]
-            matrix.append(row)
-    return np.array(matrix)
-
-# Lecture du fichier .m avec débogage
-def load_m_file(filename):
-    days = None
-    zai = None
-    adens = None
-    burnup = None
-    adens_lines = []
-    reading_adens = False
-
-    with open(filename, 'r') as f:
-        for line in f:
-            cleaned_line = clean_line(line)
-            if not cleaned_line:
-                continue
-
-            if cleaned_line.startswith('DAYS ='):
-                days = parse_matlab_array(cleaned_line.split('=', 1)[1])
-                print(f"DAYS: {days[:5]}... (length: {len(days)})")
-            elif cleaned_line.startswith('BU ='):
-                burnup = parse_matlab_array(cleaned_line.split('=', 1)[1])
-                print(f"BURNUP: {burnup[:5]}... (length: {len(burnup)})")
-            elif cleaned_line.startswith('ZAI ='):
-                zai_lines = []
-                zai_lines.append(cleaned_line.split('=', 1)[1])
-                for next_line in f:
-                    cleaned_next = clean_line(next_line)
-                    if cleaned_next.endswith(';'):
-                        zai_lines.append(cleaned_next)
-                        break
-                    elif cleaned_next:
-                        zai_lines.append(cleaned_next)
-                zai_text = ' '.join(zai_lines)
-                zai = parse_matlab_array(zai_text)
-                print(f"ZAI: {zai[:5]}... (length: {len(zai)})")
-            elif cleaned_line.startswith('MAT_fuelp1r1_ADENS ='):
-                reading_adens = True
-                adens_lines.append(cleaned_line.split('=', 1)[1])
-            elif reading_adens and ';' in cleaned_line:
-                adens_lines.append(cleaned_line)
-                adens = parse_matlab_matrix(adens_lines)
-                print(f"ADENS shape: {adens.shape}")
-                reading_adens = False
-            elif reading_adens:
-                adens_lines.append(cleaned_line)
-
-    if days is None or zai is None or adens is None:
-        raise ValueError("Erreur : DAYS, ZAI ou ADENS non trouvés dans le fichier.")
-    
-    if burnup is None:
-        print("Burnup non trouvé, l'axe secondaire n'affichera pas cette information.")
-        burnup = days  # Utiliser les jours comme fallback
-    
-    return days, zai, adens, burnup
+plt = lazy.module('matplotlib.pyplot')
+mfigure = lazy.module('matplotlib.figure')
+ticker = lazy.module('matplotlib.ticker')
+pd = lazy.module('pandas')
+sns = lazy.module('seaborn')
 
 # Définition des isotopes avec leurs numéros ZAI
 isotopes = {
@@ -111,23 +38,109 @@ u_isotopes = ['U-234', 'U-235', 'U-236', 'U-238']
 pu_isotopes = ['Pu-238', 'Pu-239', 'Pu-240', 'Pu-241', 'Pu-242']
 ma_isotopes = ['Np-237', 'Np-239', 'Am-241', 'Am-242m', 'Am-243', 'Cm-242', 'Cm-243', 'Cm-244', 'Cm-245', 'Cm-246']
 
+# Modèles de figures des groupes, construits une fois par processus de rendu
+class GroupFigure(render.FigureTemplate):
+    """Isotopes individuels d'un groupe en échelle logarithmique, burnup en axe secondaire."""
+
+    def __init__(self):
+        self.fig = mfigure.Figure(figsize=(12, 8))
+        self.ax = self.fig.add_subplot(111)
+        # Une courbe par isotope, ajoutée au besoin ; les courbes inutilisées sont masquées
+        self.lines = []
+        
+        # Configuration des axes
+        self.ax.set_xlabel('Temps (jours)', fontsize=12)
+        self.ax.set_ylabel('Pourcentage de densité atomique (%)', fontsize=12)
+        self.title = self.ax.set_title('', fontsize=14, pad=15)
+        
+        # Configuration de la grille et graduations
+        self.ax.grid(True, which='major', linestyle='--', alpha=0.7)
+        profiles.minor_grid(self.ax, linestyle=':', alpha=0.4)
+        self.ax.xaxis.set_minor_locator(ticker.AutoMinorLocator(5))
+        
+        # Échelle logarithmique pour mieux voir les isotopes en faible quantité
+        self.ax.set_yscale('log')
+        
+        # Axe secondaire pour le burnup (en haut)
+        self.burnup_ax = self.ax.twiny()
+        self.burnup_ax.set_xlabel('Burnup (MWd/kgU)')
+    
+    def update(self, title, days, curves, burnup):
+        """Met à jour la figure ; curves : {isotope: pourcentages} des isotopes présents."""
+        while len(self.lines) < len(curves):
+            # Couleurs du cycle par défaut, dans l'ordre des isotopes
+            self.lines.append(self.ax.plot([], [], linewidth=2, color=f'C{len(self.lines)}')[0])
+        for line, (isotope, percentage) in zip(self.lines, curves.items()):
+            line.set_data(days, percentage)
+            line.set_label(isotope)
+        for i, line in enumerate(self.lines):
+            line.set_visible(i < len(curves))
+        self.rescale(self.ax)
+        self.set_time_axis(self.ax, self.burnup_ax, days, burnup)
+        self.title.set_text(title)
+        
+        # Légende (le nombre d'entrées dépend du groupe)
+        self.ax.legend(handles=self.lines[:len(curves)], fontsize=10, loc='best')
+        with timing.timer('render', 'tight_layout'):
+            self.fig.tight_layout()
+
+class GroupTotalFigure(render.FigureTemplate):
+    """Total d'un groupe d'isotopes en échelle linéaire, avec ses statistiques."""
+
+    def __init__(self):
+        self.fig = mfigure.Figure(figsize=(12, 8))
+        self.ax = self.fig.add_subplot(111)
+        self.line, = self.ax.plot([], [], linewidth=3, color='red')
+        
+        # Configuration des axes
+        self.ax.set_xlabel('Temps (jours)', fontsize=12)
+        self.ax.set_ylabel('Pourcentage de densité atomique (%)', fontsize=12)
+        self.title = self.ax.set_title('', fontsize=14, pad=15)
+        
+        # Configuration de la grille et graduations
+        self.ax.grid(True, which='major', linestyle='--', alpha=0.7)
+        profiles.minor_grid(self.ax, linestyle=':', alpha=0.4)
+        self.ax.xaxis.set_minor_locator(ticker.AutoMinorLocator(5))
+        self.ax.yaxis.set_major_locator(ticker.MaxNLocator(10))
+        self.ax.yaxis.set_minor_locator(ticker.AutoMinorLocator(5))
+        
+        # Axe secondaire pour le burnup (en haut)
+        self.burnup_ax = self.ax.twiny()
+        self.burnup_ax.set_xlabel('Burnup (MWd/kgU)')
+        
+        # Annotation des statistiques et légende
+        self.annotation = self.ax.annotate('', xy=(0.02, 0.98), xycoords='axes fraction',
+                                           bbox=dict(boxstyle="round,pad=0.3", fc="white", ec="gray", alpha=0.8),
+                                           va='top', ha='left', fontsize=10)
+        self.legend = self.ax.legend(handles=[self.line], labels=[''], fontsize=10, loc='best')
+    
+    def update(self, title, label, days, percentage, burnup, stats_text):
+        self.line.set_data(days, percentage)
+        self.rescale(self.ax)
+        self.set_time_axis(self.ax, self.burnup_ax, days, burnup)
+        self.title.set_text(title)
+        self.annotation.set_text(stats_text)
+        self.legend.get_texts()[0].set_text(label)
+        with timing.timer('render', 'tight_layout'):
+            self.fig.tight_layout()
+
 # Fonction pour tracer un groupe d'isotopes
-def plot_group(group_name, isotope_list, days, zai, adens, total_adens, burnup, output_path, sim_name):
+@timing.timed('render')
+def plot_group(group_name, isotope_list, days, nuclides, adens, total_adens, burnup, output_path, sim_name):
     """Trace l'évolution des isotopes individuels d'un groupe en échelle logarithmique."""
-    fig = plt.figure(figsize=(12, 8))
-    ax = fig.add_subplot(111)
-    
     # Tracking pour statistiques
     max_values = {}
     final_values = {}
     
-    for isotope in isotope_list:
-        zai_num = isotopes[isotope]
-        indices = np.where(zai == zai_num)[0]
-        if len(indices) == 1:
-            index = indices[0]
-            percentage = (adens[index, :] / total_adens) * 100
-            ax.plot(days, percentage, label=isotope, linewidth=2)
+    # Densités de tous les isotopes du groupe en une seule extraction (n_isotopes × n_pas)
+    zai_list = [isotopes[isotope] for isotope in isotope_list]
+    block, found = nuclides.gather(adens, zai_list)
+    percentages = (block / total_adens) * 100
+    
+    curves = {}
+    for isotope, zai_num, percentage, present in zip(isotope_list, zai_list, percentages, found):
+        if present:
+            curves[isotope] = percentage
             
             # Stocker les valeurs max et finales pour les statistiques
             max_values[isotope] = np.max(percentage)
@@ -135,76 +148,20 @@ def plot_group(group_name, isotope_list, days, zai, adens, total_adens, burnup,
         else:
             print(f"Isotope {isotope} (ZAI={zai_num}) non trouvé dans le tableau ZAI.")
     
-    # Configuration des axes
-    ax.set_xlabel('Temps (jours)', fontsize=12)
-    ax.set_ylabel('Pourcentage de densité atomique (%)', fontsize=12)
-    ax.set_title(f'Évolution des isotopes de {group_name} - {sim_name}', fontsize=14, pad=15)
-    
-    # Configuration de la grille et graduations
-    ax.grid(True, which='major', linestyle='--', alpha=0.7)
-    ax.grid(True, which='minor', linestyle=':', alpha=0.4)
-    
-    # Définir le nombre de graduations majeures souhaité
-    n_ticks = 10
-    
-    # Créer une échelle régulière pour le temps
-    min_time = min(days)
-    max_time = max(days)
-    time_ticks = np.linspace(min_time, max_time, n_ticks)
-    
-    # Configurer l'axe du temps avec ces graduations
-    ax.set_xticks(time_ticks)
-    ax.set_xticklabels([f'{t:.1f}' for t in time_ticks])
-    
-    ax.xaxis.set_minor_locator(AutoMinorLocator(5))
-    
-    # Échelle logarithmique pour mieux voir les isotopes en faible quantité
-    ax.set_yscale('log')
-    
-    # Axe secondaire pour le burnup (en haut)
-    ax3 = ax.twiny()
-    ax3.set_xlim(ax.get_xlim())
-    
-    # Créer une fonction d'interpolation pour le burnup
-    burnup_interp = interp1d(days, burnup, bounds_error=False, fill_value="extrapolate")
-    
-    # Calculer les valeurs de burnup correspondant aux ticks du temps
-    burnup_ticks_values = burnup_interp(time_ticks)
-    
-    # Configurer l'axe du burnup
-    ax3.set_xticks(time_ticks)
-    ax3.set_xticklabels([f'{b:.1f}' for b in burnup_ticks_values])
-    ax3.set_xlabel('Burnup (MWd/kgU)')
-    
-    # Légende
-    ax.legend(fontsize=10, loc='best')
-    
-    # Ajustement et sauvegarde
-    plt.tight_layout()
-    plt.savefig(output_path, dpi=300, bbox_inches='tight')
-    plt.close()
+    # Tracé dans le modèle de figure du processus (seules les données changent) et sauvegarde
+    figure = render.template(GroupFigure)
+    figure.update(f'Évolution des isotopes de {group_name} - {sim_name}', days, curves, burnup)
+    figure.save(output_path)
     
     return {'max_values': max_values, 'final_values': final_values}
 
 # Fonction pour tracer le total d'un groupe d'isotopes
-def plot_group_total(group_name, isotope_list, days, zai, adens, total_adens, burnup, output_path, sim_name):
+@timing.timed('render')
+def plot_group_total(group_name, isotope_list, days, nuclides, adens, total_adens, burnup, output_path, sim_name):
     """Trace l'évolution du total d'un groupe d'isotopes en échelle linéaire."""
-    fig = plt.figure(figsize=(12, 8))
-    ax = fig.add_subplot(111)
-    
     # Calcul de la somme des densités atomiques pour tous les isotopes du groupe
-    group_total_percentage = np.zeros_like(days)
-    for isotope in isotope_list:
-        zai_num = isotopes[isotope]
-        indices = np.where(zai == zai_num)[0]
-        if len(indices) == 1:
-            index = indices[0]
-            percentage = (adens[index, :] / total_adens) * 100
-            group_total_percentage += percentage
-    
-    # Tracer la courbe totale
-    ax.plot(days, group_total_percentage, linewidth=3, color='red', 
-            label=f'Total {group_name}')
+    block, found = nuclides.gather(adens, [isotopes[isotope] for isotope in isotope_list])
+    group_total_percentage = ((block[found] / total_adens) * 100).sum(axis=0)
     
     # Calculer les statistiques
     max_value = np.max(group_total_percentage)
@@ -212,63 +169,17 @@ def plot_group_total(group_name, isotope_list, days, zai, adens, total_adens, bu
     mean_value = np.mean(group_total_percentage)
     final_value = group_total_percentage[-1]
     
-    # Configuration des axes
-    ax.set_xlabel('Temps (jours)', fontsize=12)
-    ax.set_ylabel('Pourcentage de densité atomique (%)', fontsize=12)
-    ax.set_title(f'Évolution du {group_name} total - {sim_name}', fontsize=14, pad=15)
-    
-    # Configuration de la grille et graduations
-    ax.grid(True, which='major', linestyle='--', alpha=0.7)
-    ax.grid(True, which='minor', linestyle=':', alpha=0.4)
-    
-    # Définir le nombre de graduations majeures souhaité
-    n_ticks = 10
-    
-    # Créer une échelle régulière pour le temps
-    min_time = min(days)
-    max_time = max(days)
-    time_ticks = np.linspace(min_time, max_time, n_ticks)
-    
-    # Configurer l'axe du temps avec ces graduations
-    ax.set_xticks(time_ticks)
-    ax.set_xticklabels([f'{t:.1f}' for t in time_ticks])
-    
-    ax.xaxis.set_minor_locator(AutoMinorLocator(5))
-    ax.yaxis.set_major_locator(MaxNLocator(10))
-    ax.yaxis.set_minor_locator(AutoMinorLocator(5))
-    
-    # Axe secondaire pour le burnup (en haut)
-    ax3 = ax.twiny()
-    ax3.set_xlim(ax.get_xlim())
-    
-    # Créer une fonction d'interpolation pour le burnup
-    burnup_interp = interp1d(days, burnup, bounds_error=False, fill_value="extrapolate")
-    
-    # Calculer les valeurs de burnup correspondant aux ticks du temps
-    burnup_ticks_values = burnup_interp(time_ticks)
-    
-    # Configurer l'axe du burnup
-    ax3.set_xticks(time_ticks)
-    ax3.set_xticklabels([f'{b:.1f}' for b in burnup_ticks_values])
-    ax3.set_xlabel('Burnup (MWd/kgU)')
-    
-    # Ajouter une annotation avec les statistiques
+    # Annotation avec les statistiques
     stats_text = (f"Min: {min_value:.2f}%\n"
                  f"Max: {max_value:.2f}%\n"
                  f"Moy: {mean_value:.2f}%\n"
                  f"Final: {final_value:.2f}%")
     
-    ax.annotate(stats_text, xy=(0.02, 0.98), xycoords='axes fraction', 
-                bbox=dict(boxstyle="round,pad=0.3", fc="white", ec="gray", alpha=0.8),
-                va='top', ha='left', fontsize=10)
-    
-    # Légende
-    ax.legend(fontsize=10, loc='best')
-    
-    # Ajustement et sauvegarde
-    plt.tight_layout()
-    plt.savefig(output_path, dpi=300, bbox_inches='tight')
-    plt.close()
+    # Tracé dans le modèle de figure du processus (seules les données changent) et sauvegarde
+    figure = render.template(GroupTotalFigure)
+    figure.update(f'Évolution du {group_name} total - {sim_name}', f'Total {group_name}',
+                  days, group_total_percentage, burnup, stats_text)
+    figure.save(output_path)
     
     return {
         'min': min_value,
@@ -277,58 +188,54 @@ def plot_group_total(group_name, isotope_list, days, zai, adens, total_adens, bu
         'final': final_value
     }
 
-def process_simulation(sim_dir):
-    """Traite une simulation et génère tous les graphiques associés."""
+def process_simulation(sim_dir, inventory_arrays):
+    """
+    Trace tous les graphiques d'une simulation à partir de ses inventaires (produit
+    inventory_arrays) et écrit son résumé. Retourne ses statistiques, ou None.
+    """
     sim_name = os.path.basename(sim_dir)
     print(f"\nTraitement de la simulation {sim_name}")
     
+    if inventory_arrays is None:
+        print(f"Aucun fichier .se_dep.m exploitable dans {sim_dir}")
+        return None
+    
     # Création du dossier de sortie pour cette simulation
     output_dir = os.path.join('figures/inventory', sim_name)
     os.makedirs(output_dir, exist_ok=True)
     
-    # Recherche du fichier .m
-    m_files = glob.glob(os.path.join(sim_dir, '*.se_dep.m'))
-    if not m_files:
-        print(f"Aucun fichier .se_dep.m trouvé dans {sim_dir}")
-        return None
-    
-    # Chargement des données
-    days, zai, adens, burnup = load_m_file(m_files[0])
+    days, nuclides, adens, burnup = inventory_arrays
     
     # Calcul du total
     total_adens = np.sum(adens[:-2, :], axis=0)  # Exclut 'lost' et 'total'
     
-    # Dictionnaire pour stocker les statistiques
-    stats = {}
+    # Tracé d'un groupe dans le modèle de figure du processus
+    def plot(plot_function, group_name, isotope_list, filename):
+        output_path = os.path.join(output_dir, filename)
+        return plot_function(group_name, isotope_list, days, nuclides, adens, total_adens, burnup,
+                             output_path, sim_name)
     
     # Tracé pour chaque groupe
-    stats['uranium'] = plot_group('Uranium', u_isotopes, days, zai, adens, total_adens, burnup, 
-                                os.path.join(output_dir, 'uranium.png'), sim_name)
-    
-    stats['plutonium'] = plot_group('Plutonium', pu_isotopes, days, zai, adens, total_adens, burnup, 
-                                  os.path.join(output_dir, 'plutonium.png'), sim_name)
-    
-    stats['actinides_mineurs'] = plot_group('Actinides mineurs', ma_isotopes, days, zai, adens, total_adens, burnup, 
-                                          os.path.join(output_dir, 'actinides_mineurs.png'), sim_name)
-    
-    # Tracé du plutonium total
-    stats['plutonium_total'] = plot_group_total('Plutonium', pu_isotopes, days, zai, adens, total_adens, burnup,
-                                              os.path.join(output_dir, 'plutonium_total.png'), sim_name)
+    stats = {}
+    stats['uranium'] = plot(plot_group, 'Uranium', u_isotopes, 'uranium.png')
+    stats['plutonium'] = plot(plot_group, 'Plutonium', pu_isotopes, 'plutonium.png')
+    stats['actinides_mineurs'] = plot(plot_group, 'Actinides mineurs', ma_isotopes, 'actinides_mineurs.png')
     
-    # Tracé de l'uranium total
-    stats['uranium_total'] = plot_group_total('Uranium', u_isotopes, days, zai, adens, total_adens, burnup,
-                                            os.path.join(output_dir, 'uranium_total.png'), sim_name)
+    # Tracé des totaux du plutonium, de l'uranium et des actinides mineurs
+    stats['plutonium_total'] = plot(plot_group_total, 'Plutonium', pu_isotopes, 'plutonium_total.png')
+    stats['uranium_total'] = plot(plot_group_total, 'Uranium', u_isotopes, 'uranium_total.png')
+    stats['actinides_mineurs_total'] = plot(plot_group_total, 'Actinides mineurs', ma_isotopes,
+                                            'actinides_mineurs_total.png')
     
-    # Tracé des actinides mineurs totaux
-    stats['actinides_mineurs_total'] = plot_group_total('Actinides mineurs', ma_isotopes, days, zai, adens, total_adens, burnup,
-                                                      os.path.join(output_dir, 'actinides_mineurs_total.png'), sim_name)
+    # Informations générales
+    stats.update({'total_time': max(days), 'final_burnup': max(burnup)})
     
+    write_summary(sim_name, output_dir, stats)
     print(f"Figures sauvegardées dans {output_dir}")
-    
-    # Ajouter des informations générales
-    stats['total_time'] = max(days)
-    stats['final_burnup'] = max(burnup)
-    
+    return stats
+
+def write_summary(sim_name, output_dir, stats):
+    """Crée le fichier summary.txt d'une simulation à partir de ses statistiques."""
     # Création d'un fichier summary.txt pour cette simulation
     summary_path = os.path.join(output_dir, 'summary.txt')
     with open(summary_path, 'w') as f:
@@ -387,9 +294,39 @@ def process_simulation(sim_dir):
             f.write(f"  {isotope:<10} = {value:.6f}%\n")
     
     print(f"Résumé sauvegardé dans {summary_path}")
-    
-    return stats
 
+def campaign_stats(store):
+    """
+    Statistiques utilisées par compare_pu_incineration, calculées pour toutes les
+    simulations à la fois à partir du fichier de campagne, sans tracer de figure.
+    """
+    adens = store.tensor('ADENS')
+    days = store.tensor('DAYS')
+    burnup = store.tensor('BU')
+    percentage = adens / np.nansum(adens, axis=1, keepdims=True) * 100
+    rows, found = store.index.rows(list(isotopes.values()))
+    present = {isotope: row for isotope, row, ok in zip(isotopes, rows.tolist(), found) if ok}
+
+    all_stats = {}
+    for s, sim_name in enumerate(store.simulations):
+        n_steps = store.metadata[sim_name]['n_steps']
+        stats = {}
+        for key, isotope_list in (('uranium', u_isotopes), ('plutonium', pu_isotopes),
+                                  ('actinides_mineurs', ma_isotopes)):
+            rows = {isotope: present[isotope] for isotope in isotope_list
+                    if isotope in present and not np.isnan(percentage[s, present[isotope], 0])}
+            values = percentage[s, list(rows.values()), :n_steps]
+            stats[key] = {'max_values': dict(zip(rows, values.max(axis=1))),
+                          'final_values': dict(zip(rows, values[:, -1]))}
+            total = values.sum(axis=0)
+            stats[key + '_total'] = {'min': np.min(total), 'max': np.max(total),
+                                     'mean': np.mean(total), 'final': total[-1]}
+        stats['total_time'] = np.max(days[s, :n_steps])
+        stats['final_burnup'] = np.max(burnup[s, :n_steps])
+        all_stats[sim_name] = stats
+    return all_stats
+
+@timing.timed('render')
 def compare_pu_incineration(simulation_stats):
     """Compare plutonium incineration performance across different simulations."""
     if not simulation_stats:
@@ -467,8 +404,9 @@ def compare_pu_incineration(simulation_stats):
     plt.ylabel('Pourcentage de Pu (%)')
     plt.xlabel('Simulation')
     plt.grid(axis='y', linestyle='--', alpha=0.7)
-    plt.tight_layout()
-    plt.savefig('figures/comparison/pu_final_comparison.png', dpi=300)
+    with timing.timer('render', 'tight_layout'):
+        plt.tight_layout()
+    profiles.savefig('figures/comparison/pu_final_comparison.png', tight=False)
     plt.close()
     
     plt.figure(figsize=(12, 8))
@@ -477,8 +415,9 @@ def compare_pu_incineration(simulation_stats):
     plt.ylabel('Réduction (%)')
     plt.xlabel('Simulation')
     plt.grid(axis='y', linestyle='--', alpha=0.7)
-    plt.tight_layout()
-    plt.savefig('figures/comparison/pu_reduction_comparison.png', dpi=300)
+    with timing.timer('render', 'tight_layout'):
+        plt.tight_layout()
+    profiles.savefig('figures/comparison/pu_reduction_comparison.png', tight=False)
     plt.close()
     
     # Nouveau graphique pour le taux d'incinération par unité de burnup
@@ -488,8 +427,9 @@ def compare_pu_incineration(simulation_stats):
     plt.ylabel('Taux (%/MWd/kgU)')
     plt.xlabel('Simulation')
     plt.grid(axis='y', linestyle='--', alpha=0.7)
-    plt.tight_layout()
-    plt.savefig('figures/comparison/pu_incineration_rate.png', dpi=300)
+    with timing.timer('render', 'tight_layout'):
+        plt.tight_layout()
+    profiles.savefig('figures/comparison/pu_incineration_rate.png', tight=False)
     plt.close()
     
     # Nouveau graphique pour l'efficacité de transmutation
@@ -502,8 +442,9 @@ def compare_pu_incineration(simulation_stats):
     plt.ylabel('Ratio Pu/AM')
     plt.xlabel('Simulation')
     plt.grid(axis='y', linestyle='--', alpha=0.7)
-    plt.tight_layout()
-    plt.savefig('figures/comparison/pu_transmutation_efficiency.png', dpi=300)
+    with timing.timer('render', 'tight_layout'):
+        plt.tight_layout()
+    profiles.savefig('figures/comparison/pu_transmutation_efficiency.png', tight=False)
     plt.close()
     
     # Stacked bar chart for isotopic composition
@@ -516,8 +457,9 @@ def compare_pu_incineration(simulation_stats):
     plt.xlabel('Simulation')
     plt.grid(axis='y', linestyle='--', alpha=0.7)
     plt.legend(title='Isotopes')
-    plt.tight_layout()
-    plt.savefig('figures/comparison/pu_isotope_comparison.png', dpi=300)
+    with timing.timer('render', 'tight_layout'):
+        plt.tight_layout()
+    profiles.savefig('figures/comparison/pu_isotope_comparison.png', tight=False)
     plt.close()
     
     # Analyse statistique approfondie
@@ -543,8 +485,9 @@ def compare_pu_incineration(simulation_stats):
         plt.title('Regroupement des simulations par performances similaires')
         plt.xlabel('Simulations')
         plt.ylabel('Distance')
-        plt.tight_layout()
-        plt.savefig('figures/comparison/pu_performance_clustering.png', dpi=300)
+        with timing.timer('render', 'tight_layout'):
+            plt.tight_layout()
+        profiles.savefig('figures/comparison/pu_performance_clustering.png', tight=False)
         plt.close()
         
         # Identifier les clusters
@@ -576,8 +519,9 @@ def compare_pu_incineration(simulation_stats):
     mask = np.triu(np.ones_like(corr_matrix, dtype=bool))
     sns.heatmap(corr_matrix, mask=mask, annot=True, cmap='coolwarm', vmin=-1, vmax=1)
     plt.title('Corrélations entre les différentes métriques de performance')
-    plt.tight_layout()
-    plt.savefig('figures/comparison/pu_metrics_correlation.png', dpi=300)
+    with timing.timer('render', 'tight_layout'):
+        plt.tight_layout()
+    profiles.savefig('figures/comparison/pu_metrics_correlation.png', tight=False)
     plt.close()
     
     # 3. Test statistique pour comparer les top performers
@@ -634,38 +578,94 @@ def compare_pu_incineration(simulation_stats):
         'pu_efficiency': pu_efficiency_df
     }
 
-if __name__ == "__main__":
+def add_arguments(parser):
+    """Options propres à ce script."""
+    parser.add_argument('--compare-only', action='store_true',
+                        help="Comparer les simulations à partir du fichier de campagne, "
+                             "sans retracer les figures de chaque simulation")
+
+def compare_simulations(inventory_figs, builds):
+    """
+    Bilan des simulations traitées ({sim_dir: stats}) et comparaison des performances
+    d'incinération du Pu, refaite seulement si les statistiques ou le code ont changé.
+    """
+    all_stats = {os.path.basename(sim_dir): stats for sim_dir, stats in inventory_figs.items() if stats}
+    success_count = len(all_stats)
+    failed_count = len(inventory_figs) - success_count
+    
+    # Afficher un résumé
+    total = success_count + failed_count
+    print(f"\nRésumé: {success_count}/{total} simulations traitées avec succès.")
+    if failed_count > 0:
+        print(f"{failed_count} simulations n'ont pas pu être traitées correctement.")
+    
+    # Comparer les performances d'incinération du Pu (si une simulation a changé)
+    if success_count > 1:
+        comparison = 'figures/comparison/pu_incineration_summary.txt'
+        key = manifest.digest(compare_pu_incineration, all_stats, profiles.current())
+        if builds.is_current(comparison, key):
+            builds.mark_current(comparison)
+            print("Comparaison des performances d'incinération du Pu à jour")
+        else:
+            compare_pu_incineration(all_stats)
+            builds.record(comparison, key)
+    elif success_count == 1:
+        print("Une seule simulation traitée, la comparaison nécessite au moins deux simulations.")
+    builds.save()
+    print(f"Figures et résumés : {builds.report()}")
+
+def compare_campaign(campaign_store):
+    """Comparaison de l'incinération du Pu à partir du fichier de campagne (--compare-only)."""
+    all_stats = campaign_stats(campaign_store)
+    if len(all_stats) > 1:
+        compare_pu_incineration(all_stats)
+    else:
+        print("La comparaison nécessite au moins deux simulations.")
+
+def register(graph, args):
+    """
+    Ajoute les nœuds de l'analyse au graphe : figures et résumé de chaque simulation (à
+    partir de inventory_arrays) et comparaison de l'incinération du Pu entre toutes les
+    simulations. Avec --compare-only, seulement la comparaison, depuis le fichier de
+    campagne. Retourne les nœuds cibles.
+    """
+    if args.compare_only:
+        graph.add('pu_comparison', compare_campaign, ['campaign_store'], scope='campaign')
+        return ['pu_comparison']
+
+    # Seules les simulations dont le fichier .se_dep.m ou le code a changé sont retracées
+    builds = manifest.Manifest('inventory')
+    def key(sim_dir):
+        return builds.inputs_key(process_simulation, [pipeline.dep_file(sim_dir)], profiles.current())
+    def outputs(sim_dir):
+        output_dir = os.path.join('figures/inventory', os.path.basename(sim_dir))
+        return [profiles.figure_path(os.path.join(output_dir, f'{name}.png')) for name in
+                ('uranium', 'plutonium', 'actinides_mineurs', 'plutonium_total', 'uranium_total',
+                 'actinides_mineurs_total')] + [os.path.join(output_dir, 'summary.txt')]
+    graph.add('inventory_figs', process_simulation, ['inventory_arrays'], builds=builds, key=key, outputs=outputs)
+    graph.add('pu_comparison', partial(compare_simulations, builds=builds), ['inventory_figs'], scope='campaign')
+    return ['pu_comparison']
+
+def main(args):
+    """Inventaires de toutes les simulations de data/ et comparaison de l'incinération du Pu."""
     # Trouver tous les dossiers de simulation
-    simulation_dirs = glob.glob('data/MOXEUS_*')
+    simulation_dirs = pipeline.simulation_dirs('data')
     
     if not simulation_dirs:
         print("Aucune simulation trouvée dans le dossier 'data/'.")
-    else:
-        # Compter les simulations réussies et échouées
-        success_count = 0
-        failed_count = 0
-        
-        # Dictionnaire pour stocker les statistiques de toutes les simulations
-        all_stats = {}
-        
-        # Traiter chaque simulation
-        for sim_dir in sorted(simulation_dirs):
-            sim_name = os.path.basename(sim_dir)
-            stats = process_simulation(sim_dir)
-            if stats:
-                all_stats[sim_name] = stats
-                success_count += 1
-            else:
-                failed_count += 1
-        
-        # Afficher un résumé
-        total = success_count + failed_count
-        print(f"\nRésumé: {success_count}/{total} simulations traitées avec succès.")
-        if failed_count > 0:
-            print(f"{failed_count} simulations n'ont pas pu être traitées correctement.")
-        
-        # Comparer les performances d'incinération du Pu
-        if success_count > 1:
-            compare_pu_incineration(all_stats)
-        elif success_count == 1:
-            print("Une seule simulation traitée, la comparaison nécessite au moins deux simulations.")
\ No newline at end of file
+        return
+    graph = pipeline.simulation_pipeline()
+    graph.run(register(graph, args), simulation_dirs, args.jobs)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Évolution des inventaires isotopiques")
+    cache.add_cache_arguments(parser)
+    manifest.add_manifest_arguments(parser)
+    profiles.add_profile_arguments(parser)
+    parallel.add_jobs_argument(parser)
+    add_arguments(parser)
+    args = parser.parse_args()
+    cache.configure_from_args(args)
+    manifest.configure_from_args(args)
+    profiles.configure_from_args(args)
+    main(args)
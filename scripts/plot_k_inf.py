@@ -1,70 +1,14 @@
-import re
+import argparse
 import os
+from functools import partial
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.ticker import MaxNLocator, AutoMinorLocator
-from scipy.interpolate import interp1d
+from serpent import cache, lazy, manifest, parallel, pipeline, profiles, results, timing
 
-def extract_corrector_data(log_file):
-    """
-    Extrait les données de k_inf (corrector), le temps, le burnup et les erreurs du fichier log.txt.
-    Retourne quatre listes : temps (jours), burnup (MWd/kgU), k_inf, erreurs (en unité de k_eff).
-    """
-    with open(log_file, 'r') as file:
-        lines = file.readlines()
-
-    times = []
-    burnups = []
-    k_infs = []
-    errors = []
-
-    i = 0
-    while i < len(lines):
-        line = lines[i].strip()
-        # Chercher les étapes "corrector"
-        if "Transport calculation: step =" in line and "(corrector)" in line:
-            # Extraire le numéro de l'étape
-            step_match = re.search(r'step = (\d+) / (\d+)', line)
-            if step_match:
-                step_num = int(step_match.group(1))
-                # Trouver la ligne du burnup
-                while i < len(lines):
-                    i += 1
-                    if "BU   =" in lines[i]:
-                        bu_match = re.search(r'BU   = ([\d.]+) MWd/kgU', lines[i])
-                        if bu_match:
-                            burnup = float(bu_match.group(1))
-                            break
-                # Trouver la ligne du temps
-                while i < len(lines):
-                    i += 1
-                    if "time =" in lines[i]:
-                        time_match = re.search(r'time = ([\d.]+) days', lines[i])
-                        if time_match:
-                            time = float(time_match.group(1))
-                            break
-                # Trouver la dernière ligne k-eff (implicit) pour cette étape
-                k_inf_line = None
-                while i < len(lines):
-                    i += 1
-                    if "k-eff (implicit) =" in lines[i]:
-                        k_inf_line = lines[i]
-                    elif "Finished after" in lines[i]:
-                        break
-                if k_inf_line:
-                    # Extraire k_inf et l'erreur
-                    k_inf_match = re.search(r'k-eff \(implicit\) = ([\d.]+) \+/- ([\d.]+)', k_inf_line)
-                    if k_inf_match:
-                        k_inf = float(k_inf_match.group(1))
-                        error = float(k_inf_match.group(2))
-                        times.append(time)
-                        burnups.append(burnup)
-                        k_infs.append(k_inf)
-                        errors.append(error)
-        i += 1
-
-    return times, burnups, k_infs, errors
+plt = lazy.module('matplotlib.pyplot')
+ticker = lazy.module('matplotlib.ticker')
+interpolate = lazy.module('scipy.interpolate')
 
+@timing.timed('render')
 def plot_k_inf_evolution(times, burnups, k_infs, errors, sim_name):
     """
     Trace l'évolution de k_inf avec le temps en bas et le burnup en haut.
@@ -106,10 +50,10 @@ def plot_k_inf_evolution(times, burnups, k_infs, errors, sim_name):
     ax1.set_xticklabels([f'{t:.1f}' for t in time_ticks])
     
     # Configuration de l'axe y principal
-    ax1.yaxis.set_major_locator(MaxNLocator(15))
-    ax1.yaxis.set_minor_locator(AutoMinorLocator(5))
+    ax1.yaxis.set_major_locator(ticker.MaxNLocator(15))
+    ax1.yaxis.set_minor_locator(ticker.AutoMinorLocator(5))
     ax1.grid(True, which='major', linestyle='--', alpha=0.7)
-    ax1.grid(True, which='minor', linestyle=':', alpha=0.4)
+    profiles.minor_grid(ax1, linestyle=':', alpha=0.4)
     
     ax1.set_xlabel('Temps (jours)')
     ax1.set_ylabel(r'$k_{\infty}$')
@@ -126,7 +70,7 @@ def plot_k_inf_evolution(times, burnups, k_infs, errors, sim_name):
     ax3.set_xlim(ax1.get_xlim())
     
     # Créer une fonction d'interpolation pour le burnup
-    burnup_interp = interp1d(times, burnups, bounds_error=False, fill_value="extrapolate")
+    burnup_interp = interpolate.interp1d(times, burnups, bounds_error=False, fill_value="extrapolate")
     
     # Calculer les valeurs de burnup correspondant exactement aux ticks du temps
     burnup_ticks_values = burnup_interp(time_ticks)
@@ -145,8 +89,9 @@ def plot_k_inf_evolution(times, burnups, k_infs, errors, sim_name):
     ax1.legend(lines1 + lines2, labels1 + labels2, loc='upper right')
 
     # Ajuster les marges et sauvegarder
-    plt.tight_layout()
-    plt.savefig(f'figures/k_inf/{sim_name}.png', dpi=300, bbox_inches='tight')
+    with timing.timer('render', 'tight_layout'):
+        plt.tight_layout()
+    profiles.savefig(f'figures/k_inf/{sim_name}.png')
     plt.close()
 
     # Retourner les statistiques pour un éventuel usage ultérieur
@@ -162,45 +107,39 @@ def plot_k_inf_evolution(times, burnups, k_infs, errors, sim_name):
         'final_burnup': final_burnup
     }
 
-if __name__ == "__main__":
-    # Trouver tous les fichiers log.txt dans data/
-    data_dir = "data"
-    print(f"Recherche des fichiers log.txt dans {data_dir}/...")
-    simulation_dirs = [d for d in os.listdir(data_dir) if os.path.isdir(os.path.join(data_dir, d))]
-    simulation_dirs.sort()  # Trier les répertoires pour un traitement ordonné
-    print(f"Nombre de répertoires trouvés : {len(simulation_dirs)}")
-    
-    # Créer le dossier de sortie s'il n'existe pas
-    os.makedirs('figures/k_inf', exist_ok=True)
-    
-    # Dictionnaire pour stocker les statistiques de toutes les simulations
-    all_stats = {}
-    
-    for sim_dir in simulation_dirs:
-        log_file = os.path.join(data_dir, sim_dir, 'log.txt')
-        print(f"Vérification de {log_file}...")
-        if os.path.exists(log_file):
-            print(f"Traitement de {sim_dir}...")
-            
-            # Extraire les données
-            times, burnups, k_infs, errors = extract_corrector_data(log_file)
-            print(f"Données extraites : {len(times)} points")
-            
-            # Tracer et sauvegarder le graphique
-            stats = plot_k_inf_evolution(times, burnups, k_infs, errors, sim_dir)
-            all_stats[sim_dir] = stats
-            print(f"Figure sauvegardée dans figures/k_inf/{sim_dir}.png")
-            print(f"k_inf moyen = {stats['mean']:.5f} ± {stats['std']:.5f}")
-            print(f"Burnup final = {stats['final_burnup']:.1f} MWd/kgU")
-        else:
-            print(f"Fichier log.txt non trouvé dans {sim_dir}")
-    
-    # Créer un résumé des statistiques dans un fichier texte
+def process_simulation(sim_dir, kinf_series, source='log'):
+    """
+    Trace k_inf pour une simulation à partir de ses séries (produit kinf_series) et
+    retourne ses statistiques, ou None si le fichier source n'existe pas.
+    """
+    sim_name = os.path.basename(sim_dir)
+    if kinf_series is None:
+        source_name = 'log.txt' if source == 'log' else '.se_res.m'
+        print(f"Fichier {source_name} non trouvé dans {sim_name}")
+        return None
+
+    print(f"Traitement de {sim_name}...")
+
+    # Données extraites (une seule lecture pour toutes les analyses)
+    times, burnups, k_infs, errors = kinf_series
+    print(f"Données extraites : {len(times)} points")
+
+    # Tracer et sauvegarder le graphique
+    stats = plot_k_inf_evolution(times, burnups, k_infs, errors, sim_name)
+    print(f"Figure sauvegardée dans {profiles.figure_path(f'figures/k_inf/{sim_name}.png')}")
+    print(f"k_inf moyen = {stats['mean']:.5f} ± {stats['std']:.5f}")
+    print(f"Burnup final = {stats['final_burnup']:.1f} MWd/kgU")
+    return stats
+
+def write_summary(k_inf_fig):
+    """Crée le résumé des statistiques de toutes les simulations ({sim_dir: stats})."""
     with open('figures/k_inf/summary.txt', 'w') as f:
         f.write("Résumé des statistiques de criticité pour toutes les simulations\n")
         f.write("=" * 50 + "\n\n")
-        for sim_dir, stats in all_stats.items():
-            f.write(f"Simulation: {sim_dir}\n")
+        for sim_dir, stats in k_inf_fig.items():
+            if not stats:
+                continue
+            f.write(f"Simulation: {os.path.basename(sim_dir)}\n")
             f.write(f"  k_inf moyen      = {stats['mean']:.5f}\n")
             f.write(f"  Écart-type       = {stats['std']:.5f}\n")
             f.write(f"  k_inf min        = {stats['min']:.5f}\n")
@@ -210,4 +149,48 @@ if __name__ == "__main__":
             f.write(f"  Erreur max       = {stats['error_max']:.1f} pcm\n")
             f.write(f"  Temps total      = {stats['total_time']:.1f} jours\n")
             f.write(f"  Burnup final     = {stats['final_burnup']:.1f} MWd/kgU\n")
-            f.write("\n")
\ No newline at end of file
+            f.write("\n")
+
+def register(graph, args):
+    """
+    Ajoute les nœuds de l'analyse au graphe : figure de chaque simulation (à partir de
+    kinf_series) et résumé de toutes les simulations. Retourne les nœuds cibles.
+    """
+    # Créer le dossier de sortie s'il n'existe pas
+    os.makedirs('figures/k_inf', exist_ok=True)
+
+    # Seules les simulations dont la source ou le code a changé sont retracées
+    process = partial(process_simulation, source=args.source)
+    builds = manifest.Manifest('k_inf')
+    def key(sim_dir):
+        kinf_file = results.kinf_source_file(sim_dir, args.source)
+        return builds.inputs_key(process, [kinf_file], profiles.current())
+    def outputs(sim_dir):
+        return [profiles.figure_path(f'figures/k_inf/{os.path.basename(sim_dir)}.png')]
+    graph.add('k_inf_fig', process, ['kinf_series'], builds=builds, key=key, outputs=outputs)
+    graph.add('k_inf_summary', write_summary, ['k_inf_fig'], scope='campaign')
+    return ['k_inf_summary']
+
+def main(args):
+    """Trace k_inf pour toutes les simulations de data/ et écrit le résumé."""
+    # Trouver tous les dossiers de simulation dans data/
+    source_name = 'log.txt' if args.source == 'log' else '.se_res.m'
+    print(f"Recherche des fichiers {source_name} dans data/...")
+    simulation_dirs = pipeline.simulation_dirs('data')
+    print(f"Nombre de répertoires trouvés : {len(simulation_dirs)}")
+
+    graph = pipeline.simulation_pipeline(args.source)
+    graph.run(register(graph, args), simulation_dirs, args.jobs)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Évolution de k_inf pour chaque simulation")
+    cache.add_cache_arguments(parser)
+    manifest.add_manifest_arguments(parser)
+    profiles.add_profile_arguments(parser)
+    results.add_kinf_source_argument(parser)
+    parallel.add_jobs_argument(parser)
+    args = parser.parse_args()
+    cache.configure_from_args(args)
+    manifest.configure_from_args(args)
+    profiles.configure_from_args(args)
+    main(args)
@@ -0,0 +1,4 @@
+from .deck import DeckParameters, load_deck_index, read_deck
+from .depletion import DepletionData, load_dep_file, read_dep_file
+from .logfile import StepRecord, extract_corrector_data, iter_steps, load_corrector_data
+from .results import LazyResults, ResultsData, load_res_file, open_res_file, read_res_file
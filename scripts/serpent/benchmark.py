@@ -0,0 +1,276 @@
+"""
+Mesures de performance des lecteurs partagés.
+
+Utilisation (depuis le dossier scripts/) :
+    python -m serpent.benchmark dep
+    python -m serpent.benchmark log
+    python -m serpent.benchmark res
+    python -m serpent.benchmark imports
+"""
+import glob
+import os
+import re
+import subprocess
+import sys
+import time
+import numpy as np
+
+from . import depletion
+from .depletion import MATERIAL_QUANTITIES, decode_matrix, read_dep_file, split_block
+from .logfile import build_step_index, extract_corrector_data, iter_steps, read_step
+from .results import LazyResults, build_res_index, load_res_index, read_res_file
+
+
+def _legacy_parse_matrix(lines):
+    """Conversion ligne par ligne de l'ancien parse_matlab_matrix (référence)."""
+    matrix = []
+    for line in lines:
+        cleaned = line.split('%')[0].strip()
+        cleaned = re.sub(r'[\[\];]', '', cleaned)
+        if cleaned:
+            matrix.append([float(x) for x in cleaned.split()])
+    return np.array(matrix)
+
+
+def _material_blocks(path):
+    """Retourne le contenu brut (bytes) des 11 matrices MAT_* d'un fichier .se_dep.m."""
+    with open(path, 'rb') as f:
+        content = f.read()
+    pattern = rb'MAT_\w+_(?:' + '|'.join(MATERIAL_QUANTITIES).encode() + rb')\s*=\s*\[(.*?)\];'
+    return re.findall(pattern, content, re.DOTALL)
+
+
+def _decode_block(block):
+    rows, _ = split_block(block)
+    return decode_matrix(rows)
+
+
+def _decode_stages(blocks, repeat):
+    """
+    Durée (meilleure de repeat) de chaque étape du décodage en bloc sur toutes les
+    matrices, chaque étape mesurée seule sur les entrées préparées par la précédente :
+    mêmes opérations que split_block et depletion._decode_fixed_width.
+    """
+    split = [split_block(block)[0] for block in blocks]
+    raws = [b''.join(rows) for rows in split]
+    pairs = [np.frombuffer(raw, dtype='<u2').reshape(-1, 6) for raw in raws]
+
+    def gather(p):
+        mantissa = (depletion._LEAD[p[:, 0]] + depletion._DOT[p[:, 1]]
+                    + depletion._PAIR_HUNDREDS[p[:, 2]] + depletion._PAIR[p[:, 3]])
+        return mantissa, depletion._EXP_SIGN[p[:, 4]] * depletion._PAIR[p[:, 5]] + 99
+    gathered = [gather(p) for p in pairs]
+
+    def scale(item):
+        mantissa, index = item
+        values = mantissa * depletion._MULTIPLY[index] / depletion._DIVIDE[index]
+        return np.isnan(values).any()
+
+    return {
+        'lignes et commentaires (split_block)': _best_time(split_block, blocks, repeat),
+        'assemblage (join, frombuffer)': _best_time(
+            lambda rows: np.frombuffer(b''.join(rows), dtype='<u2').reshape(-1, 6), split, repeat),
+        'tables mantisse / exposant': _best_time(gather, pairs, repeat),
+        'mise à l\'échelle (10^e)': _best_time(scale, gathered, repeat),
+    }
+
+
+def _legacy_extract_corrector_data(log_file):
+    """Ancien extract_corrector_data (readlines + boucles while imbriquées), pour référence."""
+    with open(log_file, 'r') as file:
+        lines = file.readlines()
+
+    times, burnups, k_infs, errors = [], [], [], []
+    i = 0
+    while i < len(lines):
+        line = lines[i].strip()
+        if "Transport calculation: step =" in line and "(corrector)" in line:
+            if re.search(r'step = (\d+) / (\d+)', line):
+                while i < len(lines):
+                    i += 1
+                    if "BU   =" in lines[i]:
+                        bu_match = re.search(r'BU   = ([\d.]+) MWd/kgU', lines[i])
+                        if bu_match:
+                            burnup = float(bu_match.group(1))
+                            break
+                while i < len(lines):
+                    i += 1
+                    if "time =" in lines[i]:
+                        time_match = re.search(r'time = ([\d.]+) days', lines[i])
+                        if time_match:
+                            time = float(time_match.group(1))
+                            break
+                k_inf_line = None
+                while i < len(lines):
+                    i += 1
+                    if "k-eff (implicit) =" in lines[i]:
+                        k_inf_line = lines[i]
+                    elif "Finished after" in lines[i]:
+                        break
+                if k_inf_line:
+                    k_inf_match = re.search(r'k-eff \(implicit\) = ([\d.]+) \+/- ([\d.]+)', k_inf_line)
+                    if k_inf_match:
+                        times.append(time)
+                        burnups.append(burnup)
+                        k_infs.append(float(k_inf_match.group(1)))
+                        errors.append(float(k_inf_match.group(2)))
+        i += 1
+    return times, burnups, k_infs, errors
+
+
+def _best_time(func, inputs, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in inputs:
+            func(item)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def benchmark_dep(data_dir='../data', repeat=5):
+    """Compare le décodage en bloc à la conversion ligne par ligne sur tous les fichiers _dep.m."""
+    files = sorted(glob.glob(f'{data_dir}/MOXEUS_*/*.se_dep.m'))
+    if not files:
+        print(f"Aucun fichier .se_dep.m trouvé dans {data_dir}/")
+        return None
+
+    blocks = [block for path in files for block in _material_blocks(path)]
+    split_blocks = [block.decode().split('\n') for block in blocks]
+
+    # Vérification préalable : les deux méthodes doivent donner exactement les mêmes valeurs
+    for block, lines in zip(blocks, split_blocks):
+        legacy = _legacy_parse_matrix(lines)
+        decoded = _decode_block(block)
+        if not np.array_equal(legacy.reshape(decoded.shape), decoded):
+            raise AssertionError("Résultats différents entre l'ancien et le nouveau décodeur")
+
+    timings = {
+        'ligne par ligne': _best_time(_legacy_parse_matrix, split_blocks, repeat),
+        'bloc (NumPy)': _best_time(_decode_block, blocks, repeat),
+    }
+    full_read = _best_time(read_dep_file, files, repeat)
+
+    print(f"{len(files)} fichiers, {len(blocks)} matrices MAT_*")
+    for label, seconds in timings.items():
+        print(f"  {label:<16} : {seconds * 1e3:8.1f} ms ({seconds * 1e3 / len(files):.2f} ms/fichier)")
+    print(f"  Accélération     : x{timings['ligne par ligne'] / timings['bloc (NumPy)']:.1f}")
+    print(f"  read_dep_file    : {full_read * 1e3:8.1f} ms ({full_read * 1e3 / len(files):.2f} ms/fichier, fichier complet)")
+
+    # Répartition du temps restant : étapes du décodage en bloc, puis reste de read_dep_file
+    stages = _decode_stages(blocks, repeat)
+    stages['contrôles de validité, appels'] = max(timings['bloc (NumPy)'] - sum(stages.values()), 0.0)
+    stages['reste de read_dep_file (lecture, blocs, NAMES)'] = max(full_read - timings['bloc (NumPy)'], 0.0)
+    print("Répartition (read_dep_file complet) :")
+    for label, seconds in stages.items():
+        print(f"  {label:<46} : {seconds * 1e3 / len(files):5.2f} ms/fichier ({100 * seconds / full_read:3.0f} %)")
+    timings.update(stages)
+    return timings
+
+
+def benchmark_log(data_dir='../data', repeat=3):
+    """Débit (Mo/s) de l'ancien et du nouveau lecteur de log.txt sur toutes les simulations."""
+    files = sorted(glob.glob(f'{data_dir}/MOXEUS_*/log.txt'))
+    if not files:
+        print(f"Aucun fichier log.txt trouvé dans {data_dir}/")
+        return None
+
+    for path in files:
+        if _legacy_extract_corrector_data(path) != extract_corrector_data(path):
+            raise AssertionError(f"Résultats différents entre l'ancien et le nouveau lecteur pour {path}")
+
+    size_mb = sum(os.path.getsize(path) for path in files) / 1e6
+    timings = {
+        'readlines + re': _best_time(_legacy_extract_corrector_data, files, repeat),
+        'iter_steps': _best_time(lambda path: sum(1 for _ in iter_steps(path)), files, repeat),
+        'index (mmap)': _best_time(build_step_index, files, repeat),
+    }
+    indexes = [(path, build_step_index(path)) for path in files]
+    query = _best_time(lambda item: read_step(item[0], 40, index=item[1]), indexes, repeat)
+
+    print(f"{len(files)} fichiers log.txt, {size_mb:.1f} Mo")
+    for label, seconds in timings.items():
+        print(f"  {label:<16} : {seconds * 1e3:8.1f} ms ({size_mb / seconds:6.1f} Mo/s)")
+    print(f"  Accélération     : x{timings['readlines + re'] / timings['iter_steps']:.1f}")
+    print(f"  read_step (40)   : {query * 1e6 / len(files):8.1f} µs/fichier avec l'index")
+    return timings
+
+
+def benchmark_res(data_dir='../data', variable='ABS_KINF', repeat=3):
+    """Lecture d'une seule variable des fichiers .se_res.m : lecture complète ou par index."""
+    files = sorted(glob.glob(f'{data_dir}/MOXEUS_*/*.se_res.m'))
+    if not files:
+        print(f"Aucun fichier .se_res.m trouvé dans {data_dir}/")
+        return None
+
+    for path in files:
+        if not np.array_equal(read_res_file(path)[variable], LazyResults(path, build_res_index(path))[variable]):
+            raise AssertionError(f"Résultats différents entre lecture complète et index pour {path}")
+        load_res_index(path)
+
+    timings = {
+        'lecture complète': _best_time(lambda path: read_res_file(path)[variable], files, repeat),
+        'index + variable': _best_time(lambda path: LazyResults(path, build_res_index(path))[variable], files, repeat),
+        'index en cache': _best_time(lambda path: LazyResults(path)[variable], files, repeat),
+    }
+
+    print(f"{len(files)} fichiers .se_res.m, variable {variable}")
+    for label, seconds in timings.items():
+        print(f"  {label:<16} : {seconds * 1e3:8.1f} ms ({seconds * 1e3 / len(files):.2f} ms/fichier)")
+    print(f"  Accélération     : x{timings['lecture complète'] / timings['index en cache']:.0f} avec l'index en cache")
+    return timings
+
+
+# Modules dont on mesure le coût d'import : paquet serpent, scripts d'analyse et
+# bibliothèques lourdes chargées au premier usage (voir serpent.lazy)
+IMPORT_MODULES = ['serpent', 'serpent.pipeline', 'serpent.render', 'final_values', 'plot_k_inf',
+                  'plot_inventory', 'plot_cross_sction', 'plot_flow_evolution', 'plot_fission_rate',
+                  'interpretations', 'plot_campaign', 'serpent_analyze',
+                  'matplotlib.pyplot', 'pandas', 'seaborn', 'scipy.interpolate', 'scipy.stats']
+
+_IMPORT_PROBE = """
+import time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+from serpent import lazy
+print(seconds, ','.join(lazy.loaded()))
+"""
+
+
+def benchmark_imports(modules=IMPORT_MODULES, repeat=3):
+    """
+    Coût d'import de chaque module, mesuré dans un nouvel interpréteur (meilleur de
+    repeat essais), et bibliothèques lourdes qu'il charge. À lancer depuis scripts/ ;
+    le détail par module s'obtient avec python -X importtime -c "import <module>".
+    """
+    timings = {}
+    print(f"{'Module':<22} {'Import':>9}   Bibliothèques lourdes chargées")
+    for module in modules:
+        best, heavy = float('inf'), ''
+        for _ in range(repeat):
+            probe = subprocess.run([sys.executable, '-c', _IMPORT_PROBE.format(module=module)],
+                                   capture_output=True, text=True)
+            if probe.returncode != 0:
+                print(f"{module:<22} {'erreur':>9}   {probe.stderr.strip().splitlines()[-1]}")
+                break
+            seconds, _, heavy = probe.stdout.strip().splitlines()[-1].partition(' ')
+            best = min(best, float(seconds))
+        else:
+            timings[module] = best
+            print(f"{module:<22} {best * 1e3:6.0f} ms   {heavy.replace(',', ', ') or '-'}")
+    return timings
+
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else 'dep'
+    if target == 'dep':
+        benchmark_dep()
+    elif target == 'log':
+        benchmark_log()
+    elif target == 'res':
+        benchmark_res()
+    elif target == 'imports':
+        benchmark_imports()
+    else:
+        print(f"Cible de benchmark inconnue : {target}")
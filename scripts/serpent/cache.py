@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import tempfile
+import numpy as np
+
+from . import timing
+
+# Dossier des fichiers cache, créé à côté de chaque fichier source (data/MOXEUS_xxxxx/.cache/)
+CACHE_DIRNAME = '.cache'
+
+# À incrémenter si le format des fichiers cache change
+CACHE_FORMAT = 1
+
+_settings = {'enabled': True, 'rebuild': False}
+
+
+def configure(enabled=True, rebuild=False):
+    """Active/désactive le cache, ou force sa reconstruction (pour le débogage)."""
+    _settings['enabled'] = enabled
+    _settings['rebuild'] = rebuild
+
+
+def add_cache_arguments(parser):
+    """Ajoute les options --no-cache et --rebuild-cache à un argparse.ArgumentParser."""
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Ne pas utiliser le cache binaire (relire les fichiers texte)")
+    parser.add_argument('--rebuild-cache', action='store_true',
+                        help="Reconstruire le cache binaire à partir des fichiers texte")
+
+
+def configure_from_args(args):
+    """Applique les options --no-cache/--rebuild-cache lues par argparse."""
+    configure(enabled=not args.no_cache, rebuild=args.rebuild_cache)
+
+
+def settings():
+    """Options courantes du cache (configure(**settings()) les rétablit, dans un autre processus)."""
+    return dict(_settings)
+
+
+def enabled():
+    """Vrai si le cache binaire est utilisé (pas de --no-cache)."""
+    return _settings['enabled']
+
+
+def rebuilding():
+    """Vrai si le cache est reconstruit sans relire les fichiers cache existants (--rebuild-cache)."""
+    return _settings['rebuild']
+
+
+def content_hash(path, chunk_size=1 << 20):
+    """Empreinte BLAKE2 du contenu d'un fichier."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fingerprint(path):
+    """Chemin, taille et date de modification d'un fichier source."""
+    stat = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def cache_path(source, key):
+    """Chemin du fichier cache associé à un fichier source et à un type de données."""
+    directory, filename = os.path.split(source)
+    return os.path.join(directory, CACHE_DIRNAME, f'{filename}.{key}.npz')
+
+
+def read(target):
+    """Métadonnées et tableaux d'un fichier cache écrit par write()."""
+    with np.load(target, allow_pickle=False) as archive:
+        meta = json.loads(str(archive['__meta__']))
+        arrays = {name: archive[name] for name in archive.files if name != '__meta__'}
+    return meta, arrays
+
+
+def write(target, meta, arrays):
+    """Écrit un fichier cache (métadonnées JSON et tableaux) : fichier temporaire puis renommage."""
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, __meta__=np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp_path, target)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load_or_parse(source, key, parser, version=1):
+    """
+    Retourne les tableaux issus de parser(source), en les lisant si possible depuis le cache.
+
+    parser doit retourner un dict {nom: tableau NumPy}. Le cache est invalidé si le chemin,
+    la taille ou le contenu (empreinte BLAKE2) du fichier source changent, ou si la version
+    du parseur change. Une simple modification de date avec un contenu identique ne
+    provoque pas de nouvelle lecture du texte.
+    """
+    if not _settings['enabled']:
+        return parser(source)
+
+    target = cache_path(source, key)
+    current = fingerprint(source)
+    current.update(format=CACHE_FORMAT, key=key, version=version)
+
+    if not _settings['rebuild'] and os.path.exists(target):
+        try:
+            with timing.timer('parse', f'cache_read:{key}'):
+                stored, arrays = read(target)
+        except (OSError, ValueError, KeyError):
+            stored, arrays = None, None
+        if stored is not None and all(stored.get(k) == current[k] for k in ('path', 'size', 'format', 'key', 'version')):
+            if stored.get('mtime_ns') == current['mtime_ns']:
+                timing.count('cache_hits')
+                return arrays
+            current['hash'] = content_hash(source)
+            if stored.get('hash') == current['hash']:
+                # Contenu inchangé (fichier copié ou touché) : mise à jour de l'empreinte seulement
+                write(target, current, arrays)
+                timing.count('cache_hits')
+                return arrays
+
+    timing.count('cache_misses')
+    arrays = parser(source)
+    if 'hash' not in current:
+        current['hash'] = content_hash(source)
+    try:
+        with timing.timer('write', f'cache_write:{key}'):
+            write(target, current, arrays)
+    except OSError as e:
+        print(f"Impossible d'écrire le cache {target} : {e}")
+    return arrays
@@ -0,0 +1,313 @@
+import glob
+import json
+import os
+import struct
+import zipfile
+import numpy as np
+
+from . import cache, timing
+from .depletion import NON_NUCLIDE_ZAI, NuclideIndex, load_dep_file
+
+# Fichier unique de la campagne, dans le dossier cache de data/ (data/.cache/campaign.npz)
+CAMPAIGN_FILENAME = 'campaign.npz'
+
+# À incrémenter si le contenu ou l'organisation du fichier de campagne change
+CAMPAIGN_FORMAT = 1
+
+# Grandeurs par nucléide (matrices nucléide × pas) et par pas (vecteurs) conservées
+NUCLIDE_QUANTITIES = ('ADENS', 'MDENS', 'A', 'H', 'SF', 'N2NXS', 'FISSXS', 'CAPTXS')
+STEP_QUANTITIES = ('DAYS', 'BU', 'FLUX', 'BURNUP', 'VOLUME')
+
+# Taille de l'en-tête local d'un membre zip, avant le nom et le champ extra
+_LOCAL_HEADER = struct.Struct('<4s5H3L2H')
+
+
+def campaign_path(data_dir='data'):
+    """Chemin du fichier de campagne associé à un dossier de simulations."""
+    return os.path.join(data_dir, cache.CACHE_DIRNAME, CAMPAIGN_FILENAME)
+
+
+def _member(simulation, name):
+    """Nom d'un tableau dans l'archive : 'MOXEUS_00001/ADENS' (clé de np.load)."""
+    return f'{simulation}/{name}'
+
+
+def _simulation_arrays(dep):
+    """
+    Tableaux d'une simulation (DepletionData) conservés dans le fichier de campagne, ou
+    None (avec un message) si le fichier .se_dep.m ne contient aucun matériau.
+    """
+    if not dep.materials:
+        print(f"Aucun matériau dans {dep.path}, simulation absente du fichier de campagne.")
+        return None
+    material = next(iter(dep.materials))
+    zai = dep.zai.astype(np.int64)
+    rows = ~np.isin(zai, NON_NUCLIDE_ZAI)
+    arrays = {'ZAI': zai[rows], 'NAMES': np.array(dep.names)[rows]}
+    for quantity in NUCLIDE_QUANTITIES:
+        if quantity in dep.materials[material]:
+            arrays[quantity] = dep.mat(quantity, material)[rows]
+    for quantity in ('DAYS', 'BU'):
+        if quantity in dep:
+            arrays[quantity] = dep[quantity]
+    for quantity in ('FLUX', 'BURNUP', 'VOLUME'):
+        if quantity in dep.materials[material]:
+            arrays[quantity] = dep.mat(quantity, material)
+    return material, arrays
+
+
+def _write_array(archive, name, array):
+    """Ajoute un tableau non compressé (format .npy), lisible ensuite par np.memmap."""
+    with archive.open(name + '.npy', 'w') as member:
+        np.lib.format.write_array(member, np.asanyarray(array), allow_pickle=False)
+
+
+def _memmap_member(path, info):
+    """Projette en mémoire un tableau .npy stocké sans compression dans l'archive."""
+    with open(path, 'rb') as f:
+        f.seek(info.header_offset)
+        fields = _LOCAL_HEADER.unpack(f.read(_LOCAL_HEADER.size))
+        f.seek(info.header_offset + _LOCAL_HEADER.size + fields[-2] + fields[-1])
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        offset = f.tell()
+    if dtype.hasobject:
+        raise ValueError(f"Tableau d'objets dans {path}:{info.filename}")
+    if not np.prod(shape):
+        return np.empty(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape,
+                     order='F' if fortran_order else 'C')
+
+
+def _is_current(meta, dep_file):
+    """Vrai si la simulation enregistrée correspond encore au fichier .se_dep.m."""
+    if meta.get('format') != CAMPAIGN_FORMAT or not os.path.exists(dep_file):
+        return False
+    current = cache.fingerprint(dep_file)
+    if (meta['path'], meta['size']) != (current['path'], current['size']):
+        return False
+    return meta['mtime_ns'] == current['mtime_ns'] or meta['hash'] == cache.content_hash(dep_file)
+
+
+class CampaignStore:
+    """
+    Tableaux alignés de toutes les simulations d'une campagne, lus dans un seul fichier
+    .npz non compressé : chaque tableau d'une simulation est projeté en mémoire
+    (np.memmap), sans copie ni relecture des fichiers texte.
+
+    tensor('ADENS') assemble le tableau (simulation × nucléide × pas) sur l'union des
+    nucléides de la campagne ; les nucléides ou pas absents d'une simulation valent NaN.
+    """
+
+    def __init__(self, path, metadata, arrays=None):
+        self.path = path
+        # Métadonnées par simulation (fichier source, matériau, nombre de pas...)
+        self.metadata = metadata
+        self.simulations = list(metadata)
+        self._arrays = arrays if arrays is not None else {}
+        self._members = {}
+        if path is not None and os.path.exists(path):
+            with zipfile.ZipFile(path) as archive:
+                self._members = {info.filename[:-len('.npy')]: info for info in archive.infolist()
+                                 if info.filename.endswith('.npy')}
+        self._tensors = {}
+        self._index = None
+
+    def array(self, simulation, name):
+        """Tableau d'une simulation tel qu'enregistré (ex. array('MOXEUS_00001', 'ADENS'))."""
+        key = _member(simulation, name)
+        if key not in self._arrays:
+            if key not in self._members:
+                raise KeyError(f"{name} absent de la simulation {simulation}")
+            self._arrays[key] = _memmap_member(self.path, self._members[key])
+        return self._arrays[key]
+
+    def __contains__(self, simulation):
+        return simulation in self.metadata
+
+    def __len__(self):
+        return len(self.simulations)
+
+    @property
+    def index(self):
+        """NuclideIndex de l'union des ZAI de la campagne (axe nucléide de tensor())."""
+        if self._index is None:
+            zai = np.concatenate([self.array(sim, 'ZAI') for sim in self.simulations] or [np.empty(0, np.int64)])
+            _, first = np.unique(zai, return_index=True)
+            self._index = NuclideIndex(zai[np.sort(first)])
+        return self._index
+
+    @property
+    def nuclides(self):
+        """Union des ZAI de la campagne, dans l'ordre de première apparition."""
+        return self.index.zai
+
+    @property
+    def names(self):
+        """Noms des nucléides de nuclides ('U-235'...)."""
+        names = {}
+        for sim in self.simulations:
+            names.update(zip(self.array(sim, 'ZAI').tolist(), self.array(sim, 'NAMES').tolist()))
+        return [names[z] for z in self.nuclides.tolist()]
+
+    @property
+    def n_steps(self):
+        """Nombre de pas de l'axe commun (celui de la simulation la plus longue)."""
+        return max((self.metadata[sim]['n_steps'] for sim in self.simulations), default=0)
+
+    def nuclide_index(self, zai):
+        """Position d'un ZAI dans nuclides (KeyError s'il est absent de la campagne)."""
+        return self.index.row(zai)
+
+    def tensor(self, quantity, fill=np.nan):
+        """
+        Grandeur de toutes les simulations alignée sur un même axe : (simulation × nucléide
+        × pas) pour NUCLIDE_QUANTITIES, (simulation × pas) pour STEP_QUANTITIES.
+        """
+        key = (quantity, fill)
+        if key in self._tensors:
+            return self._tensors[key]
+        n_steps = self.n_steps
+        if quantity in NUCLIDE_QUANTITIES:
+            result = np.full((len(self), len(self.nuclides), n_steps), fill)
+            for s, sim in enumerate(self.simulations):
+                rows, _ = self.index.rows(self.array(sim, 'ZAI'))
+                values = self.array(sim, quantity)
+                result[s, rows, :values.shape[1]] = values
+        elif quantity in STEP_QUANTITIES:
+            result = np.full((len(self), n_steps), fill)
+            for s, sim in enumerate(self.simulations):
+                values = self.array(sim, quantity)
+                result[s, :len(values)] = values
+        else:
+            raise KeyError(f"Grandeur inconnue : {quantity}")
+        self._tensors[key] = result
+        return result
+
+
+def _simulation_files(data_dir):
+    """{nom de simulation: fichier .se_dep.m}, dans l'ordre des noms."""
+    files = {}
+    for sim_dir in sorted(glob.glob(os.path.join(data_dir, 'MOXEUS_*'))):
+        dep_files = sorted(glob.glob(os.path.join(sim_dir, '*.se_dep.m')))
+        if dep_files:
+            files[os.path.basename(sim_dir)] = dep_files[0]
+    return files
+
+
+def _read_metadata(path):
+    """Métadonnées des simulations enregistrées, ou {} si le fichier est absent ou illisible."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with zipfile.ZipFile(path) as archive:
+            metadata = {}
+            for info in archive.infolist():
+                if info.filename.endswith('/__meta__.npy'):
+                    with archive.open(info) as member:
+                        meta = json.loads(str(np.lib.format.read_array(member, allow_pickle=False)))
+                    metadata[meta['simulation']] = meta
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+        return {}
+    return dict(sorted(metadata.items()))
+
+
+def _loaded(deps, simulation, dep_file):
+    """Données .se_dep.m d'une simulation : celles de deps si elles viennent de dep_file, sinon lues."""
+    dep = deps.get(simulation)
+    if dep is not None and os.path.abspath(dep.path) == os.path.abspath(dep_file):
+        return dep
+    return load_dep_file(dep_file)
+
+
+def _add_simulation(archive, simulation, dep_file, deps):
+    """
+    Ajoute les tableaux et les métadonnées d'une simulation à l'archive et retourne ses
+    métadonnées, ou None si la simulation n'a aucun matériau (rien n'est écrit).
+    """
+    entry = _simulation_arrays(_loaded(deps, simulation, dep_file))
+    if entry is None:
+        return None
+    print(f"Ajout de {simulation} au fichier de campagne")
+    material, arrays = entry
+    for name, array in arrays.items():
+        _write_array(archive, _member(simulation, name), array)
+    meta = cache.fingerprint(dep_file)
+    meta.update(format=CAMPAIGN_FORMAT, simulation=simulation, hash=cache.content_hash(dep_file),
+                material=material, n_steps=len(arrays['DAYS']), n_nuclides=len(arrays['ZAI']))
+    _write_array(archive, _member(simulation, '__meta__'), np.array(json.dumps(meta)))
+    return meta
+
+
+@timing.timed('parse')
+def update_campaign(data_dir='data', path=None, deps=None, simulations=None):
+    """
+    Met à jour le fichier de campagne et retourne son CampaignStore.
+
+    Seules les simulations nouvelles sont lues, puis ajoutées à la fin de l'archive sans
+    réécrire les autres. Si une simulation a été modifiée ou supprimée, l'archive est
+    réécrite en recopiant telles quelles les simulations inchangées.
+
+    deps : {nom de simulation: DepletionData} déjà lus (produit dep_arrays du graphe des
+    analyses) ; seules les simulations absentes de deps sont lues dans leur .se_dep.m.
+    simulations : noms des simulations du CampaignStore retourné (défaut : toutes celles
+    de data_dir). Les autres ne sont ni lues ni ajoutées ; déjà enregistrées et
+    inchangées, elles restent dans le fichier. Une simulation sans matériau est ignorée.
+    """
+    deps = deps or {}
+    if path is None:
+        path = campaign_path(data_dir)
+    on_disk = _simulation_files(data_dir)
+    files = on_disk if simulations is None else {sim: on_disk[sim] for sim in simulations if sim in on_disk}
+
+    if not cache.enabled():
+        # Sans cache : tableaux en mémoire, rien n'est écrit
+        metadata, arrays = {}, {}
+        for simulation, dep_file in files.items():
+            entry = _simulation_arrays(_loaded(deps, simulation, dep_file))
+            if entry is None:
+                continue
+            material, sim_arrays = entry
+            arrays.update((_member(simulation, name), array) for name, array in sim_arrays.items())
+            metadata[simulation] = {'simulation': simulation, 'material': material,
+                                    'n_steps': len(sim_arrays['DAYS']), 'n_nuclides': len(sim_arrays['ZAI'])}
+        return CampaignStore(None, metadata, arrays)
+
+    stored = {} if cache.rebuilding() else _read_metadata(path)
+    kept = {sim: meta for sim, meta in stored.items() if sim in on_disk and _is_current(meta, on_disk[sim])}
+    added = [sim for sim in files if sim not in kept]
+
+    if stored and len(kept) == len(stored):
+        if added:
+            with zipfile.ZipFile(path, 'a', zipfile.ZIP_STORED) as archive:
+                for simulation in added:
+                    kept[simulation] = _add_simulation(archive, simulation, files[simulation], deps)
+    else:
+        # Simulations modifiées ou supprimées : réécriture atomique de l'archive
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        try:
+            with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_STORED) as archive:
+                if kept:
+                    with zipfile.ZipFile(path) as previous:
+                        for info in previous.infolist():
+                            if info.filename.split('/')[0] in kept:
+                                archive.writestr(info, previous.read(info))
+                for simulation in added:
+                    kept[simulation] = _add_simulation(archive, simulation, files[simulation], deps)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    return CampaignStore(path, {sim: kept[sim] for sim in files if kept.get(sim) is not None})
+
+
+def open_campaign(data_dir='data', path=None):
+    """Fichier de campagne en l'état, sans lecture des simulations (aucune mise à jour)."""
+    if path is None:
+        path = campaign_path(data_dir)
+    return CampaignStore(path, _read_metadata(path))
@@ -0,0 +1,213 @@
+from collections import namedtuple
+import glob
+import os
+import re
+import numpy as np
+
+from . import cache, timing
+
+# Paramètres d'une simulation lus dans son fichier d'entrée .se.
+# fuel : composition du matériau combustible {ZAI: fraction} (fraction > 0 : atomique,
+# < 0 : massique, comme dans Serpent) ; settings : toutes les cartes "set" (chaînes).
+DeckParameters = namedtuple('DeckParameters', ['path', 'title', 'fuel_material', 'fuel_density', 'fuel',
+                                               'population', 'active_cycles', 'inactive_cycles',
+                                               'power_density', 'bumode', 'pcc',
+                                               'dep_mode', 'dep_steps', 'materials', 'settings'])
+
+# Fichier de l'index des paramètres, dans le dossier cache de data/ (data/.cache/decks.npz)
+DECK_INDEX_FILENAME = 'decks.npz'
+
+# À incrémenter si les colonnes de l'index changent
+DECK_INDEX_VERSION = 1
+
+# Mots-clés qui ouvrent une carte Serpent : une carte s'étend jusqu'au mot-clé suivant
+_CARDS = {'set', 'mat', 'mix', 'pin', 'lat', 'surf', 'cell', 'therm', 'dep', 'plot', 'mesh',
+          'det', 'ene', 'include', 'src', 'trans', 'div', 'pbed', 'particle', 'thermstoch',
+          'nest', 'utrans', 'strans', 'ftrans', 'umsh', 'solid', 'ifc', 'branch', 'coef'}
+
+# Options d'une carte "mat" et nombre de paramètres de chacune
+_MAT_OPTIONS = {'burn': 1, 'rgb': 3, 'moder': 2, 'vol': 1, 'mass': 1, 'tmp': 1, 'tms': 1,
+                'tft': 2, 'fix': 2, 'sep': 1}
+
+# Commentaires "% ..." et "/* ... */", puis jetons (chaînes entre guillemets ou mots)
+_COMMENTS = re.compile(r'/\*.*?\*/|%[^\n]*', re.DOTALL)
+_TOKEN = re.compile(r'"[^"]*"|\S+')
+
+# Nucléide d'une carte "mat" : ZA avec bibliothèque optionnelle ("92235.09c", "8016")
+_NUCLIDE = re.compile(r'^(\d+)(\.\d+[a-z])?$')
+
+# Symboles des éléments, pour nommer les colonnes de l'index ('U-235', 'Pu-239'...)
+_ELEMENTS = ('H He Li Be B C N O F Ne Na Mg Al Si P S Cl Ar K Ca Sc Ti V Cr Mn Fe Co Ni Cu Zn '
+             'Ga Ge As Se Br Kr Rb Sr Y Zr Nb Mo Tc Ru Rh Pd Ag Cd In Sn Sb Te I Xe Cs Ba La '
+             'Ce Pr Nd Pm Sm Eu Gd Tb Dy Ho Er Tm Yb Lu Hf Ta W Re Os Ir Pt Au Hg Tl Pb Bi Po '
+             'At Rn Fr Ra Ac Th Pa U Np Pu Am Cm Bk Cf Es Fm').split()
+
+
+def nuclide_name(zai):
+    """942390 -> 'Pu-239', 952421 -> 'Am-242m', 400000 -> 'Zr-nat' (ZAI des fichiers _dep.m)."""
+    za, isomer = divmod(int(zai), 10)
+    z, a = divmod(za, 1000)
+    symbol = _ELEMENTS[z - 1] if 0 < z <= len(_ELEMENTS) else f'Z{z}'
+    return f'{symbol}-{a}' + 'm' * (isomer > 0) if a else f'{symbol}-nat'
+
+
+def _cards(text):
+    """Découpe le texte d'un fichier .se en cartes : listes de jetons commençant par un mot-clé."""
+    cards = []
+    for token in _TOKEN.findall(_COMMENTS.sub(' ', text)):
+        if token in _CARDS:
+            cards.append([token])
+        elif cards:
+            cards[-1].append(token)
+    return cards
+
+
+def _number(token, type_=float):
+    try:
+        return type_(token)
+    except (TypeError, ValueError):
+        return None
+
+
+def _material(tokens):
+    """[nom, densité, options..., nucléide, fraction, ...] -> dict de la carte "mat"."""
+    material = {'density': _number(tokens[1]) if len(tokens) > 1 else None,
+                'burn': False, 'composition': {}}
+    position = 2
+    while position < len(tokens) and tokens[position] in _MAT_OPTIONS:
+        if tokens[position] == 'burn':
+            material['burn'] = True
+        position += 1 + _MAT_OPTIONS[tokens[position]]
+    for nuclide, fraction in zip(tokens[position::2], tokens[position + 1::2]):
+        match = _NUCLIDE.match(nuclide)
+        if match and _number(fraction) is not None:
+            # ZA Serpent (92235) -> ZAI des fichiers _dep.m (922350)
+            zai = int(match.group(1)) * 10
+            material['composition'][zai] = material['composition'].get(zai, 0.0) + float(fraction)
+    return material
+
+
+@timing.timed('parse')
+def read_deck(path):
+    """
+    Lit un fichier d'entrée Serpent (.se) et retourne ses paramètres (DeckParameters) :
+    composition du combustible, population, densité de puissance, pas d'évolution...
+    Les paramètres absents du fichier valent None.
+    """
+    with open(path, encoding='utf-8', errors='replace') as f:
+        cards = _cards(f.read())
+
+    materials = {}
+    settings = {}
+    dep_mode, dep_steps = None, []
+    for card in cards:
+        keyword, arguments = card[0], card[1:]
+        if keyword == 'mat' and arguments:
+            materials[arguments[0]] = _material(arguments)
+        elif keyword == 'set' and arguments:
+            settings[arguments[0]] = [value.strip('"') for value in arguments[1:]]
+        elif keyword == 'dep' and arguments:
+            dep_mode = arguments[0]
+            dep_steps.extend(value for value in map(_number, arguments[1:]) if value is not None)
+
+    # Combustible : matériau "fuel", sinon le premier matériau à évolution (burn)
+    fuel_material = 'fuel' if 'fuel' in materials else next(
+        (name for name, material in materials.items() if material['burn']), None)
+    fuel = materials[fuel_material] if fuel_material else {'density': None, 'composition': {}}
+
+    def setting(name, index=0, type_=float):
+        values = settings.get(name, [])
+        return _number(values[index], type_) if len(values) > index else None
+
+    return DeckParameters(path=path, title=(settings.get('title') or [None])[0],
+                          fuel_material=fuel_material, fuel_density=fuel['density'],
+                          fuel=fuel['composition'],
+                          population=setting('pop', 0, int), active_cycles=setting('pop', 1, int),
+                          inactive_cycles=setting('pop', 2, int),
+                          power_density=setting('powdens'),
+                          bumode=setting('bumode', 0, int), pcc=setting('pcc', 0, int),
+                          dep_mode=dep_mode, dep_steps=tuple(dep_steps),
+                          materials=materials, settings=settings)
+
+
+def _deck_files(data_dir):
+    """{nom de simulation: fichier .se}, dans l'ordre des noms."""
+    files = {}
+    for sim_dir in sorted(glob.glob(os.path.join(data_dir, 'MOXEUS_*'))):
+        simulation = os.path.basename(sim_dir)
+        deck = os.path.join(sim_dir, f'{simulation}.se')
+        if os.path.exists(deck):
+            files[simulation] = deck
+    return files
+
+
+def build_deck_index(files):
+    """
+    Table des paramètres de toutes les simulations ({nom: fichier .se}) : un tableau
+    NumPy par colonne, une ligne par simulation. Les fractions du combustible sont
+    rangées dans une colonne par nucléide ('U-235', 'Pu-239'...), 0 si absent.
+    """
+    decks = [read_deck(path) for path in files.values()]
+    nuclides = sorted({zai for deck in decks for zai in deck.fuel})
+
+    def column(values, dtype=float):
+        values = [np.nan if value is None and dtype is float else value for value in values]
+        return np.array(values, dtype=dtype)
+
+    index = {
+        'simulation': np.array(list(files), dtype=str),
+        'title': np.array([deck.title or '' for deck in decks], dtype=str),
+        'fuel_density': column([deck.fuel_density for deck in decks]),
+        'population': column([deck.population or 0 for deck in decks], np.int64),
+        'active_cycles': column([deck.active_cycles or 0 for deck in decks], np.int64),
+        'inactive_cycles': column([deck.inactive_cycles or 0 for deck in decks], np.int64),
+        'power_density': column([deck.power_density for deck in decks]),
+        'bumode': column([-1 if deck.bumode is None else deck.bumode for deck in decks], np.int64),
+        'pcc': column([-1 if deck.pcc is None else deck.pcc for deck in decks], np.int64),
+        'dep_mode': np.array([deck.dep_mode or '' for deck in decks], dtype=str),
+        'n_steps': column([len(deck.dep_steps) for deck in decks], np.int64),
+        'total_days': column([sum(deck.dep_steps) if deck.dep_mode == 'daystep' else
+                              max(deck.dep_steps, default=np.nan) if deck.dep_mode == 'daytot' else None
+                              for deck in decks]),
+    }
+    for zai in nuclides:
+        index[nuclide_name(zai)] = column([deck.fuel.get(zai, 0.0) for deck in decks])
+    return index
+
+
+def load_deck_index(data_dir='data'):
+    """
+    Index des paramètres de toutes les simulations de data_dir, conservé dans
+    data/.cache/decks.npz. Il n'est reconstruit (à partir des seuls fichiers .se)
+    que si une simulation est ajoutée, supprimée ou si son fichier .se a changé.
+    """
+    files = _deck_files(data_dir)
+    if not cache.enabled():
+        return build_deck_index(files)
+
+    target = os.path.join(data_dir, cache.CACHE_DIRNAME, DECK_INDEX_FILENAME)
+    current = {'format': cache.CACHE_FORMAT, 'version': DECK_INDEX_VERSION,
+               'decks': {simulation: [os.path.abspath(path), os.stat(path).st_size, os.stat(path).st_mtime_ns]
+                         for simulation, path in files.items()}}
+    if not cache.rebuilding() and os.path.exists(target):
+        try:
+            stored, index = cache.read(target)
+            if stored == current:
+                return index
+        except (OSError, ValueError, KeyError):
+            pass
+
+    index = build_deck_index(files)
+    try:
+        cache.write(target, current, index)
+    except OSError as e:
+        print(f"Impossible d'écrire l'index {target} : {e}")
+    return index
+
+
+def group_by(index, column):
+    """Simulations regroupées par valeur d'une colonne de l'index : {valeur: [simulations]}."""
+    groups = {}
+    for value, simulation in zip(index[column].tolist(), index['simulation'].tolist()):
+        groups.setdefault(value, []).append(simulation)
+    return dict(sorted(groups.items()))
@@ -0,0 +1,312 @@
+import re
+import numpy as np
+
+from . import cache, timing
+
+# Grandeurs par matériau écrites par Serpent dans le fichier _dep.m
+MATERIAL_QUANTITIES = ['VOLUME', 'FLUX', 'BURNUP', 'ADENS', 'MDENS', 'A', 'H', 'SF',
+                       'N2NXS', 'FISSXS', 'CAPTXS']
+
+# Lignes de ZAI qui ne sont pas des nucléides : "lost data" et "total"
+NON_NUCLIDE_ZAI = (666, 0)
+
+# Début d'un bloc MATLAB : "NOM = [" en début de ligne
+_BLOCK_START = re.compile(rb'^(\w+)[ \t]*=[ \t]*\[', re.MULTILINE)
+
+# Nom d'une variable de matériau : MAT_<matériau>_<grandeur>
+_MATERIAL_VARIABLE = re.compile(r'^MAT_(\w+)_(' + '|'.join(MATERIAL_QUANTITIES) + r')$')
+
+# Suffixe des étiquettes de lignes dans le cache binaire
+_LABELS_SUFFIX = '__labels'
+
+
+class NuclideIndex:
+    """
+    Index précalculé ZAI -> ligne des matrices par nucléide (ADENS, FISSXS...).
+
+    Les ZAI sont conservés en entiers et triés une seule fois : la recherche d'une liste
+    de k nucléides est un np.searchsorted vectorisé (O(k log N)), sans parcours complet
+    du tableau pour chaque nucléide. Un ZAI présent plusieurs fois est considéré absent.
+    """
+
+    def __init__(self, zai):
+        self.zai = np.rint(np.asarray(zai, dtype=float)).astype(np.int64).reshape(-1)
+        values, first, counts = np.unique(self.zai, return_index=True, return_counts=True)
+        unique = counts == 1
+        self._sorted = values[unique]
+        self._rows = first[unique]
+
+    def __len__(self):
+        return len(self.zai)
+
+    def __contains__(self, zai):
+        return bool(self.rows([zai])[1][0])
+
+    def rows(self, zais):
+        """Lignes des ZAI demandés et masque des ZAI trouvés (ligne 0 pour les absents)."""
+        zais = np.asarray(zais, dtype=np.int64).reshape(-1)
+        if not len(self._sorted):
+            return np.zeros(len(zais), dtype=np.int64), np.zeros(len(zais), dtype=bool)
+        position = np.searchsorted(self._sorted, zais)
+        position[position == len(self._sorted)] = 0
+        found = self._sorted[position] == zais
+        return np.where(found, self._rows[position], 0), found
+
+    def row(self, zai):
+        """Ligne d'un ZAI (KeyError s'il est absent)."""
+        rows, found = self.rows([zai])
+        if not found[0]:
+            raise KeyError(f"ZAI {zai} absent")
+        return int(rows[0])
+
+    def gather(self, matrix, zais, fill=np.nan):
+        """
+        Extrait en une seule indexation les lignes de matrix correspondant à zais :
+        retourne (bloc n_zai × n_pas, masque des ZAI trouvés) ; les absents valent fill.
+        """
+        rows, found = self.rows(zais)
+        matrix = np.asarray(matrix)
+        if found.all():
+            return matrix[rows], found
+        block = np.full((len(rows),) + matrix.shape[1:], fill)
+        block[found] = matrix[rows[found]]
+        return block, found
+
+
+class DepletionData:
+    """
+    Contenu complet d'un fichier .se_dep.m : DAYS, BU, ZAI, NAMES et toutes
+    les matrices MAT_<matériau>_<grandeur> sous forme de tableaux NumPy.
+    """
+
+    def __init__(self, path, variables, row_labels=None):
+        self.path = path
+        self.variables = variables
+        # Étiquettes des lignes (commentaires "% nuclide") pour chaque matrice
+        self.row_labels = row_labels or {}
+        self.materials = {}
+        self._nuclides = None
+        for name, value in variables.items():
+            match = _MATERIAL_VARIABLE.match(name)
+            if match:
+                self.materials.setdefault(match.group(1), {})[match.group(2)] = value
+
+    @property
+    def days(self):
+        return self.variables.get('DAYS')
+
+    @property
+    def bu(self):
+        return self.variables.get('BU')
+
+    @property
+    def zai(self):
+        """ZAI des lignes des matrices, en entiers (None si absent du fichier)."""
+        return self.nuclides.zai if 'ZAI' in self.variables else None
+
+    @property
+    def nuclides(self):
+        """NuclideIndex des lignes des matrices par nucléide."""
+        if self._nuclides is None:
+            self._nuclides = NuclideIndex(self.variables.get('ZAI', []))
+        return self._nuclides
+
+    @property
+    def names(self):
+        return self.variables.get('NAMES')
+
+    def mat(self, quantity, material=None):
+        """
+        Retourne la grandeur demandée (ex. 'ADENS') pour un matériau.
+        Si aucun matériau n'est précisé, le premier matériau du fichier est utilisé.
+        """
+        if material is None:
+            if not self.materials:
+                raise KeyError(f"Aucun matériau trouvé dans {self.path}")
+            material = next(iter(self.materials))
+        return self.materials[material][quantity]
+
+    def isotopes(self, zais, quantity='ADENS', material=None):
+        """Bloc (n_zai × n_pas) d'une grandeur pour une liste de ZAI, et masque des trouvés."""
+        return self.nuclides.gather(self.mat(quantity, material), zais)
+
+    def mat_labels(self, quantity, material=None):
+        """Retourne les étiquettes de lignes ("% nuclide") de la grandeur demandée."""
+        if material is None:
+            material = next(iter(self.materials))
+        return self.row_labels.get(f'MAT_{material}_{quantity}')
+
+    def __contains__(self, name):
+        return name in self.variables
+
+    def __getitem__(self, name):
+        return self.variables[name]
+
+    def to_arrays(self):
+        """Aplatit les données en un dict de tableaux NumPy (format du cache binaire)."""
+        arrays = {}
+        for name, value in self.variables.items():
+            arrays[name] = np.array(value) if name == 'NAMES' else value
+        for name, labels in self.row_labels.items():
+            arrays[name + _LABELS_SUFFIX] = np.array(labels)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, path, arrays):
+        """Reconstruit un DepletionData à partir du dict produit par to_arrays()."""
+        variables = {}
+        row_labels = {}
+        for name, value in arrays.items():
+            if name.endswith(_LABELS_SUFFIX):
+                row_labels[name[:-len(_LABELS_SUFFIX)]] = value.tolist()
+            elif name == 'NAMES':
+                variables[name] = value.tolist()
+            else:
+                variables[name] = value
+        return cls(path, variables, row_labels)
+
+
+# Tables de décodage des nombres Serpent à largeur fixe " d.dddddE+dd" (12 octets).
+# Chaque nombre est lu comme 6 paires d'octets (uint16) : " d", ".d", "dd", "dd", "E±", "dd".
+_CODES = np.arange(65536)
+_FIRST, _SECOND = _CODES & 0xFF, _CODES >> 8
+_SECOND_DIGIT = (_SECOND >= 48) & (_SECOND <= 57)
+_DIGIT_PAIR = _SECOND_DIGIT & (_FIRST >= 48) & (_FIRST <= 57)
+_INVALID = -(1 << 30)
+
+
+def _pair_table(valid, values):
+    table = np.full(65536, _INVALID, dtype=np.int32)
+    table[valid] = values[valid]
+    return table
+
+
+_LEAD = _pair_table(_SECOND_DIGIT & (_FIRST == ord(' ')), (_SECOND - 48) * 100000)
+_DOT = _pair_table(_SECOND_DIGIT & (_FIRST == ord('.')), (_SECOND - 48) * 10000)
+_PAIR_HUNDREDS = _pair_table(_DIGIT_PAIR, ((_FIRST - 48) * 10 + _SECOND - 48) * 100)
+_PAIR = _pair_table(_DIGIT_PAIR, (_FIRST - 48) * 10 + _SECOND - 48)
+_EXP_SIGN = np.zeros(65536, dtype=np.int32)
+_EXP_SIGN[ord('E') | ord('+') << 8] = 1
+_EXP_SIGN[ord('E') | ord('-') << 8] = -1
+
+# Puissances de 10 exactes (|k| <= 22) : la mantisse entière est multipliée ou divisée
+# une seule fois, ce qui donne le même arrondi que float(). Au-delà : NaN, puis repli.
+_EXPONENTS = np.arange(-104, 95)
+_MULTIPLY = np.where(_EXPONENTS >= 0, 10.0 ** np.clip(_EXPONENTS, 0, 22), 1.0)
+_DIVIDE = np.where(_EXPONENTS < 0, 10.0 ** np.clip(-_EXPONENTS, 0, 22), 1.0)
+_MULTIPLY[np.abs(_EXPONENTS) > 22] = np.nan
+del _CODES, _FIRST, _SECOND, _SECOND_DIGIT, _DIGIT_PAIR
+
+
+def _decode_fixed_width(rows):
+    """
+    Décode des lignes de nombres " d.dddddE+dd" par tables de correspondance vectorisées.
+    Retourne None si le format ne correspond pas (le décodage générique prend alors le relais).
+    """
+    width = len(rows[0])
+    if width % 12 or any(len(row) != width for row in rows):
+        return None
+    raw = b''.join(rows)
+    pairs = np.frombuffer(raw, dtype='<u2').reshape(-1, 6)
+
+    mantissa = _LEAD[pairs[:, 0]] + _DOT[pairs[:, 1]] + _PAIR_HUNDREDS[pairs[:, 2]] + _PAIR[pairs[:, 3]]
+    sign = _EXP_SIGN[pairs[:, 4]]
+    exponent = _PAIR[pairs[:, 5]]
+    if mantissa.min() < 0 or exponent.min() < 0 or not sign.all():
+        return None
+
+    index = exponent * sign + 99  # exposant écrit - 5 (mantisse entière) + 104
+    values = mantissa * _MULTIPLY[index] / _DIVIDE[index]
+    out_of_range = np.isnan(values)
+    if out_of_range.any():
+        tokens = np.frombuffer(raw, dtype='S12')[out_of_range]
+        values[out_of_range] = np.fromstring(tokens.tobytes().decode('ascii'), sep=' ')
+    return values.reshape(len(rows), -1)
+
+
+def decode_matrix(rows):
+    """
+    Décode les lignes (bytes, sans commentaire) d'un bloc MATLAB en une matrice float64 2-D.
+    La conversion numérique est faite en bloc par NumPy, sans float() par valeur.
+    """
+    if not rows:
+        return np.empty((0, 0))
+    matrix = _decode_fixed_width(rows)
+    if matrix is not None:
+        return matrix
+
+    values = np.fromstring(b' '.join(rows).decode('ascii'), dtype=np.float64, sep=' ')
+    if values.size % len(rows):
+        raise ValueError(f"Bloc irrégulier : {values.size} valeurs pour {len(rows)} lignes")
+    return values.reshape(len(rows), -1)
+
+
+def split_block(text):
+    """
+    Sépare le contenu d'un bloc "[ ... ];" (bytes) en lignes de valeurs et étiquettes
+    de lignes (commentaires "% nuclide"). Étiquettes vaut None sans commentaires.
+    """
+    rows = []
+    labels = []
+    for line in text.split(b'\n'):
+        values, comment, label = line.partition(b'%')
+        values = values.rstrip()
+        if values.strip():
+            rows.append(values)
+            if comment:
+                labels.append(label.strip().decode())
+    return rows, labels or None
+
+
+def _convert_block(name, text):
+    """Convertit le contenu d'un bloc MATLAB en tableau NumPy (ou liste de chaînes pour NAMES)."""
+    if name == 'NAMES':
+        return [value.strip() for value in re.findall(r"'([^']*)'", text.decode())], None
+
+    rows, labels = split_block(text)
+    array = decode_matrix(rows)
+    # Vecteurs ligne (BU, FLUX...) et colonne (ZAI) ramenés en 1-D
+    if array.shape[0] == 1 or array.shape[1] == 1:
+        array = array.ravel()
+    return array, labels
+
+
+@timing.timed('parse')
+def read_dep_file(path):
+    """
+    Lit un fichier .se_dep.m en une seule passe et retourne un DepletionData
+    contenant tous les blocs "NOM = [ ... ];" du fichier.
+    """
+    variables = {}
+    row_labels = {}
+
+    with open(path, 'rb') as f:
+        content = f.read()
+    timing.count('bytes_read', len(content))
+    if timing.enabled():
+        timing.count('lines_parsed', content.count(b'\n'))
+
+    position = 0
+    while True:
+        match = _BLOCK_START.search(content, position)
+        if not match:
+            break
+        end = content.find(b'];', match.end())
+        if end < 0:
+            break
+        name = match.group(1).decode()
+        variables[name], labels = _convert_block(name, content[match.end():end])
+        if labels is not None:
+            row_labels[name] = labels
+        position = end + 2
+
+    return DepletionData(path, variables, row_labels)
+
+
+def load_dep_file(path):
+    """
+    Comme read_dep_file, mais en passant par le cache binaire (data/MOXEUS_xxxxx/.cache/) :
+    le texte n'est relu que si le fichier .se_dep.m a changé.
+    """
+    arrays = cache.load_or_parse(path, 'dep', lambda p: read_dep_file(p).to_arrays())
+    return DepletionData.from_arrays(path, arrays)
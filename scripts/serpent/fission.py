@@ -0,0 +1,40 @@
+import numpy as np
+
+from . import timing
+from .depletion import NON_NUCLIDE_ZAI
+
+# Réactions calculées, dans l'ordre de la première dimension des tableaux de taux
+REACTIONS = ('fission', 'capture')
+
+
+def reaction_rates(dep, material=None):
+    """
+    Taux de fission et de capture par nucléide et par pas, N·σ·φ (réactions/cm³/s),
+    calculés en un seul produit diffusé à partir de ADENS (atomes/b·cm), FISSXS et
+    CAPTXS (barns) et FLUX (n/cm²/s) d'un DepletionData.
+
+    Retourne (rows, rates) : rows sélectionne les lignes de nucléides du fichier (sans
+    "lost data" ni "total") et rates est de forme (2, n_nucléides, n_pas), fission puis capture.
+    """
+    rows = ~np.isin(dep.zai.astype(np.int64), NON_NUCLIDE_ZAI)
+    cross_sections = np.stack([dep.mat('FISSXS', material), dep.mat('CAPTXS', material)])
+    rates = cross_sections[:, rows] * dep.mat('ADENS', material)[rows] * dep.mat('FLUX', material)
+    return rows, rates
+
+
+@timing.timed('compute')
+def reaction_fractions(dep, material=None):
+    """
+    Contributions de chaque nucléide aux fissions et aux captures, à tous les pas.
+
+    Retourne un dict : 'zai' et 'names' (n_nucléides,), 'fission' et 'capture'
+    (n_nucléides, n_pas), fractions dont la somme vaut 1 à chaque pas (0 si aucun taux),
+    ainsi que 'days' et 'burnup' (n_pas,) pour l'axe des abscisses.
+    """
+    rows, rates = reaction_rates(dep, material)
+    totals = rates.sum(axis=1, keepdims=True)
+    fractions = np.divide(rates, totals, out=np.zeros_like(rates), where=totals > 0)
+    result = {'zai': dep.zai[rows].astype(np.int64), 'names': np.array(dep.names)[rows],
+              'days': dep.days, 'burnup': dep.bu}
+    result.update(zip(REACTIONS, fractions))
+    return result
@@ -0,0 +1,66 @@
+"""
+Imports différés des bibliothèques lourdes (matplotlib, pandas, seaborn, scipy) : les
+chemins de lecture et de calcul n'importent que NumPy, les piles de tracé et de
+statistiques ne sont chargées qu'au premier usage.
+
+    plt = lazy.module('matplotlib.pyplot')   # rien n'est importé ici
+    plt.figure()                              # import de matplotlib.pyplot
+"""
+import importlib
+import sys
+import types
+
+# Fonctions à appeler une fois un module importé (voir on_import) : {module: [fonctions]}
+_hooks = {}
+
+
+class LazyModule(types.ModuleType):
+    """Module importé au premier accès à l'un de ses attributs."""
+
+    def _load(self):
+        module = self.__dict__.get('_module')
+        if module is None:
+            module = importlib.import_module(self.__name__)
+            self.__dict__['_module'] = module
+            _run_hooks()
+        return module
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'importé' if '_module' in self.__dict__ else 'non importé'
+        return f"<module différé '{self.__name__}' ({state})>"
+
+
+def module(name):
+    """Module `name`, importé au premier accès à un attribut (ou tout de suite s'il l'est déjà)."""
+    if name in sys.modules:
+        return sys.modules[name]
+    return LazyModule(name)
+
+
+def on_import(name, function):
+    """
+    Appelle function() dès que le module `name` est importé : tout de suite s'il l'est
+    déjà, sinon au premier chargement d'un module différé qui l'importe. Une même
+    fonction n'est enregistrée qu'une fois par module.
+    """
+    if name in sys.modules:
+        function()
+    elif function not in _hooks.setdefault(name, []):
+        _hooks[name].append(function)
+
+
+def _run_hooks():
+    for name in [name for name in _hooks if name in sys.modules]:
+        for function in _hooks.pop(name):
+            function()
+
+
+def loaded(names=('matplotlib', 'pandas', 'seaborn', 'scipy', 'sklearn')):
+    """Bibliothèques lourdes déjà importées par le processus courant."""
+    return [name for name in names if name in sys.modules]
@@ -0,0 +1,366 @@
+from collections import namedtuple
+import mmap
+import os
+import numpy as np
+
+from . import cache, timing
+
+# Une étape de transport (predictor ou corrector) du fichier log.txt.
+# Les k-eff sont ceux du dernier cycle actif affiché ; None si aucun n'a été lu.
+# finished vaut False pour une étape interrompue (log tronqué ou calcul en cours).
+StepRecord = namedtuple('StepRecord', ['step', 'total_steps', 'phase', 'burnup', 'time',
+                                       'keff_analog', 'keff_analog_error',
+                                       'keff_implicit', 'keff_implicit_error', 'finished'])
+
+# Séries extraites du fichier log.txt (étapes corrector)
+CORRECTOR_FIELDS = ('times', 'burnups', 'k_infs', 'errors')
+
+# Marqueurs de début de ligne utilisés pour découper le log
+_STEP_HEADER = b'\nTransport calculation: step ='
+_BURNUP = b'\n                       BU   ='
+_TIME = b'\n                       time ='
+_KEFF_ANALOG = b'\nk-eff (analog)'
+_KEFF_IMPLICIT = b'\nk-eff (implicit)'
+_FINISHED = b'\nFinished after'
+_DEPLETION_OUTPUT = b'\nPrinting depletion output...'
+_TIME_LEFT = b'\nEstimated running time left:'
+
+# Colonnes de l'index des étapes (build_step_index)
+_INDEX_DTYPES = {'step': np.int32, 'phase': str, 'start': np.int64, 'cycle': np.int64,
+                 'end': np.int64, 'finished': bool}
+
+# Taille des blocs lus dans le fichier ; la mémoire utilisée ne dépend pas de la taille du log
+_CHUNK_SIZE = 1 << 20
+_MARKER_TAIL = 64
+
+# Fin du fichier lue pour savoir si le calcul est terminé (dernière étape et sorties finales)
+_END_TAIL = 1 << 16
+
+
+def _line(buffer, marker, start, end, reverse=False):
+    """Champs de la première (ou dernière) ligne commençant par marker dans buffer[start:end]."""
+    position = buffer.rfind(marker, start, end) if reverse else buffer.find(marker, start, end)
+    if position < 0:
+        return None
+    line_end = buffer.find(b'\n', position + 1, end)
+    return buffer[position + 1:line_end if line_end >= 0 else end].split()
+
+
+def _value_and_error(fields):
+    """[b'k-eff', b'(implicit)', b'=', b'1.33448', b'+/-', b'0.00088', ...] -> (1.33448, 0.00088)"""
+    try:
+        return float(fields[3]), float(fields[5])
+    except (IndexError, TypeError, ValueError):
+        return None, None
+
+
+def _header_value(fields):
+    """[b'BU', b'=', b'0.00', b'MWd/kgU'] -> 0.0"""
+    try:
+        return float(fields[2])
+    except (IndexError, TypeError, ValueError):
+        return None
+
+
+def _parse_cycle(buffer, start, end):
+    """
+    Décode le bloc d'un cycle (de l'en-tête "Transport calculation" à end).
+    Retourne None si l'en-tête lui-même est incomplet.
+    """
+    header = _line(buffer, _STEP_HEADER, start, end)
+    try:
+        step, total_steps, phase = int(header[4]), int(header[6]), header[7].strip(b'()').decode()
+    except (IndexError, TypeError, ValueError):
+        return None
+    state = dict(step=step, total_steps=total_steps, phase=phase,
+                 burnup=_header_value(_line(buffer, _BURNUP, start, end)),
+                 time=_header_value(_line(buffer, _TIME, start, end)))
+    state['keff_analog'], state['keff_analog_error'] = _value_and_error(
+        _line(buffer, _KEFF_ANALOG, start, end, reverse=True))
+    state['keff_implicit'], state['keff_implicit_error'] = _value_and_error(
+        _line(buffer, _KEFF_IMPLICIT, start, end, reverse=True))
+    return state
+
+
+def _step_key(buffer, start, end):
+    """(étape, phase) de l'en-tête situé en buffer[start], ou None s'il est incomplet."""
+    header = _line(buffer, _STEP_HEADER, start, end)
+    try:
+        return int(header[4]), header[7].strip(b'()').decode()
+    except (IndexError, TypeError, ValueError):
+        return None
+
+
+def _step_record(buffer, start, end, finished):
+    """
+    Construit le StepRecord de l'étape contenue dans buffer[start:end] à partir du dernier
+    cycle affiché. Si ce cycle est tronqué, les k-eff du cycle précédent sont repris.
+    """
+    last = buffer.rfind(_STEP_HEADER, start, end)
+    if last < 0:
+        return None
+    state = _parse_cycle(buffer, last, end)
+    previous = buffer.rfind(_STEP_HEADER, start, last)
+    if previous >= 0 and (state is None or state['keff_implicit'] is None):
+        earlier = _parse_cycle(buffer, previous, last)
+        if state is None:
+            state = earlier
+        elif earlier is not None and (earlier['step'], earlier['phase']) == (state['step'], state['phase']):
+            for key in ('keff_analog', 'keff_analog_error', 'keff_implicit', 'keff_implicit_error'):
+                state[key] = earlier[key]
+    if state is None:
+        return None
+    return StepRecord(finished=finished, **state)
+
+
+def _trim(buffer, start):
+    """
+    Ne conserve de buffer[start:] que les deux derniers cycles affichés
+    (ou la fin du tampon s'il n'y en a pas).
+    """
+    last = buffer.rfind(_STEP_HEADER, start)
+    if last < 0:
+        return buffer[max(start, len(buffer) - _MARKER_TAIL):]
+    previous = buffer.rfind(_STEP_HEADER, start, last)
+    return buffer[previous if previous >= 0 else last:]
+
+
+def iter_steps(log_file, chunk_size=_CHUNK_SIZE):
+    """
+    Parcourt log.txt en un seul passage et produit un StepRecord par étape de transport
+    (predictor et corrector), dans l'ordre du fichier.
+
+    Le fichier est lu par blocs de taille fixe : seuls le bloc courant et les deux derniers
+    cycles affichés sont gardés en mémoire. Le bloc d'une étape étant répété à chaque cycle
+    actif, seul le dernier cycle avant "Finished after" est décodé. Un log tronqué ne lève
+    pas d'erreur : la dernière étape est produite avec finished=False.
+    """
+    buffer = b'\n'
+    position = 0
+    with open(log_file, 'rb') as file:
+        while True:
+            end = buffer.find(_FINISHED, position)
+            if end >= 0:
+                record = _step_record(buffer, position, end, True)
+                if record is not None:
+                    yield record
+                position = end + len(_FINISHED)
+                continue
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            timing.count('bytes_read', len(chunk))
+            buffer = _trim(buffer, position) + chunk
+            position = 0
+
+    record = _step_record(buffer, position, len(buffer), False)
+    if record is not None:
+        yield record
+
+
+def is_run_finished(log_file):
+    """
+    Vrai si log.txt montre la fin du calcul : dernière étape (step = N / N) terminée
+    ("Finished after") puis sorties d'évolution écrites. Seule la fin du fichier est lue.
+    """
+    with open(log_file, 'rb') as file:
+        file.seek(0, os.SEEK_END)
+        file.seek(max(0, file.tell() - _END_TAIL))
+        buffer = b'\n' + file.read()
+    last = buffer.rfind(_STEP_HEADER)
+    if last < 0:
+        return False
+    state = _parse_cycle(buffer, last, len(buffer))
+    if state is None or state['step'] != state['total_steps']:
+        return False
+    finished = buffer.find(_FINISHED, last)
+    return finished >= 0 and buffer.find(_DEPLETION_OUTPUT, finished) >= 0
+
+
+class LogFollower:
+    """
+    Suivi d'un log.txt en cours d'écriture, sans relecture depuis le début : update()
+    ne lit que les octets ajoutés depuis le dernier appel (un simple os.stat si la
+    taille n'a pas changé), par lignes complètes, et ne garde en mémoire que les deux
+    derniers cycles affichés, comme iter_steps.
+
+    Attributs tenus à jour :
+      - steps : StepRecord des étapes terminées ("Finished after"), dans l'ordre ;
+      - current : StepRecord de l'étape en cours (finished=False), ou de la dernière
+        étape terminée entre deux étapes ;
+      - time_left : "Estimated running time left" du dernier cycle affiché ('0:12:30') ;
+      - run_finished : dernière étape terminée et sorties finales écrites.
+    Si le fichier raccourcit (calcul relancé), le suivi reprend au début.
+    """
+
+    def __init__(self, log_file):
+        self.path = log_file
+        self.offset = 0
+        self.steps = []
+        self.current = None
+        self.time_left = None
+        self.run_finished = False
+        self._buffer = b'\n'
+
+    def update(self, chunk_size=_CHUNK_SIZE):
+        """Lit la suite du fichier ; retourne True si de nouvelles lignes ont été lues."""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return False
+        if size < self.offset:
+            self.__init__(self.path)
+        if size == self.offset:
+            return False
+        read = False
+        with open(self.path, 'rb') as file:
+            file.seek(self.offset)
+            while self.offset < size:
+                chunk = file.read(min(chunk_size, size - self.offset))
+                # Dernière ligne incomplète : relue à l'appel suivant
+                complete = chunk.rfind(b'\n') + 1 if len(chunk) == size - self.offset else len(chunk)
+                if not complete:
+                    break
+                self._consume(chunk[:complete])
+                self.offset += complete
+                read = True
+                if complete < len(chunk):
+                    break
+        return read
+
+    def _consume(self, chunk):
+        buffer = self._buffer + chunk
+        position = 0
+        while True:
+            end = buffer.find(_FINISHED, position)
+            if end < 0:
+                break
+            record = _step_record(buffer, position, end, True)
+            if record is not None:
+                self.steps.append(record)
+            position = end + len(_FINISHED)
+        time_left = _line(buffer, _TIME_LEFT, 0, len(buffer), reverse=True)
+        if time_left is not None and len(time_left) > 4:
+            self.time_left = time_left[4].decode()
+        record = _step_record(buffer, position, len(buffer), False)
+        self.current = record if record is not None else (self.steps[-1] if self.steps else None)
+        last = self.steps[-1] if self.steps else None
+        if last is not None and last.step == last.total_steps and record is None and \
+                buffer.find(_DEPLETION_OUTPUT, position) >= 0:
+            self.run_finished = True
+        self._buffer = _trim(buffer, position)
+
+
+@timing.timed('parse')
+def build_step_index(log_file):
+    """
+    Index des étapes de log.txt : pour chaque étape, décalages en octets du premier cycle
+    (start), du cycle à décoder (cycle) et de la fin de l'étape (end). Construit par
+    mmap et find/rfind, sans boucle Python sur les lignes.
+    """
+    columns = {name: [] for name in _INDEX_DTYPES}
+    with open(log_file, 'rb') as file:
+        # mmap refuse les fichiers vides
+        size = os.fstat(file.fileno()).st_size
+        if size:
+            timing.count('bytes_read', size)
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as content:
+                position = 0
+                while True:
+                    end = content.find(_FINISHED, position)
+                    finished = end >= 0
+                    if not finished:
+                        end = len(content)
+                    last = content.rfind(_STEP_HEADER, position, end)
+                    if last >= 0:
+                        previous = content.rfind(_STEP_HEADER, position, last)
+                        key = _step_key(content, last, end)
+                        if key is None and previous >= 0:
+                            # En-tête du dernier cycle tronqué : celui du cycle précédent fait foi
+                            key = _step_key(content, previous, last)
+                        if key is None:
+                            break
+                        step, phase = key
+                        # Étape interrompue : le cycle précédent, complet, est relu aussi
+                        cycle = last if finished or previous < 0 else previous
+                        first = content.find(_STEP_HEADER, position, end)
+                        for name, value in zip(_INDEX_DTYPES, (step, phase, first, cycle, end, finished)):
+                            columns[name].append(value)
+                    if not finished:
+                        break
+                    position = end + len(_FINISHED)
+    return {name: np.array(values, dtype=_INDEX_DTYPES[name]) for name, values in columns.items()}
+
+
+def load_step_index(log_file):
+    """Index des étapes de log.txt, conservé dans le cache binaire à côté du log."""
+    return cache.load_or_parse(log_file, 'steps', build_step_index)
+
+
+def read_steps(log_file, index=None, phase=None):
+    """
+    Produit les StepRecord de log.txt à partir de l'index : pour chaque étape, un seek
+    vers son dernier cycle et une lecture de ce cycle seulement. phase ('predictor'
+    ou 'corrector') restreint la lecture à un type d'étape.
+    """
+    if index is None:
+        index = load_step_index(log_file)
+    rows = np.arange(len(index['step'])) if phase is None else np.flatnonzero(index['phase'] == phase)
+    with open(log_file, 'rb') as file:
+        for row in rows:
+            start, end = int(index['cycle'][row]), int(index['end'][row])
+            file.seek(start)
+            buffer = file.read(end - start)
+            timing.count('bytes_read', len(buffer))
+            record = _step_record(buffer, 0, len(buffer), bool(index['finished'][row]))
+            if record is not None:
+                yield record
+
+
+def read_step(log_file, step, phase='corrector', index=None):
+    """
+    Lit une seule étape de log.txt à l'aide de l'index (un seek et une lecture du
+    dernier cycle), par exemple read_step('data/MOXEUS_00017/log.txt', 40).keff_implicit.
+    """
+    if index is None:
+        index = load_step_index(log_file)
+    matches = np.flatnonzero((index['step'] == step) & (index['phase'] == phase))
+    if not len(matches):
+        raise KeyError(f"Étape {step} ({phase}) absente de {log_file}")
+    row = matches[-1]
+    start, end = int(index['cycle'][row]), int(index['end'][row])
+    with open(log_file, 'rb') as file:
+        file.seek(start)
+        buffer = file.read(end - start)
+    return _step_record(buffer, 0, len(buffer), bool(index['finished'][row]))
+
+
+@timing.timed('parse')
+def extract_corrector_data(log_file):
+    """
+    Extrait les données de k_inf (corrector), le temps, le burnup et les erreurs du fichier log.txt.
+    Retourne quatre listes : temps (jours), burnup (MWd/kgU), k_inf, erreurs (en unité de k_eff).
+    """
+    times = []
+    burnups = []
+    k_infs = []
+    errors = []
+    for record in read_steps(log_file, load_step_index(log_file), phase='corrector'):
+        if record.keff_implicit is not None:
+            times.append(record.time)
+            burnups.append(record.burnup)
+            k_infs.append(record.keff_implicit)
+            errors.append(record.keff_implicit_error)
+    return times, burnups, k_infs, errors
+
+
+def load_corrector_data(log_file):
+    """
+    Comme extract_corrector_data, mais en passant par le cache binaire :
+    le fichier log.txt n'est relu que s'il a changé.
+    """
+    def parse(path):
+        return dict(zip(CORRECTOR_FIELDS, (np.array(values, dtype=float) for values in extract_corrector_data(path))))
+    arrays = cache.load_or_parse(log_file, 'corrector', parse)
+    return tuple(arrays[field].tolist() for field in CORRECTOR_FIELDS)
+
@@ -0,0 +1,321 @@
+import functools
+import hashlib
+import json
+import os
+import pickle
+import sys
+import time
+import numpy as np
+
+from . import cache, parallel
+
+# Dossier des manifestes de production, dans le dossier des figures (figures/.manifest/)
+MANIFEST_DIRNAME = '.manifest'
+
+# À incrémenter si le calcul des clés ou l'organisation des manifestes change
+MANIFEST_FORMAT = 2
+
+# Journal d'exécution des analyses (figures/.manifest/run_status.jsonl), voir RunStatus
+RUN_STATUS_NAME = 'run_status'
+
+# États d'une unité (nœud, simulation) dans le journal d'exécution
+UNIT_STATES = ('done', 'failed', 'skipped')
+
+_settings = {'force': False, 'resume': False}
+
+# Empreintes des fichiers sources des fonctions de tracé, calculées une fois par processus
+_code_digests = {}
+
+# Dossier du module serpent, dont tout le code entre dans les clés (voir _package_digest)
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def configure(force=False, resume=False):
+    """
+    force=True : tout régénérer, sans tenir compte des sorties déjà à jour.
+    resume=True : reprendre le dernier run, sans refaire les unités terminées du journal
+    d'exécution (voir RunStatus), même si leur manifeste n'a pas été écrit.
+    """
+    _settings['force'] = force
+    _settings['resume'] = resume
+
+
+def add_manifest_arguments(parser):
+    """Ajoute l'option --force à un argparse.ArgumentParser."""
+    parser.add_argument('--force', action='store_true',
+                        help="Régénérer toutes les figures et tous les résumés, même à jour")
+    parser.add_argument('--resume', action='store_true',
+                        help="Reprendre un run interrompu : ne refaire que les unités en erreur ou absentes "
+                             "du journal d'exécution")
+
+
+def configure_from_args(args):
+    """Applique les options --force et --resume lues par argparse."""
+    configure(force=args.force, resume=args.resume)
+
+
+def resuming():
+    """Vrai si le run reprend le précédent (--resume sans --force)."""
+    return _settings['resume'] and not _settings['force']
+
+
+def _package_digest():
+    """
+    Empreinte du code du module serpent (lecteurs, profils de rendu, savefig...), partagé
+    par toutes les fonctions de tracé : une modification régénère toutes les figures.
+    """
+    if _PACKAGE_DIR not in _code_digests:
+        h = hashlib.blake2b(digest_size=16)
+        for name in sorted(os.listdir(_PACKAGE_DIR)):
+            if name.endswith('.py'):
+                h.update(f'{name}:{cache.content_hash(os.path.join(_PACKAGE_DIR, name))}'.encode())
+        _code_digests[_PACKAGE_DIR] = h.hexdigest()
+    return _code_digests[_PACKAGE_DIR]
+
+
+def _code_digest(function):
+    """
+    Empreinte d'une fonction : son nom, le contenu du fichier source de son module et
+    celui du module serpent qu'elle utilise.
+    """
+    module = sys.modules.get(function.__module__)
+    path = getattr(module, '__file__', None)
+    if path not in _code_digests:
+        _code_digests[path] = cache.content_hash(path) if path and os.path.exists(path) else ''
+    return f'{function.__module__}.{function.__qualname__}:{_code_digests[path]}:{_package_digest()}'
+
+
+def _update(h, value):
+    """Ajoute une valeur (tableaux, conteneurs, fonctions, scalaires...) au hachage h."""
+    if isinstance(value, np.ndarray):
+        h.update(f'ndarray{value.dtype.str}{value.shape}'.encode())
+        h.update(np.ascontiguousarray(value).tobytes() if not value.dtype.hasobject else pickle.dumps(value))
+    elif isinstance(value, dict):
+        h.update(f'dict{len(value)}'.encode())
+        for key in sorted(value, key=repr):
+            _update(h, key)
+            _update(h, value[key])
+    elif isinstance(value, (list, tuple)):
+        h.update(f'{type(value).__name__}{len(value)}'.encode())
+        for item in value:
+            _update(h, item)
+    elif isinstance(value, functools.partial):
+        _update(h, (value.func, value.args, value.keywords))
+    elif callable(value) and hasattr(value, '__qualname__'):
+        h.update(_code_digest(value).encode())
+    elif isinstance(value, np.generic):
+        # Même clé pour un scalaire NumPy et sa valeur relue dans un manifeste (JSON)
+        _update(h, value.item())
+    elif value is None or isinstance(value, (str, bytes, bool, int, float)):
+        h.update(f'{type(value).__name__}:{value!r}'.encode())
+    else:
+        # Autres objets (NuclideIndex...) : par leurs attributs
+        h.update(type(value).__qualname__.encode())
+        _update(h, {key: item for key, item in vars(value).items() if not key.startswith('_')}
+                   if hasattr(value, '__dict__') else repr(value))
+
+
+def digest(*parts):
+    """
+    Clé de contenu d'une production : hachage des tableaux d'entrée, des paramètres et
+    du code (fichier source) des fonctions qui la produisent.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    _update(h, (MANIFEST_FORMAT,) + parts)
+    return h.hexdigest()
+
+
+def _plain(value):
+    """Résultat converti en valeurs JSON (scalaires NumPy -> float/int...)."""
+    if isinstance(value, dict):
+        return {str(key): _plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class Manifest:
+    """
+    Manifeste de production d'un script (figures/.manifest/<nom>.json) : pour chaque
+    cible (figure, résumé, simulation...), la clé de contenu de ses entrées, les fichiers
+    produits et le résultat de la fonction qui l'a produite (statistiques des résumés).
+
+    Une cible est à jour si sa clé n'a pas changé et si tous ses fichiers existent :
+    elle n'est alors pas régénérée et son résultat est relu dans le manifeste.
+    """
+
+    def __init__(self, name, root='figures'):
+        self.path = os.path.join(root, MANIFEST_DIRNAME, f'{name}.json')
+        self.entries = {}
+        # Empreintes des fichiers d'entrée, recalculées seulement si leur taille ou date change
+        self.files = {}
+        self.counts = {'current': 0, 'built': 0}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    stored = json.load(f)
+                if stored.get('format') == MANIFEST_FORMAT:
+                    self.entries = stored['entries']
+                    self.files = stored.get('files', {})
+            except (OSError, ValueError, KeyError):
+                pass
+
+    def file_digest(self, path):
+        """Empreinte du contenu d'un fichier d'entrée (hash relu si taille et date inchangées)."""
+        current = cache.fingerprint(path)
+        stored = self.files.get(current['path'])
+        if stored is None or (stored['size'], stored['mtime_ns']) != (current['size'], current['mtime_ns']):
+            stored = dict(current, hash=cache.content_hash(path))
+            self.files[current['path']] = stored
+        return stored['hash']
+
+    def inputs_key(self, function, paths, *parts):
+        """Clé d'une production à partir du contenu de fichiers d'entrée, du code et de paramètres."""
+        return digest(function, [self.file_digest(path) if os.path.exists(path) else None for path in paths], *parts)
+
+    def is_current(self, target, key):
+        """
+        Vrai si la cible a été produite avec la même clé et que ses fichiers existent
+        (sans effet : une cible laissée telle quelle est comptée par mark_current).
+        """
+        entry = self.entries.get(target)
+        return (not _settings['force'] and entry is not None and entry['key'] == key
+                and all(os.path.exists(output) for output in entry['outputs']))
+
+    def mark_current(self, target):
+        """Compte la cible comme à jour (non régénérée) dans le bilan de report()."""
+        self.counts['current'] += 1
+
+    def result(self, target):
+        """Résultat enregistré de la fonction qui a produit la cible."""
+        return self.entries[target]['result']
+
+    def record(self, target, key, outputs=None, result=None):
+        """Enregistre une cible produite, ses fichiers (par défaut la cible elle-même) et son résultat."""
+        self.entries[target] = {'key': key, 'outputs': list(outputs) if outputs is not None else [target],
+                                'result': _plain(result)}
+        self.counts['built'] += 1
+
+    def save(self):
+        """Écrit le manifeste (écriture atomique)."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'format': MANIFEST_FORMAT, 'entries': self.entries, 'files': self.files}, f)
+        os.replace(tmp_path, self.path)
+
+    def report(self):
+        """Ligne de bilan : nombre de cibles à jour et régénérées."""
+        return f"{self.counts['current']} à jour, {self.counts['built']} régénérées"
+
+    def map_simulations(self, func, items, jobs, key, outputs):
+        """
+        parallel.map_simulations limité aux éléments dont les sorties ne sont pas à jour.
+
+        key(item) donne la clé de contenu d'un élément (voir digest et file_digest) et
+        outputs(item) les fichiers qu'il produit. Pour les éléments à jour, le résultat
+        enregistré est retourné sans appeler func ; les résultats None ne sont pas
+        enregistrés (l'élément sera retraité). Le manifeste est écrit à la fin.
+        """
+        items = list(items)
+        keys = [key(item) for item in items]
+        targets = [str(item) for item in items]
+        results = [None] * len(items)
+        outdated = []
+        for position, (target, item_key) in enumerate(zip(targets, keys)):
+            if self.is_current(target, item_key):
+                self.mark_current(target)
+                results[position] = self.result(target)
+            else:
+                outdated.append(position)
+        if len(outdated) < len(items):
+            print(f"{len(items) - len(outdated)} simulation(s) à jour, {len(outdated)} à traiter")
+
+        computed = parallel.map_simulations(func, [items[position] for position in outdated], jobs)
+        for position, result in zip(outdated, computed):
+            results[position] = result
+            if result is not None and result is not False:
+                self.record(targets[position], keys[position], outputs(items[position]), result)
+        self.save()
+        return results
+
+
+class RunStatus:
+    """
+    Journal d'exécution des analyses (figures/.manifest/run_status.jsonl) : pour chaque
+    unité (nœud, simulation), son état (UNIT_STATES), sa durée, son erreur, ses fichiers
+    produits, sa clé de contenu et son résultat. Une unité de campagne a pour
+    simulation None.
+
+    Chaque unité est ajoutée au journal dès qu'elle est terminée, par l'écriture d'une
+    seule ligne vidée aussitôt : après un arrêt brutal, les unités terminées restent
+    enregistrées (une dernière ligne tronquée est ignorée). close() réécrit le journal
+    compacté, une ligne par unité (dernier état), par remplacement atomique.
+    """
+
+    def __init__(self, name=RUN_STATUS_NAME, root='figures'):
+        self.path = os.path.join(root, MANIFEST_DIRNAME, f'{name}.jsonl')
+        self.units = {}
+        self.counts = dict.fromkeys(UNIT_STATES, 0)
+        self._file = None
+        if os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        self.units[entry['node'], entry['simulation']] = entry
+                    except (ValueError, KeyError, TypeError):
+                        pass
+
+    def completed(self, node, sim_dir, key):
+        """
+        Entrée d'une unité terminée ('done') enregistrée avec la même clé et dont tous
+        les fichiers existent, ou None si l'unité est à refaire.
+        """
+        entry = self.units.get((node, sim_dir))
+        if entry is None or entry['state'] != 'done' or key is None or entry['key'] != key:
+            return None
+        if not all(os.path.exists(output) for output in entry['outputs']):
+            return None
+        return entry
+
+    def record(self, node, sim_dir, state, seconds=None, error=None, outputs=(), key=None, result=None):
+        """Ajoute l'état d'une unité au journal (une ligne, vidée sur disque)."""
+        if state not in UNIT_STATES:
+            raise ValueError(f"État inconnu : {state} (états : {', '.join(UNIT_STATES)})")
+        entry = {'node': node, 'simulation': sim_dir, 'state': state, 'seconds': seconds, 'error': error,
+                 'outputs': list(outputs), 'key': key, 'result': _plain(result),
+                 'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+        self.units[node, sim_dir] = entry
+        self.counts[state] += 1
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self._file.flush()
+
+    def close(self):
+        """Réécrit le journal compacté (écriture atomique)."""
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for entry in self.units.values():
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        os.replace(tmp_path, self.path)
+
+    def failed(self):
+        """Unités en erreur : [(nœud, sim_dir ou None, erreur)]."""
+        return [(entry['node'], entry['simulation'], entry['error'])
+                for entry in self.units.values() if entry['state'] == 'failed']
+
+    def report(self):
+        """Ligne de bilan du run : unités terminées, en erreur et sans données."""
+        return (f"{self.counts['done']} unité(s) terminée(s), {self.counts['failed']} en erreur, "
+                f"{self.counts['skipped']} sans données ({self.path})")
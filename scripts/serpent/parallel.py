@@ -0,0 +1,101 @@
+import contextlib
+import io
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from . import cache, profiles, timing
+
+
+def default_jobs():
+    """Nombre de processus par défaut : les cœurs disponibles pour ce processus."""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def add_jobs_argument(parser):
+    """Ajoute l'option --jobs/-j à un argparse.ArgumentParser."""
+    parser.add_argument('-j', '--jobs', type=int, default=default_jobs(),
+                        help="Nombre de processus pour traiter les simulations ou tracer les figures "
+                             "en parallèle (défaut : nombre de cœurs, 1 pour un traitement séquentiel)")
+
+
+def _worker_settings():
+    """Options du processus principal à transmettre aux processus de travail."""
+    return cache.settings(), profiles.settings(), timing.settings()
+
+
+def _init_worker(cache_settings, profile_settings, timing_settings, initializer=None):
+    """
+    Initialisation d'un processus de travail : mêmes options de cache, de rendu et de
+    mesure que le parent (sans les mesures du parent héritées au fork), puis
+    initializer() s'il est donné.
+    """
+    cache.configure(**cache_settings)
+    profiles.configure(**profile_settings)
+    timing.configure(**timing_settings)
+    timing.take()
+    if initializer is not None:
+        initializer()
+
+
+def worker_pool(jobs, initializer=None):
+    """
+    Pool de jobs processus de travail, configurés avec les options du processus principal
+    (cache, profil de rendu, mesures) puis initializer() s'il est donné. Les tâches lui
+    sont soumises avec run_captured.
+    """
+    return ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                               initargs=(*_worker_settings(), initializer))
+
+
+def run_captured(func, item):
+    """
+    Exécute func(item) en capturant ses sorties, pour qu'elles soient réaffichées
+    par le processus principal dans l'ordre des simulations. Les mesures de
+    serpent.timing sont retournées avec le résultat (voir timing.merge).
+    """
+    stdout, stderr = io.StringIO(), io.StringIO()
+    result = error = None
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        try:
+            result = func(item)
+        except Exception as e:
+            error = e
+    return stdout.getvalue(), stderr.getvalue(), result, error, timing.take()
+
+
+def map_simulations(func, items, jobs=None):
+    """
+    Applique func à chaque élément de items (en général un dossier de simulation) et
+    retourne la liste des résultats (dicts de statistiques...) dans l'ordre de items.
+
+    Avec jobs > 1, les éléments sont répartis sur un pool de processus. func doit alors
+    être une fonction de module (ou un functools.partial) et son résultat picklable.
+    Les sorties de chaque élément sont réaffichées d'un bloc dans l'ordre de items, dès
+    que les éléments précédents sont terminés : l'affichage ne dépend pas de jobs.
+    Une exception levée par func est relevée par le processus principal.
+    """
+    items = list(items)
+    if jobs is None:
+        jobs = default_jobs()
+    jobs = max(1, min(jobs, len(items)))
+    if jobs == 1:
+        return [func(item) for item in items]
+
+    results = []
+    with worker_pool(jobs) as executor:
+        futures = [executor.submit(run_captured, func, item) for item in items]
+        for future in futures:
+            stdout, stderr, result, error, measures = future.result()
+            timing.merge(measures)
+            sys.stdout.write(stdout)
+            sys.stdout.flush()
+            sys.stderr.write(stderr)
+            if error is not None:
+                for other in futures:
+                    other.cancel()
+                raise error
+            results.append(result)
+    return results
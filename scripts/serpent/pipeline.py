@@ -0,0 +1,361 @@
+import functools
+import glob
+import os
+import sys
+import time
+import traceback
+from collections import namedtuple
+
+from . import campaign, manifest, parallel, results, timing
+from .depletion import load_dep_file
+
+# Un nœud du graphe des analyses : produit de données (tableaux lus) ou analyse (figures,
+# résumés). Ses entrées sont les noms d'autres nœuds, passés en arguments nommés :
+#  - scope 'simulation' : calculé pour chaque simulation, function(sim_dir, **entrées) ;
+#  - scope 'campaign' : calculé une fois, function(**entrées), où l'entrée d'un nœud de
+#    simulation est un dict {sim_dir: valeur} sur toutes les simulations.
+# builds, key et outputs (nœuds de simulation seulement) : manifeste de production du
+# nœud, clé de contenu key(sim_dir) et fichiers produits outputs(sim_dir), comme pour
+# manifest.Manifest.map_simulations ; un manifeste ne sert qu'à un seul nœud.
+Node = namedtuple('Node', ['name', 'function', 'inputs', 'scope', 'builds', 'key', 'outputs'])
+
+SCOPES = ('simulation', 'campaign')
+
+
+def dep_file(sim_dir):
+    """Chemin du fichier .se_dep.m d'une simulation."""
+    return os.path.join(sim_dir, f'{os.path.basename(os.path.normpath(sim_dir))}.se_dep.m')
+
+
+def dep_arrays(sim_dir):
+    """Données du fichier .se_dep.m (DepletionData), ou None s'il n'existe pas."""
+    path = dep_file(sim_dir)
+    return load_dep_file(path) if os.path.exists(path) else None
+
+
+def kinf_series(sim_dir, source='log'):
+    """Temps, burnup, k_inf et erreurs (log.txt ou .se_res.m), ou None si le fichier n'existe pas."""
+    path = results.kinf_source_file(sim_dir, source)
+    return results.load_kinf_data(path, source) if os.path.exists(path) else None
+
+
+def inventory_arrays(sim_dir, dep_arrays):
+    """
+    Jours, nucléides, densités atomiques (ADENS) et burnup d'une simulation, ou None si
+    ces données manquent. Sans burnup, les jours servent d'axe secondaire.
+    """
+    if dep_arrays is None:
+        return None
+    adens = dep_arrays.mat('ADENS') if dep_arrays.materials else None
+    if dep_arrays.days is None or dep_arrays.zai is None or adens is None:
+        print(f"Erreur : DAYS, ZAI ou ADENS non trouvés dans {dep_arrays.path}.")
+        return None
+    burnup = dep_arrays.bu
+    if burnup is None:
+        print("Burnup non trouvé, l'axe secondaire n'affichera pas cette information.")
+        burnup = dep_arrays.days
+    return dep_arrays.days, dep_arrays.nuclides, adens, burnup
+
+
+def campaign_store(dep_arrays):
+    """
+    Nœud de campagne : fichier de campagne mis à jour avec les données .se_dep.m déjà
+    lues par le graphe ({sim_dir: DepletionData}), sans relire les fichiers texte. Seules
+    les simulations du run y figurent (pas celles en cours de calcul en surveillance).
+    """
+    sim_dirs = sorted(dep_arrays)
+    data_dir = os.path.dirname(os.path.normpath(sim_dirs[0])) if sim_dirs else 'data'
+    names = {sim_dir: os.path.basename(os.path.normpath(sim_dir)) for sim_dir in sim_dirs}
+    return campaign.update_campaign(data_dir, deps={names[sim_dir]: dep for sim_dir, dep in dep_arrays.items()
+                                                    if dep is not None},
+                                    simulations=[names[sim_dir] for sim_dir in sim_dirs])
+
+
+def input_fingerprint(sim_dir):
+    """
+    Empreinte des fichiers d'une simulation (nom, taille et date de chaque fichier,
+    dossiers cachés exclus) : clé des unités sans manifeste dans le journal d'exécution.
+    """
+    files = []
+    with os.scandir(sim_dir) as entries:
+        for entry in entries:
+            if not entry.name.startswith('.') and entry.is_file():
+                stat = entry.stat()
+                files.append((entry.name, stat.st_size, stat.st_mtime_ns))
+    return sorted(files)
+
+
+def simulation_dirs(data_dir='data'):
+    """Dossiers des simulations de data_dir, triés."""
+    return sorted(glob.glob(os.path.join(data_dir, 'MOXEUS_*')))
+
+
+def _compute(spec, task):
+    """
+    Calcule, pour une simulation, les nœuds demandés et ceux dont ils dépendent (une fois
+    chacun). spec : {nom: (fonction, entrées)} ; task : (sim_dir, noms, valeurs connues).
+    Retourne les valeurs des nœuds demandés, les erreurs ({nom: message}) et la durée de
+    calcul propre à chaque nœud calculé ({nom: secondes}, entrées non comprises).
+    """
+    sim_dir, names, known = task
+    values = dict(known)
+    failed, seconds = {}, {}
+
+    def value(name):
+        if name not in values:
+            function, inputs = spec[name]
+            kwargs = {entry: value(entry) for entry in inputs}
+            start = time.perf_counter()
+            try:
+                with timing.simulation(os.path.basename(sim_dir)), timing.timer('analysis', name):
+                    values[name] = function(sim_dir, **kwargs)
+            except Exception as e:
+                print(f"Erreur dans {name} pour {os.path.basename(sim_dir)} : {e}")
+                traceback.print_exc()
+                failed[name] = f"{type(e).__name__}: {e}"
+                values[name] = None
+            seconds[name] = time.perf_counter() - start
+        return values[name]
+
+    return {name: value(name) for name in names}, failed, seconds
+
+
+class Pipeline:
+    """
+    Graphe des analyses : chaque nœud déclare ses entrées (produits de données ou autres
+    analyses) et run() calcule les nœuds nécessaires aux cibles demandées.
+
+    Pour chaque simulation, les nœuds de simulation sont calculés dans un même processus,
+    chacun une seule fois : un fichier lu sert à toutes les analyses qui en dépendent, et
+    un produit dont aucune analyse à refaire n'a besoin n'est pas lu. Les simulations sont
+    réparties sur un pool de processus ; leurs résultats sont transmis aux nœuds de
+    campagne au fil de l'eau. Les nœuds de campagne qui ne dépendent d'aucun nœud de
+    simulation sont calculés par le processus principal pendant ce temps.
+
+    Un nœud qui lève une exception vaut None : l'erreur est affichée, les nœuds qui en
+    dépendent reçoivent None et les autres analyses continuent. Les nœuds en erreur du
+    dernier run() sont listés dans failures ([(nom, sim_dir ou None)]).
+    """
+
+    def __init__(self):
+        self.nodes = {}
+        self.failures = []
+        # Journal d'exécution du dernier run() (manifest.RunStatus)
+        self.status = None
+
+    def __contains__(self, name):
+        return name in self.nodes
+
+    def add(self, name, function, inputs=(), scope='simulation', builds=None, key=None, outputs=None):
+        """Ajoute un nœud (voir Node) ; function doit être picklable (fonction de module ou partial)."""
+        if scope not in SCOPES:
+            raise ValueError(f"Portée inconnue : {scope} (portées : {', '.join(SCOPES)})")
+        if name in self.nodes:
+            raise ValueError(f"Nœud déjà défini : {name}")
+        if builds is not None and (scope != 'simulation' or key is None or outputs is None):
+            raise ValueError(f"Manifeste de {name} : nœud de simulation avec key et outputs requis")
+        self.nodes[name] = Node(name, function, tuple(inputs), scope, builds, key, outputs)
+
+    def order(self, targets):
+        """Noms des nœuds nécessaires aux cibles, chaque nœud après ses entrées."""
+        ordered, state = [], {}
+
+        def visit(name, path):
+            if name not in self.nodes:
+                raise KeyError(f"Nœud inconnu : {name}" + (f" (entrée de {path[-1]})" if path else ''))
+            if state.get(name) == 'done':
+                return
+            if state.get(name) == 'visiting':
+                raise ValueError(f"Dépendance circulaire : {' -> '.join(path + (name,))}")
+            state[name] = 'visiting'
+            node = self.nodes[name]
+            for entry in node.inputs:
+                visit(entry, path + (name,))
+                if node.scope == 'simulation' and self.nodes[entry].scope == 'campaign':
+                    raise ValueError(f"Le nœud de simulation {name} ne peut dépendre du nœud de campagne {entry}")
+            state[name] = 'done'
+            ordered.append(name)
+
+        for target in targets:
+            visit(target, ())
+        return ordered
+
+    def _needs_simulations(self, name):
+        """Vrai si un nœud de campagne dépend (directement ou non) de nœuds de simulation."""
+        node = self.nodes[name]
+        return any(self.nodes[entry].scope == 'simulation' or self._needs_simulations(entry)
+                   for entry in node.inputs)
+
+    def _run_campaign(self, name, values, sim_dirs, status):
+        node = self.nodes[name]
+        kwargs = {}
+        for entry in node.inputs:
+            if self.nodes[entry].scope == 'simulation':
+                kwargs[entry] = {sim_dir: values[entry].get(sim_dir) for sim_dir in sim_dirs}
+            else:
+                kwargs[entry] = values[entry]
+        start = time.perf_counter()
+        try:
+            with timing.timer('analysis', name):
+                values[name] = node.function(**kwargs)
+            status.record(name, None, 'done', time.perf_counter() - start)
+        except Exception as e:
+            print(f"Erreur dans {name} : {e}")
+            traceback.print_exc()
+            self.failures.append((name, None))
+            values[name] = None
+            status.record(name, None, 'failed', time.perf_counter() - start, f"{type(e).__name__}: {e}")
+
+    def run(self, targets, sim_dirs, jobs=None):
+        """
+        Calcule les cibles et retourne {nom: valeur} : pour un nœud de simulation, un dict
+        {sim_dir: valeur} (cibles et entrées des nœuds de campagne seulement ; les produits
+        intermédiaires restent dans les processus de travail).
+
+        Un nœud avec manifeste n'est recalculé que pour les simulations dont la clé ou les
+        fichiers produits ont changé ; sinon sa valeur est relue dans le manifeste. Une
+        valeur None ou False n'est pas enregistrée (la simulation sera retraitée).
+
+        Chaque unité (nœud, simulation) calculée est inscrite dès sa fin dans le journal
+        d'exécution (manifest.RunStatus) : état, durée, erreur, fichiers et résultat. Avec
+        --resume (manifest.configure(resume=True)), une unité terminée dans le journal,
+        de clé inchangée (clé du manifeste, ou à défaut empreinte du code du nœud et des
+        fichiers de la simulation) et dont les fichiers existent, n'est pas refaite, même si un arrêt
+        brutal a empêché l'écriture de son manifeste ; seules les unités en erreur ou
+        absentes du journal sont calculées. Seuls les cibles et les nœuds avec manifeste
+        sont repris : les autres valeurs transmises aux nœuds de campagne (produits de
+        données comme dep_arrays) sont recalculées, et leur résultat n'est pas inscrit
+        au journal. Les nœuds de campagne sont toujours recalculés.
+        """
+        self.failures = []
+        targets = list(targets)
+        sim_dirs = list(sim_dirs)
+        ordered = self.order(targets)
+        per_simulation = [name for name in ordered if self.nodes[name].scope == 'simulation']
+        campaign = [name for name in ordered if self.nodes[name].scope == 'campaign']
+        returned = [name for name in per_simulation
+                    if name in targets or self.nodes[name].builds is not None
+                    or any(name in self.nodes[other].inputs for other in campaign)]
+        # Nœuds dont le résultat est inscrit au journal et repris avec --resume
+        resumable = {name for name in returned if name in targets or self.nodes[name].builds is not None}
+        spec = {name: (self.nodes[name].function, self.nodes[name].inputs) for name in per_simulation}
+        values = {name: {} for name in per_simulation}
+
+        status = manifest.RunStatus()
+        resume = manifest.resuming()
+
+        # Nœuds à jour (valeur relue dans leur manifeste ou, en reprise, dans le journal
+        # d'exécution) et nœuds à calculer, par simulation
+        tasks, keys = [], {}
+        outdated_counts = {name: 0 for name in per_simulation if self.nodes[name].builds is not None}
+        resumed = 0
+        for sim_dir in sim_dirs:
+            known, names = {}, []
+            fingerprint = None
+            for name in returned:
+                node = self.nodes[name]
+                if node.builds is not None:
+                    keys[name, sim_dir] = node.key(sim_dir)
+                    if node.builds.is_current(sim_dir, keys[name, sim_dir]):
+                        node.builds.mark_current(sim_dir)
+                        known[name] = values[name][sim_dir] = node.builds.result(sim_dir)
+                        continue
+                elif name in resumable:
+                    # Sans manifeste : clé du code du nœud et des fichiers de la simulation
+                    if fingerprint is None:
+                        fingerprint = input_fingerprint(sim_dir)
+                    keys[name, sim_dir] = manifest.digest(node.function, fingerprint)
+                done = status.completed(name, sim_dir, keys.get((name, sim_dir))) \
+                    if resume and name in resumable else None
+                if done is not None:
+                    known[name] = values[name][sim_dir] = done['result']
+                    if node.builds is not None:
+                        node.builds.record(sim_dir, keys[name, sim_dir], node.outputs(sim_dir), done['result'])
+                    resumed += 1
+                    continue
+                if node.builds is not None:
+                    outdated_counts[name] += 1
+                names.append(name)
+            if names:
+                tasks.append((sim_dir, names, known))
+        for name, outdated in outdated_counts.items():
+            if outdated < len(sim_dirs):
+                print(f"{name} : {len(sim_dirs) - outdated} simulation(s) à jour, {outdated} à traiter")
+        if resume:
+            print(f"Reprise : {resumed} unité(s) terminée(s) au run précédent, "
+                  f"{sum(len(task[1]) for task in tasks)} à refaire")
+
+        def collect(task, outcome):
+            sim_dir = task[0]
+            computed, failed, seconds = outcome
+            self.failures += [(name, sim_dir) for name in failed]
+            for name, value in computed.items():
+                values[name][sim_dir] = value
+                node = self.nodes[name]
+                done = value is not None and value is not False
+                if node.builds is not None and done:
+                    node.builds.record(sim_dir, keys[name, sim_dir], node.outputs(sim_dir), value)
+                state = 'failed' if name in failed else 'done' if done else 'skipped'
+                status.record(name, sim_dir, state, seconds.get(name), failed.get(name),
+                              node.outputs(sim_dir) if node.outputs is not None and done else (),
+                              keys.get((name, sim_dir)), value if done and name in resumable else None)
+            # Produits de données en erreur (leurs analyses ont reçu None)
+            for name in failed:
+                if name not in computed:
+                    status.record(name, sim_dir, 'failed', seconds.get(name), failed[name])
+
+        # Nœuds de campagne indépendants des simulations (fichier de campagne...)
+        early = [name for name in campaign if not self._needs_simulations(name)]
+        compute = functools.partial(_compute, spec)
+        if jobs is None:
+            jobs = parallel.default_jobs()
+        jobs = max(1, min(jobs, len(tasks)))
+        try:
+            if jobs == 1:
+                for name in early:
+                    self._run_campaign(name, values, sim_dirs, status)
+                for task in tasks:
+                    collect(task, compute(task))
+            else:
+                with parallel.worker_pool(jobs) as executor:
+                    futures = [executor.submit(parallel.run_captured, compute, task) for task in tasks]
+                    for name in early:
+                        self._run_campaign(name, values, sim_dirs, status)
+                    # Sorties de chaque simulation réaffichées d'un bloc, dans l'ordre des simulations
+                    for task, future in zip(tasks, futures):
+                        stdout, stderr, outcome, error, measures = future.result()
+                        timing.merge(measures)
+                        sys.stdout.write(stdout)
+                        sys.stdout.flush()
+                        sys.stderr.write(stderr)
+                        if error is not None:
+                            for other in futures:
+                                other.cancel()
+                            raise error
+                        collect(task, outcome)
+        finally:
+            # Les simulations déjà traitées restent enregistrées, même après une erreur
+            for builds in {id(self.nodes[name].builds): self.nodes[name].builds for name in per_simulation
+                           if self.nodes[name].builds is not None}.values():
+                builds.save()
+            status.close()
+
+        # Nœuds de campagne, une fois les résultats de toutes les simulations reçus
+        try:
+            for name in campaign:
+                if name not in early:
+                    self._run_campaign(name, values, sim_dirs, status)
+        finally:
+            status.close()
+        self.status = status
+        return {name: values[name] for name in ordered if name in values}
+
+
+def simulation_pipeline(source='log'):
+    """Graphe contenant les produits de données partagés par les analyses."""
+    pipeline = Pipeline()
+    pipeline.add('dep_arrays', dep_arrays)
+    pipeline.add('kinf_series', functools.partial(kinf_series, source=source))
+    pipeline.add('inventory_arrays', inventory_arrays, ['dep_arrays'])
+    pipeline.add('campaign_store', campaign_store, ['dep_arrays'], scope='campaign')
+    return pipeline
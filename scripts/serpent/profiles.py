@@ -0,0 +1,111 @@
+import os
+
+from . import lazy, timing
+
+plt = lazy.module('matplotlib.pyplot')
+
+# Profils de rendu des figures :
+#  - dpi, format : résolution et format des fichiers (png, pdf, svg)
+#  - tight : recadrage bbox_inches='tight' (pour les figures qui l'utilisent)
+#  - minor_grid : grilles secondaires (graduations mineures)
+#  - rasterized : courbes rastérisées dans les formats vectoriels
+#  - rc : paramètres matplotlib propres au profil
+PROFILES = {
+    # Sorties historiques : PNG 300 dpi recadrés
+    'publication': {'dpi': 300, 'format': 'png', 'tight': True, 'minor_grid': True, 'rasterized': False,
+                    'rc': {}},
+    # Aperçu rapide pour suivre les tendances : PNG 72 dpi, sans recadrage ni grilles secondaires
+    'preview': {'dpi': 72, 'format': 'png', 'tight': False, 'minor_grid': False, 'rasterized': True,
+                'rc': {'path.simplify': True, 'path.simplify_threshold': 1.0}},
+    # Figures vectorielles (PDF par défaut, ou SVG avec --format svg)
+    'vector': {'dpi': 300, 'format': 'pdf', 'tight': True, 'minor_grid': True, 'rasterized': False,
+               'rc': {'pdf.fonttype': 42, 'svg.fonttype': 'none'}},
+}
+
+DEFAULT_PROFILE = 'publication'
+
+FORMATS = ('png', 'pdf', 'svg')
+
+_settings = {'profile': DEFAULT_PROFILE, 'format': None}
+
+
+def configure(profile=DEFAULT_PROFILE, format=None):
+    """Choisit le profil de rendu des figures ; format remplace celui du profil."""
+    if profile not in PROFILES:
+        raise ValueError(f"Profil de rendu inconnu : {profile} (profils : {', '.join(PROFILES)})")
+    _settings['profile'] = profile
+    _settings['format'] = format
+    _apply_rc()
+
+
+def add_profile_arguments(parser):
+    """Ajoute les options --profile et --format à un argparse.ArgumentParser."""
+    parser.add_argument('--profile', choices=list(PROFILES), default=DEFAULT_PROFILE,
+                        help="Profil de rendu des figures : preview (aperçu rapide, 72 dpi), "
+                             "publication (PNG 300 dpi, défaut) ou vector (PDF)")
+    parser.add_argument('--format', choices=FORMATS, default=None,
+                        help="Format des figures, à la place de celui du profil (ex. svg avec --profile vector)")
+
+
+def configure_from_args(args):
+    """Applique les options --profile/--format lues par argparse."""
+    configure(args.profile, args.format)
+
+
+def settings():
+    """Options courantes du profil de rendu (configure(**settings()) les rétablit, dans un autre processus)."""
+    return dict(_settings)
+
+
+def current():
+    """Paramètres du profil de rendu actif (dict de PROFILES, format éventuellement remplacé)."""
+    profile = dict(PROFILES[_settings['profile']], name=_settings['profile'])
+    if _settings['format']:
+        profile['format'] = _settings['format']
+    return profile
+
+
+def _apply_rc():
+    """
+    Applique les paramètres matplotlib du profil : tout de suite si matplotlib est déjà
+    importé, sinon à son premier import (voir lazy.on_import), sans le charger ici.
+    """
+    lazy.on_import('matplotlib', _update_rc)
+
+
+def _update_rc():
+    import matplotlib
+    matplotlib.rcParams.update(current()['rc'])
+
+
+def figure_path(path):
+    """Chemin d'une figure avec l'extension du format du profil ('x.png' -> 'x.pdf')."""
+    return os.path.splitext(path)[0] + '.' + current()['format']
+
+
+def minor_grid(ax, **kwargs):
+    """Grille des graduations mineures, sauf pour les profils qui les omettent (preview)."""
+    if current()['minor_grid']:
+        ax.grid(True, which='minor', **kwargs)
+
+
+def savefig(path, fig=None, tight=True):
+    """
+    Enregistre une figure (la figure courante de pyplot par défaut) selon le profil actif
+    et retourne le chemin du fichier écrit, dont l'extension suit le format du profil.
+    tight=False pour les figures historiquement enregistrées sans bbox_inches='tight' et
+    pour celles à marges fixes (évite un second tracé complet).
+    """
+    if fig is None:
+        fig = plt.gcf()
+    profile = current()
+    if profile['rasterized'] and profile['format'] != 'png':
+        for ax in fig.axes:
+            for line in ax.lines:
+                line.set_rasterized(True)
+    path = figure_path(path)
+    kwargs = {'bbox_inches': 'tight'} if tight and profile['tight'] else {}
+    with timing.timer('write', 'savefig'):
+        fig.savefig(path, dpi=profile['dpi'], format=profile['format'], **kwargs)
+    timing.count('figures_written')
+    return path
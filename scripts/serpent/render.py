@@ -0,0 +1,189 @@
+from collections import namedtuple
+import sys
+import time
+import numpy as np
+
+from . import lazy, manifest, parallel, profiles, timing
+
+plt = lazy.module('matplotlib.pyplot')
+
+# Une figure à produire : fonction de tracé (fonction de module, picklable), ses
+# arguments (tableaux...) et le fichier produit, utilisé pour le suivi de progression ;
+# simulation : étiquette des mesures de serpent.timing (simulation en cours à la soumission).
+FigureJob = namedtuple('FigureJob', ['output', 'function', 'args', 'kwargs', 'simulation'], defaults=(None,))
+
+
+# Modèles de figures du processus courant, par classe (voir template())
+_templates = {}
+
+
+def _use_agg():
+    """Backend Agg (rendu PNG sans affichage), le seul utile aux processus de rendu."""
+    if plt.get_backend().lower() != 'agg':
+        plt.switch_backend('Agg')
+
+
+def template(cls):
+    """
+    Instance de FigureTemplate `cls` propre au processus courant, construite au premier
+    appel puis réutilisée pour toutes les figures de même type et de même profil de
+    rendu tracées par ce processus.
+    """
+    key = (cls, profiles.current()['name'])
+    if key not in _templates:
+        _templates[key] = cls()
+    return _templates[key]
+
+
+class FigureTemplate:
+    """
+    Figure construite une seule fois (axes, grilles, localisateurs de graduations, axe
+    secondaire du burnup) puis réutilisée : chaque tracé ne met à jour que les données
+    des courbes (set_data), les textes et les limites avant save().
+
+    Les sous-classes construisent self.fig dans __init__ sans passer par pyplot : la
+    figure n'est jamais fermée et n'entre pas dans le décompte des figures ouvertes.
+    """
+
+    # Nombre de graduations régulières de l'axe du temps
+    n_ticks = 10
+
+    def set_time_axis(self, ax, burnup_ax, days, burnup):
+        """
+        Graduations régulières en jours sur ax et burnup correspondant sur l'axe
+        secondaire burnup_ax (créé par twiny). À appeler après la mise à jour des limites.
+        """
+        days_ticks = np.linspace(min(days), max(days), self.n_ticks)
+        ax.set_xticks(days_ticks)
+        ax.set_xticklabels([f'{d:.1f}' for d in days_ticks])
+        burnup_ax.set_xlim(ax.get_xlim())
+        burnup_ax.set_xticks(days_ticks)
+        burnup_ax.set_xticklabels([f'{b:.1f}' for b in np.interp(days_ticks, days, burnup)])
+
+    @staticmethod
+    def rescale(*axes):
+        """Recalcule les limites des axes à partir des seules courbes visibles."""
+        for ax in axes:
+            ax.relim(visible_only=True)
+        for ax in axes:
+            ax.set_autoscale_on(True)
+            ax.autoscale_view()
+
+    def save(self, path):
+        """Enregistre la figure selon le profil de rendu actif ; retourne le fichier écrit."""
+        return profiles.savefig(path, self.fig)
+
+
+def _render(job):
+    """Exécute une FigureJob et retourne (résultat de la fonction, durée en secondes)."""
+    start = time.perf_counter()
+    with timing.simulation(job.simulation), timing.timer('render', job.function.__name__):
+        result = job.function(*job.args, **job.kwargs)
+    return result, time.perf_counter() - start
+
+
+class RenderPool:
+    """
+    Service de rendu des figures : les boucles d'extraction soumettent des FigureJob
+    (submit) et les figures sont tracées par un pool de processus avec le backend Agg.
+
+    wait() affiche la progression et les sorties de chaque figure dans l'ordre de
+    soumission, quel que soit le nombre de processus, et retourne pour chaque figure
+    un dict {'output', 'seconds', 'result'} (résultat de la fonction de tracé).
+    Avec jobs=1, les figures sont tracées dans le processus courant, lors de wait().
+
+    Avec un manifest.Manifest, une figure dont les données, les paramètres, le code et
+    le profil de rendu n'ont pas changé n'est pas retracée : son résultat est relu
+    dans le manifeste ('seconds' vaut alors None).
+    """
+
+    def __init__(self, jobs=None, progress=True, manifest=None):
+        self.jobs = parallel.default_jobs() if jobs is None else max(1, jobs)
+        self.progress = progress
+        self.manifest = manifest
+        self._jobs = []
+        # Par figure : clé de contenu (None sans manifeste) et future (ou résultat à jour)
+        self._keys = []
+        self._futures = []
+        self._executor = None
+        self._start = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    def submit(self, output, function, *args, **kwargs):
+        """Ajoute une figure à produire ; retourne sa position dans la liste des résultats."""
+        job = FigureJob(output, function, args, kwargs, timing.current_simulation())
+        if self._start is None:
+            self._start = time.perf_counter()
+        self._jobs.append(job)
+        key = future = None
+        if self.manifest is not None:
+            key = manifest.digest(_render, function, args, kwargs, profiles.current())
+            if self.manifest.is_current(profiles.figure_path(output), key):
+                self.manifest.mark_current(profiles.figure_path(output))
+                key, future = None, ('', '', (self.manifest.result(profiles.figure_path(output)), None), None, None)
+        if future is None and self.jobs > 1:
+            if self._executor is None:
+                self._executor = parallel.worker_pool(self.jobs, initializer=_use_agg)
+            future = self._executor.submit(parallel.run_captured, _render, job)
+        self._keys.append(key)
+        self._futures.append(future)
+        return len(self._jobs) - 1
+
+    def _outcomes(self):
+        """(stdout, stderr, (résultat, durée), erreur, mesures) de chaque figure, dans l'ordre."""
+        for job, future in zip(self._jobs, self._futures):
+            if isinstance(future, tuple):
+                # Figure à jour
+                yield future
+            elif future is not None:
+                yield future.result()
+            else:
+                _use_agg()
+                start = time.perf_counter()
+                try:
+                    yield '', '', _render(job), None, None
+                except Exception as e:
+                    yield '', '', (None, time.perf_counter() - start), e, None
+
+    def wait(self):
+        """Attend toutes les figures soumises et retourne leurs durées et résultats."""
+        total = len(self._jobs)
+        timings = []
+        try:
+            outcomes = zip(self._jobs, self._keys, self._outcomes())
+            for position, (job, key, (stdout, stderr, outcome, error, measures)) in enumerate(outcomes, 1):
+                timing.merge(measures)
+                sys.stdout.write(stdout)
+                sys.stdout.flush()
+                sys.stderr.write(stderr)
+                if error is not None:
+                    self.close()
+                    raise error
+                result, seconds = outcome
+                timings.append({'output': job.output, 'seconds': seconds, 'result': result})
+                if key is not None:
+                    self.manifest.record(profiles.figure_path(job.output), key, result=result)
+                if self.progress and seconds is not None:
+                    print(f"[{position}/{total}] {profiles.figure_path(job.output)} ({seconds:.2f} s)")
+        finally:
+            # Les figures déjà tracées restent enregistrées, même après une erreur
+            if self.manifest is not None:
+                self.manifest.save()
+        if self.progress and timings:
+            elapsed = time.perf_counter() - self._start
+            rendered = [entry['seconds'] for entry in timings if entry['seconds'] is not None]
+            current = f", {total - len(rendered)} à jour" if len(rendered) < total else ''
+            print(f"{len(rendered)} figures en {elapsed:.1f} s ({sum(rendered):.1f} s de rendu cumulé, "
+                  f"{self.jobs} processus){current}")
+        self._jobs, self._keys, self._futures, self._start = [], [], [], None
+        return timings
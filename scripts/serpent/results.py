@@ -0,0 +1,344 @@
+import os
+import re
+import numpy as np
+
+from . import cache, timing
+from .logfile import load_corrector_data
+
+# Sources possibles des séries de k_inf : log.txt (étapes corrector) ou .se_res.m (ABS_KINF)
+KINF_SOURCES = ('log', 'res')
+
+# Ligne de résultat : "NOM (idx, 1) = valeur ;" ou "NOM (idx, [1: N]) = [ v1 v2 ... ];"
+# Le motif commence par '\n' : la recherche saute directement de ligne en ligne.
+_RESULT_LINE = re.compile(rb'\n(\w+)[ \t]*\(idx, [^=\n]*=[ \t]*([^\n]*)')
+
+# Bloc de résultats (une étape) écrit jusqu'au bout
+_COMPLETED_LINE = re.compile(rb'\nSIMULATION_COMPLETED[ \t]*\(idx, 1\)[ \t]*=[ \t]*1 ;')
+
+# Index des positions : marqueur qui suit le nom de chaque variable
+_INDEX_MARKER = b'(idx, '
+
+# Préfixes des clés du cache binaire
+_META_PREFIX = 'meta__'
+_STAT_KEY = '__statistical__'
+
+
+class ResultsData:
+    """
+    Contenu d'un fichier .se_res.m : un tableau (n_steps, width) par variable numérique
+    (une ligne par bloc idx, c'est-à-dire par pas de burnup) et les variables texte
+    (VERSION, TITLE, CPU_TYPE...) conservées comme métadonnées.
+
+    Les variables statistiques de Serpent alternent moyenne et erreur relative :
+    mean(name) et error(name) en donnent les colonnes séparées.
+    """
+
+    def __init__(self, path, values, metadata=None, statistical=None):
+        self.path = path
+        self.values = values
+        self.metadata = metadata or {}
+        self.statistical = set(statistical or ())
+
+    @property
+    def n_steps(self):
+        return max((len(array) for array in self.values.values()), default=0)
+
+    def mean(self, name):
+        """Moyennes d'une variable statistique, de forme (n_steps, width / 2)."""
+        array = self.values[name]
+        return array[:, 0::2] if name in self.statistical else array
+
+    def error(self, name):
+        """Erreurs relatives d'une variable statistique, de forme (n_steps, width / 2)."""
+        if name not in self.statistical:
+            raise KeyError(f"{name} n'est pas une variable statistique (moyenne, erreur)")
+        return self.values[name][:, 1::2]
+
+    def __contains__(self, name):
+        return name in self.values or name in self.metadata
+
+    def __getitem__(self, name):
+        if name in self.values:
+            return self.values[name]
+        return self.metadata[name]
+
+    def to_arrays(self):
+        """Aplatit les données en un dict de tableaux NumPy (format du cache binaire)."""
+        arrays = dict(self.values)
+        for name, strings in self.metadata.items():
+            arrays[_META_PREFIX + name] = np.array(strings)
+        arrays[_STAT_KEY] = np.array(sorted(self.statistical), dtype=str)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, path, arrays):
+        """Reconstruit un ResultsData à partir du dict produit par to_arrays()."""
+        values = {}
+        metadata = {}
+        statistical = ()
+        for name, array in arrays.items():
+            if name == _STAT_KEY:
+                statistical = array.tolist()
+            elif name.startswith(_META_PREFIX):
+                metadata[name[len(_META_PREFIX):]] = array.tolist()
+            else:
+                values[name] = array
+        return cls(path, values, metadata, statistical)
+
+
+def _is_statistical(tokens):
+    """
+    Serpent écrit les estimateurs statistiques en paires "1.34158E+00 0.00080" : moyenne en
+    notation E, erreur relative sur 7 caractères au plus ("0.00080", "9.1E-05").
+    """
+    if not tokens or len(tokens) % 2:
+        return False
+    return all(b'E' in mean and len(err) <= 7 for mean, err in zip(tokens[0::2], tokens[1::2]))
+
+
+def _decode_values(rows, width):
+    """Convertit les valeurs texte d'une variable (une chaîne par pas) en tableau (n, width)."""
+    text = b' '.join(rows)
+    values = np.fromstring(text.decode('ascii'), dtype=np.float64, sep=' ')
+    if values.size != len(rows) * width:
+        raise ValueError(f"{values.size} valeurs lues pour {len(rows)} x {width}")
+    if not re.search(rb'[.eEnN]', text):
+        values = values.astype(np.int64)
+    return values.reshape(len(rows), width)
+
+
+def _result_lines(content):
+    """Produit (nom, valeurs texte) pour chaque ligne de résultat complète (terminée par ';')."""
+    for name, value in _RESULT_LINE.findall(content):
+        value = value.rstrip()
+        if value.endswith(b';'):
+            yield name.decode(), value[:-1].strip()
+
+
+def _convert_variable(rows, n_steps):
+    """
+    Convertit les valeurs texte d'une variable (une par pas, sans ';' final).
+    Retourne (chaînes, None, False) pour une variable texte, (None, tableau, statistique) sinon.
+    Lève ValueError si la largeur varie d'un pas à l'autre.
+    """
+    if rows[0].startswith(b"'"):
+        return [row.strip(b"'").decode(errors='replace') for row in rows], None, False
+    rows = [row.strip(b'[] ') for row in rows]
+    tokens = rows[0].split()
+    array = _decode_values(rows, len(tokens))
+    if len(rows) < n_steps:
+        padded = np.full((n_steps, array.shape[1]), np.nan)
+        padded[:len(rows)] = array
+        array = padded
+    return None, array, _is_statistical(tokens)
+
+
+@timing.timed('parse')
+def read_res_file(path):
+    """
+    Lit un fichier .se_res.m en une seule passe et retourne un ResultsData.
+    Une variable absente des derniers blocs (fichier tronqué) est complétée par des NaN.
+    """
+    with open(path, 'rb') as f:
+        content = b'\n' + f.read()
+    timing.count('bytes_read', len(content) - 1)
+    if timing.enabled():
+        timing.count('lines_parsed', content.count(b'\n') - 1)
+
+    raw = {}
+    for name, value in _result_lines(content):
+        raw.setdefault(name, []).append(value)
+    n_steps = max((len(rows) for rows in raw.values()), default=0)
+
+    values = {}
+    metadata = {}
+    statistical = []
+    for name, rows in raw.items():
+        try:
+            strings, array, is_statistical = _convert_variable(rows, n_steps)
+        except ValueError:
+            print(f"Largeur variable pour {name} dans {path}, variable ignorée")
+            continue
+        if strings is not None:
+            metadata[name] = strings
+            continue
+        values[name] = array
+        if is_statistical:
+            statistical.append(name)
+
+    return ResultsData(path, values, metadata, statistical)
+
+
+def load_res_file(path):
+    """
+    Comme read_res_file, mais en passant par le cache binaire (data/MOXEUS_xxxxx/.cache/) :
+    le texte n'est relu que si le fichier .se_res.m a changé.
+    """
+    arrays = cache.load_or_parse(path, 'res', lambda p: read_res_file(p).to_arrays())
+    return ResultsData.from_arrays(path, arrays)
+
+
+@timing.timed('parse')
+def build_res_index(path):
+    """
+    Index des positions des variables d'un fichier .se_res.m, construit en une passe :
+    pour chaque ligne de résultat, nom, pas (rang d'apparition du nom), position en
+    octets et longueur du texte des valeurs.
+    """
+    with open(path, 'rb') as f:
+        content = f.read()
+    timing.count('bytes_read', len(content))
+
+    # Chaque morceau se termine par le nom d'une variable ; le suivant commence par
+    # son indice "1) = ..." ou "[1: N]) = ..."
+    pieces = content.split(_INDEX_MARKER)
+    sizes = np.fromiter(map(len, pieces), dtype=np.int64, count=len(pieces))
+    markers = np.cumsum(sizes[:-1]) + len(_INDEX_MARKER) * np.arange(len(pieces) - 1)
+    equals = np.array([piece.find(b'=') for piece in pieces[1:]], dtype=np.int64)
+    offsets = markers + len(_INDEX_MARKER) + equals + 1
+
+    newlines = np.append(np.flatnonzero(np.frombuffer(content, dtype=np.uint8) == ord('\n')), len(content))
+    line_ends = newlines[np.searchsorted(newlines, markers)]
+    valid = (equals >= 0) & (offsets <= line_ends)
+
+    rows = np.flatnonzero(valid).tolist()
+    names = [pieces[row][pieces[row].rfind(b'\n') + 1:].rstrip() for row in rows]
+    keep = [name.replace(b'_', b'').isalnum() for name in names]
+    rows = [row for row, ok in zip(rows, keep) if ok]
+    names = [name for name, ok in zip(names, keep) if ok]
+
+    # Numéro de chaque variable (ordre d'apparition) et rang de chaque occurrence (pas)
+    name_ids = {}
+    ids = [name_ids.setdefault(name, len(name_ids)) for name in names]
+    counts = [0] * len(name_ids)
+    steps = []
+    for name_id in ids:
+        steps.append(counts[name_id])
+        counts[name_id] += 1
+
+    rows = np.array(rows, dtype=np.int64)
+    return {
+        'names': np.array([name.decode() for name in name_ids], dtype=str),
+        'name_id': np.array(ids, dtype=np.int32),
+        'step': np.array(steps, dtype=np.int32),
+        'offset': offsets[rows],
+        'length': (line_ends[rows] - offsets[rows]).astype(np.int32),
+    }
+
+
+def load_res_index(path):
+    """Index des variables de .se_res.m, conservé dans le cache binaire à côté du fichier."""
+    return cache.load_or_parse(path, 'res_index', build_res_index)
+
+
+class LazyResults(ResultsData):
+    """
+    Accès paresseux à un fichier .se_res.m : res["ABS_KINF"] ne lit et ne décode que les
+    lignes de cette variable (à l'aide de l'index des positions), puis garde le résultat.
+    """
+
+    def __init__(self, path, index=None):
+        super().__init__(path, {})
+        index = load_res_index(path) if index is None else index
+        self.names = index['names'].tolist()
+        order = np.argsort(index['name_id'], kind='stable')
+        bounds = np.searchsorted(index['name_id'][order], np.arange(len(self.names) + 1))
+        self._rows = {name: (index['offset'][order[lo:hi]], index['length'][order[lo:hi]])
+                      for name, lo, hi in zip(self.names, bounds[:-1], bounds[1:])}
+        self._n_steps = int(index['step'].max()) + 1 if len(index['step']) else 0
+        self._invalid = set()
+
+    @property
+    def n_steps(self):
+        return self._n_steps
+
+    def _load(self, name):
+        """Lit et décode les lignes d'une variable si ce n'est pas déjà fait."""
+        if name in self.values or name in self.metadata or name in self._invalid:
+            return
+        offsets, lengths = self._rows[name]
+        rows = []
+        with timing.timer('parse', 'res_variable'), open(self.path, 'rb') as f:
+            for offset, length in zip(offsets, lengths):
+                f.seek(offset)
+                value = f.read(length).rstrip()
+                if value.endswith(b';'):
+                    rows.append(value[:-1].strip())
+        timing.count('bytes_read', int(sum(lengths)))
+        timing.count('lines_parsed', len(rows))
+        try:
+            strings, array, is_statistical = _convert_variable(rows, self._n_steps)
+        except (IndexError, ValueError):
+            print(f"Largeur variable pour {name} dans {self.path}, variable ignorée")
+            self._invalid.add(name)
+            return
+        if strings is not None:
+            self.metadata[name] = strings
+            return
+        self.values[name] = array
+        if is_statistical:
+            self.statistical.add(name)
+
+    def mean(self, name):
+        self._load(name)
+        return super().mean(name)
+
+    def error(self, name):
+        self._load(name)
+        return super().error(name)
+
+    def __contains__(self, name):
+        return name in self._rows
+
+    def __getitem__(self, name):
+        if name not in self._rows:
+            raise KeyError(name)
+        self._load(name)
+        return super().__getitem__(name)
+
+
+def open_res_file(path):
+    """Ouvre un fichier .se_res.m en accès paresseux (voir LazyResults)."""
+    return LazyResults(path)
+
+
+@timing.timed('parse')
+def completed_steps(res_file):
+    """Nombre de blocs de résultats (étapes) du fichier .se_res.m marqués SIMULATION_COMPLETED = 1."""
+    with open(res_file, 'rb') as file:
+        return len(_COMPLETED_LINE.findall(file.read()))
+
+
+@timing.timed('parse')
+def extract_kinf_data(res_file):
+    """
+    Séries de k_inf (ABS_KINF) lues dans le fichier .se_res.m, au même format que
+    extract_corrector_data : temps (jours), burnup (MWd/kgU), k_inf, erreurs (en unité de k_eff).
+    Serpent n'écrit dans ce fichier que les résultats des étapes predictor.
+    """
+    res = open_res_file(res_file)
+    k_inf = res.mean('ABS_KINF')[:, 0]
+    # Erreur relative convertie en erreur absolue, comme dans log.txt
+    errors = k_inf * res.error('ABS_KINF')[:, 0]
+    return (res['BURN_DAYS'][:, 0].tolist(), res['BURNUP'][:, 0].tolist(),
+            k_inf.tolist(), errors.tolist())
+
+
+def add_kinf_source_argument(parser):
+    """Ajoute l'option --source (log ou res) à un argparse.ArgumentParser."""
+    parser.add_argument('--source', choices=KINF_SOURCES, default='log',
+                        help="Source de k_inf : log.txt (corrector, par défaut) ou .se_res.m (ABS_KINF)")
+
+
+def kinf_source_file(sim_path, source='log'):
+    """Chemin du fichier lu pour k_inf dans le dossier d'une simulation."""
+    if source == 'res':
+        return os.path.join(sim_path, f"{os.path.basename(os.path.normpath(sim_path))}.se_res.m")
+    return os.path.join(sim_path, 'log.txt')
+
+
+def load_kinf_data(path, source='log'):
+    """Temps, burnup, k_inf et erreurs depuis log.txt ou .se_res.m (voir kinf_source_file)."""
+    if source == 'res':
+        return extract_kinf_data(path)
+    return load_corrector_data(path)
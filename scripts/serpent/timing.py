@@ -0,0 +1,235 @@
+"""
+Instrumentation légère des étapes chaudes : chronomètres (contexte timer(), décorateur
+timed()) et compteurs (count()), étiquetés par étape et par simulation.
+
+    with timing.timer('compute', 'pearsonr'):
+        ...
+    @timing.timed('parse')
+    def read_dep_file(path): ...
+
+Étapes : 'parse' (lecture des fichiers), 'compute' (calculs), 'render' (tracé),
+'write' (écriture des figures et fichiers), 'analysis' (nœud du graphe des analyses,
+étapes précédentes comprises). La simulation est celle du contexte simulation() en
+cours (posé par serpent.pipeline pour chaque nœud de simulation).
+
+Désactivée par défaut : timer() retourne alors un contexte vide partagé, les fonctions
+décorées et count() ne font qu'un test avant de rendre la main.
+"""
+import contextlib
+import csv
+import functools
+import json
+import os
+import time
+
+STAGES = ('parse', 'compute', 'render', 'write', 'analysis')
+
+# Fichiers du profil (<préfixe>.json et <préfixe>.csv) avec --timings sans argument
+DEFAULT_OUTPUT = 'figures/timings'
+
+_settings = {'enabled': False}
+
+# Simulation du contexte en cours (voir simulation())
+_state = {'simulation': None}
+
+# (étape, nom, simulation) -> [appels, secondes, maximum] ; (compteur, simulation) -> valeur
+_records = {}
+_counters = {}
+
+_NULL = contextlib.nullcontext()
+
+
+def configure(enabled=False):
+    """enabled=True : active les chronomètres et les compteurs."""
+    _settings['enabled'] = enabled
+
+
+def add_timing_arguments(parser):
+    """Ajoute l'option --timings à un argparse.ArgumentParser."""
+    parser.add_argument('--timings', nargs='?', const=DEFAULT_OUTPUT, default=None, metavar='PRÉFIXE',
+                        help="Mesurer la durée des lectures, calculs, tracés et écritures ; écrit "
+                             f"PRÉFIXE.json et PRÉFIXE.csv (défaut : {DEFAULT_OUTPUT}) et affiche les plus coûteux")
+
+
+def configure_from_args(args):
+    """Applique l'option --timings lue par argparse."""
+    configure(enabled=args.timings is not None)
+
+
+def settings():
+    """Options courantes des mesures (configure(**settings()) les rétablit, dans un autre processus)."""
+    return dict(_settings)
+
+
+def enabled():
+    return _settings['enabled']
+
+
+class _Timer:
+    __slots__ = ('key', 'start')
+
+    def __init__(self, key):
+        self.key = key
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _add(self.key, time.perf_counter() - self.start)
+
+
+def _add(key, seconds):
+    record = _records.get(key)
+    if record is None:
+        _records[key] = [1, seconds, seconds]
+    else:
+        record[0] += 1
+        record[1] += seconds
+        record[2] = max(record[2], seconds)
+
+
+def timer(stage, name, simulation=None):
+    """Contexte qui chronomètre name dans l'étape stage (simulation du contexte par défaut)."""
+    if not _settings['enabled']:
+        return _NULL
+    return _Timer((stage, name, simulation or _state['simulation']))
+
+
+def timed(stage, name=None):
+    """Décorateur : chronomètre chaque appel de la fonction (nom de la fonction par défaut)."""
+    def decorate(function):
+        label = name or function.__name__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _settings['enabled']:
+                return function(*args, **kwargs)
+            with _Timer((stage, label, _state['simulation'])):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name, amount=1):
+    """Ajoute amount au compteur name (octets lus, lignes décodées, figures écrites...)."""
+    if _settings['enabled']:
+        key = (name, _state['simulation'])
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+@contextlib.contextmanager
+def simulation(name):
+    """Étiquette les mesures du bloc avec la simulation name."""
+    previous = _state['simulation']
+    _state['simulation'] = name
+    try:
+        yield
+    finally:
+        _state['simulation'] = previous
+
+
+def current_simulation():
+    return _state['simulation']
+
+
+def take():
+    """Retire et retourne les mesures du processus courant (pour les transmettre au parent)."""
+    if not _settings['enabled']:
+        return None
+    snapshot = (dict(_records), dict(_counters))
+    _records.clear()
+    _counters.clear()
+    return snapshot
+
+
+def merge(snapshot):
+    """Ajoute les mesures d'un processus de travail (voir take()) à celles du processus courant."""
+    if snapshot is None:
+        return
+    records, counters = snapshot
+    for key, (calls, seconds, longest) in records.items():
+        record = _records.setdefault(key, [0, 0.0, 0.0])
+        record[0] += calls
+        record[1] += seconds
+        record[2] = max(record[2], longest)
+    for key, value in counters.items():
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def summary():
+    """Mesures regroupées par (étape, nom), toutes simulations confondues, triées par durée."""
+    totals = {}
+    for (stage, name, _), (calls, seconds, longest) in _records.items():
+        total = totals.setdefault((stage, name), [0, 0.0, 0.0])
+        total[0] += calls
+        total[1] += seconds
+        total[2] = max(total[2], longest)
+    return sorted(((stage, name, calls, seconds, longest) for (stage, name), (calls, seconds, longest)
+                   in totals.items()), key=lambda row: -row[3])
+
+
+def counters():
+    """Compteurs, toutes simulations confondues."""
+    totals = {}
+    for (name, _), value in _counters.items():
+        totals[name] = totals.get(name, 0) + value
+    return totals
+
+
+def report(top=15, wall_seconds=None):
+    """
+    Affiche les top mesures les plus coûteuses et les compteurs. Avec wall_seconds, la
+    part de chaque mesure dans la durée du run (durées des processus additionnées : plus
+    de 100 % possible avec -j).
+    """
+    rows = summary()
+    if not rows:
+        return
+    print(f"\nMesures ({len(rows)} postes, {top} plus coûteux ; 'analysis' comprend les autres étapes) :")
+    print(f"  {'Étape':<9} {'Nom':<32} {'Appels':>7} {'Total (s)':>10} {'Moyen (ms)':>11} {'Max (ms)':>9}"
+          + ("  Part" if wall_seconds else ''))
+    for stage, name, calls, seconds, longest in rows[:top]:
+        share = f"  {100 * seconds / wall_seconds:4.0f} %" if wall_seconds else ''
+        print(f"  {stage:<9} {name[:32]:<32} {calls:>7} {seconds:>10.2f} {1e3 * seconds / calls:>11.2f} "
+              f"{1e3 * longest:>9.1f}{share}")
+    totals = counters()
+    if totals:
+        print("  Compteurs : " + ', '.join(f"{name} = {_format_count(name, value)}"
+                                            for name, value in sorted(totals.items())))
+
+
+def _format_count(name, value):
+    if name.startswith('bytes') and value >= 1 << 20:
+        return f"{value / (1 << 20):.1f} Mo"
+    return f"{value:,}".replace(',', ' ')
+
+
+def write(prefix=DEFAULT_OUTPUT):
+    """
+    Écrit le profil : prefix.json (mesures par étape, nom et simulation, totaux et
+    compteurs) et prefix.csv (une ligne par mesure ou compteur et par simulation).
+    Retourne les deux chemins.
+    """
+    os.makedirs(os.path.dirname(prefix) or '.', exist_ok=True)
+    records = [{'stage': stage, 'name': name, 'simulation': simulation, 'calls': calls,
+                'seconds': seconds, 'max_seconds': longest}
+               for (stage, name, simulation), (calls, seconds, longest) in sorted(
+                   _records.items(), key=lambda item: -item[1][1])]
+    counter_rows = [{'name': name, 'simulation': simulation, 'value': value}
+                    for (name, simulation), value in sorted(_counters.items(), key=lambda item: repr(item[0]))]
+    json_path, csv_path = prefix + '.json', prefix + '.csv'
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump({'summary': [dict(zip(('stage', 'name', 'calls', 'seconds', 'max_seconds'), row))
+                               for row in summary()],
+                   'counters': counters(), 'records': records, 'counters_by_simulation': counter_rows},
+                  f, indent=1, ensure_ascii=False)
+    with open(csv_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['type', 'stage', 'name', 'simulation', 'calls', 'seconds', 'max_seconds', 'value'])
+        for row in records:
+            writer.writerow(['timer', row['stage'], row['name'], row['simulation'] or '', row['calls'],
+                             f"{row['seconds']:.6f}", f"{row['max_seconds']:.6f}", ''])
+        for row in counter_rows:
+            writer.writerow(['counter', '', row['name'], row['simulation'] or '', '', '', '', row['value']])
+    return json_path, csv_path
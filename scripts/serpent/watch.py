@@ -0,0 +1,108 @@
+"""
+Surveillance du dossier data/ : repère, à chaque passage, les simulations terminées
+nouvelles ou modifiées depuis leur dernier traitement.
+
+Un passage ne lit aucun fichier de résultats : l'empreinte de chaque dossier (date du
+dossier, nom, taille et date de ses fichiers) suffit à écarter les simulations
+inchangées. La fin du calcul n'est vérifiée que pour les dossiers modifiés.
+"""
+import os
+import time
+
+from . import pipeline, results
+from .deck import read_deck
+from .logfile import is_run_finished
+
+# Durée sans écriture (secondes) avant de traiter une simulation terminée
+SETTLE_SECONDS = 10
+
+
+def fingerprint(sim_dir):
+    """
+    Empreinte d'un dossier de simulation : date de modification du dossier, puis nom,
+    taille et date de chaque fichier (os.scandir, sans lecture). Les dossiers cachés
+    (.cache) ne sont pas pris en compte.
+    """
+    files = []
+    with os.scandir(sim_dir) as entries:
+        for entry in entries:
+            if entry.name.startswith('.') or not entry.is_file():
+                continue
+            stat = entry.stat()
+            files.append((entry.name, stat.st_size, stat.st_mtime_ns))
+    return os.stat(sim_dir).st_mtime_ns, tuple(sorted(files))
+
+
+def is_complete(sim_dir):
+    """
+    Vrai si le calcul de la simulation est terminé : dernière étape achevée dans
+    log.txt, ou, sans log.txt, une étape SIMULATION_COMPLETED par pas d'évolution du
+    fichier d'entrée (et l'étape initiale) dans le fichier .se_res.m.
+    """
+    log_file = os.path.join(sim_dir, 'log.txt')
+    if os.path.exists(log_file):
+        return is_run_finished(log_file)
+    res_file = results.kinf_source_file(sim_dir, 'res')
+    deck_file = os.path.join(sim_dir, f'{os.path.basename(os.path.normpath(sim_dir))}.se')
+    if not (os.path.exists(res_file) and os.path.exists(deck_file)):
+        return False
+    return results.completed_steps(res_file) == len(read_deck(deck_file).dep_steps) + 1
+
+
+def add_watch_arguments(parser):
+    """Ajoute les options --watch et --interval à un argparse.ArgumentParser."""
+    parser.add_argument('--watch', action='store_true',
+                        help="Surveiller data/ et traiter chaque simulation dès la fin de son calcul")
+    parser.add_argument('--interval', type=float, default=30,
+                        help="Intervalle entre deux passages de la surveillance, en secondes (défaut : 30)")
+
+
+class Watcher:
+    """
+    Simulations de data_dir à (re)traiter : poll() retourne celles qui sont terminées,
+    nouvelles ou modifiées depuis leur traitement (mark_processed) et sans écriture
+    depuis settle secondes. Une simulation en cours n'est revérifiée que si son
+    empreinte change ; une simulation traitée puis trouvée en cours de calcul (relancée
+    dans le même dossier) sort des simulations traitées jusqu'à sa nouvelle fin.
+    """
+
+    def __init__(self, data_dir='data', settle=SETTLE_SECONDS):
+        self.data_dir = data_dir
+        self.settle = settle
+        # Empreinte de chaque simulation à son dernier traitement
+        self.processed = {}
+        # Empreinte des simulations trouvées en cours de calcul
+        self._running = {}
+
+    def poll(self):
+        """Simulations prêtes à être traitées, triées."""
+        sim_dirs = pipeline.simulation_dirs(self.data_dir)
+        for removed in set(self.processed) - set(sim_dirs):
+            del self.processed[removed]
+        ready = []
+        now = time.time()
+        for sim_dir in sim_dirs:
+            current = fingerprint(sim_dir)
+            if current in (self.processed.get(sim_dir), self._running.get(sim_dir)):
+                continue
+            newest = max((mtime for _, _, mtime in current[1]), default=0) / 1e9
+            if now - newest < self.settle:
+                # Fichiers en cours d'écriture : revu au passage suivant
+                continue
+            if not is_complete(sim_dir):
+                # Calcul relancé dans le même dossier : plus traité tant qu'il n'est pas terminé
+                self.processed.pop(sim_dir, None)
+                self._running[sim_dir] = current
+                continue
+            ready.append(sim_dir)
+        return ready
+
+    def mark_processed(self, sim_dirs):
+        """Enregistre l'empreinte des simulations traitées (après leur traitement)."""
+        for sim_dir in sim_dirs:
+            self.processed[sim_dir] = fingerprint(sim_dir)
+            self._running.pop(sim_dir, None)
+
+    def completed(self):
+        """Simulations déjà traitées, triées."""
+        return sorted(self.processed)
@@ -0,0 +1,149 @@
+"""
+Point d'entrée unique des analyses SERPENT : toutes les analyses demandées sont
+exécutées par un seul interpréteur, dans un même graphe (serpent.pipeline), et chaque
+fichier de simulation n'est lu qu'une fois pour toutes ces analyses.
+
+Utilisation (depuis la racine du projet) :
+    python scripts/serpent_analyze.py k_inf
+    python scripts/serpent_analyze.py inventory cross_section -j 4
+    python scripts/serpent_analyze.py all --profile preview
+    python scripts/serpent_analyze.py final_values
+    python scripts/serpent_analyze.py all --watch
+"""
+import argparse
+import os
+import time
+import final_values
+import interpretations
+import plot_campaign
+import plot_cross_sction
+import plot_fission_rate
+import plot_flow_evolution
+import plot_inventory
+import plot_k_inf
+from serpent import cache, manifest, parallel, pipeline, profiles, results, timing, watch
+
+# Analyses disponibles, dans l'ordre de `all` : nom -> (script, description). Chaque
+# script ajoute ses nœuds au graphe des analyses (register), à côté des produits de
+# données partagés (dep_arrays, kinf_series, inventory_arrays).
+ANALYSES = {
+    'k_inf': (plot_k_inf, "Évolution de k_inf"),
+    'inventory': (plot_inventory, "Inventaires isotopiques et incinération du Pu"),
+    'cross_section': (plot_cross_sction, "Sections efficaces de capture et de fission"),
+    'flow': (plot_flow_evolution, "Évolution du flux neutronique"),
+    'fission_rate': (plot_fission_rate, "Contributions des isotopes aux fissions"),
+    'interpretations': (interpretations, "Interprétation de k_inf et des inventaires"),
+    'campaign': (plot_campaign, "Figures de campagne (toutes les simulations)"),
+    'final_values': (final_values, "Burnup et k_inf finaux (tableau, sans figure)"),
+}
+
+
+def format_time(seconds):
+    """Durée lisible : '1h 2m 3s', '2m 3s' ou '3.2s'."""
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}h {minutes}m {secs}s"
+    if minutes:
+        return f"{minutes}m {secs}s"
+    return f"{seconds:.1f}s"
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Analyses des simulations SERPENT de data/, dans un seul processus")
+    parser.add_argument('analyses', nargs='+', choices=list(ANALYSES) + ['all'], metavar='ANALYSE',
+                        help=f"Analyses à exécuter : {', '.join(ANALYSES)} ou all (toutes)")
+    cache.add_cache_arguments(parser)
+    manifest.add_manifest_arguments(parser)
+    profiles.add_profile_arguments(parser)
+    results.add_kinf_source_argument(parser)
+    parallel.add_jobs_argument(parser)
+    watch.add_watch_arguments(parser)
+    timing.add_timing_arguments(parser)
+    # Options propres à certaines analyses
+    for name, (script, description) in ANALYSES.items():
+        if hasattr(script, 'add_arguments'):
+            script.add_arguments(parser.add_argument_group(f"{name} ({description.lower()})"))
+    return parser
+
+
+def report_failures(graph):
+    """Affiche les nœuds en erreur du dernier run() ; retourne True s'il y en a."""
+    if graph.failures:
+        print("Erreurs : " + ', '.join(name if sim_dir is None else f"{name} ({os.path.basename(sim_dir)})"
+                                       for name, sim_dir in graph.failures))
+    return bool(graph.failures)
+
+
+def report_timings(args, wall_seconds):
+    """Avec --timings : affiche les mesures les plus coûteuses et écrit le profil JSON et CSV."""
+    if not timing.enabled():
+        return
+    timing.report(wall_seconds=wall_seconds)
+    json_path, csv_path = timing.write(args.timings)
+    print(f"Profil écrit : {json_path}, {csv_path}")
+
+
+def watch_data(graph, targets, args):
+    """
+    Surveille data/ jusqu'à Ctrl+C : à chaque simulation terminée, nouvelle ou modifiée,
+    relance le graphe sur les simulations terminées. Grâce aux manifestes, seules les
+    simulations prêtes sont lues et tracées ; les nœuds de campagne (résumés, comparaison
+    du Pu, figures de campagne) sont mis à jour à partir des résultats déjà enregistrés.
+    """
+    watcher = watch.Watcher('data')
+    print(f"Surveillance de data/ toutes les {args.interval:g} s (Ctrl+C pour arrêter)")
+    try:
+        while True:
+            ready = watcher.poll()
+            if ready:
+                print(f"\n[{time.strftime('%H:%M:%S')}] {len(ready)} simulation(s) à traiter : "
+                      f"{', '.join(os.path.basename(sim_dir) for sim_dir in ready)}")
+                start = time.perf_counter()
+                graph.run(targets, sorted(set(watcher.completed()) | set(ready)), args.jobs)
+                watcher.mark_processed(ready)
+                report_failures(graph)
+                elapsed = time.perf_counter() - start
+                # Profil cumulé depuis le début de la surveillance
+                report_timings(args, None)
+                print(f"Traitement en {format_time(elapsed)}, "
+                      f"{len(watcher.completed())} simulation(s) à jour ; en attente...")
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print("\nSurveillance arrêtée.")
+    return 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    cache.configure_from_args(args)
+    manifest.configure_from_args(args)
+    profiles.configure_from_args(args)
+    timing.configure_from_args(args)
+
+    selected = list(ANALYSES) if 'all' in args.analyses else list(dict.fromkeys(args.analyses))
+    sim_dirs = pipeline.simulation_dirs('data')
+    if not sim_dirs and not args.watch:
+        print("Aucune simulation trouvée dans le dossier 'data/'.")
+        return 1
+    print(f"{len(sim_dirs)} simulations, analyses : {', '.join(selected)}")
+
+    # Un seul graphe pour toutes les analyses : chaque fichier est lu une fois par simulation
+    start = time.perf_counter()
+    graph = pipeline.simulation_pipeline(args.source)
+    targets = []
+    for name in selected:
+        targets += ANALYSES[name][0].register(graph, args)
+    if args.watch:
+        return watch_data(graph, targets, args)
+    graph.run(targets, sim_dirs, args.jobs)
+    elapsed = time.perf_counter() - start
+    print(f"\nTemps total d'exécution : {format_time(elapsed)}")
+    print(f"Journal d'exécution : {graph.status.report()}")
+    report_timings(args, elapsed)
+    return 1 if report_failures(graph) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())